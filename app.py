@@ -2,12 +2,58 @@ from flask import Flask
 from flask_cors import CORS
 from config import Config
 from extensions import db, login_manager, socketio
+from utils.presence import init_presence
+from utils.whiteboard import init_whiteboard
+from utils.chat_history import init_chat_history
+from utils.room_sessions import init_room_sessions
+from utils.analytics_pipeline import init_analytics_pipeline
+from utils.achievements import init_achievements
+from utils.exam_predictor import init_exam_predictor
+from utils.ai_jobs import init_ai_jobs
+from utils.ingest import init_ingestion
+from utils.response_cache import init_response_cache
+from utils.query_profiler import init_query_profiler
+from utils.metrics import init_metrics
+from utils.user_cache import init_user_cache
+from utils.sessions import init_sessions
+from utils.lazy_blueprints import LazyBlueprintLoader, warm_up
+from utils.db_engine import engine_options, init_db_engine
+from werkzeug.utils import import_string
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def create_app():
+# (module:blueprint, url_prefix, path prefixes it serves - used to load it lazily)
+BLUEPRINTS = [
+    ('routes.auth:auth', '/api/auth', ['/api/auth']),
+    ('routes.notes:notes', '/api', ['/api/notes']),
+    ('routes.courses:courses', '/api', ['/api/courses']),
+    ('routes.flashcards:flashcards', '/api', ['/api/flashcards']),
+    ('routes.analytics:analytics', '/api', ['/api/analytics']),
+    ('routes.ai_assistant:ai_assistant', '/api', ['/api/ai']),
+    ('routes.partners:partners', '/api', ['/api/partners']),
+    ('routes.achievements:achievements', '/api', ['/api/achievements']),
+    ('routes.exam_predictor:exam_predictor', '/api', ['/api/exam-predictor']),
+    ('routes.study_plans:study_plans', '/api', ['/api/study-plans']),
+    ('routes.resources:resources', '/api', ['/api/resources']),
+    ('routes.review_queue:review_queue', '/api', ['/api/flashcards']),
+    ('routes.chat:chat', '/api', ['/api/rooms']),
+    ('routes.analytics_dashboard:analytics_dashboard', '/api', ['/api/analytics']),
+    ('routes.achievement_progress:achievement_progress', '/api', ['/api/achievements']),
+    ('routes.exam_predictions:exam_predictions', '/api', ['/api/exam-predictor']),
+    ('routes.ai_jobs:ai_jobs', '/api', ['/api/ai']),
+    ('routes.uploads:uploads', '/api', ['/api/uploads', '/api/files']),
+    ('routes.course_catalog:course_catalog', '/api', ['/api/catalog', '/api/cache']),
+    ('routes.profiler:profiler', '/api', ['/api/profiler']),
+    ('routes.listings:listings', '/api', ['/api/list', '/api/export']),
+    ('routes.study_planner:study_planner', '/api', ['/api/planner']),
+    ('routes.metrics:metrics', None, ['/metrics']),
+]
+
+def create_app(blueprints=None):
+    """blueprints: a subset of BLUEPRINTS to register (default: all of them)"""
+    blueprints = BLUEPRINTS if blueprints is None else blueprints
     app = Flask(__name__, static_folder='static', static_url_path='/static')
     app.config.from_object(Config)
     
@@ -15,9 +61,25 @@ def create_app():
     CORS(app, supports_credentials=True)
 
     # Initialize extensions
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
     db.init_app(app)
+    init_db_engine(app)
     login_manager.init_app(app)
-    socketio.init_app(app)
+    socketio.init_app(app, message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE'))
+    init_presence(app)
+    init_whiteboard(app)
+    init_chat_history(app)
+    init_room_sessions(app)
+    init_analytics_pipeline(app)
+    init_achievements(app)
+    init_exam_predictor(app)
+    init_ai_jobs(app)
+    init_ingestion(app)
+    init_response_cache(app)
+    init_query_profiler(app)
+    init_metrics(app)
+    user_cache = init_user_cache(app)
+    init_sessions(app)  # permanent sessions, re-issued only near expiry
     
     login_manager.login_view = 'login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -35,40 +97,15 @@ def create_app():
     
     @login_manager.user_loader
     def load_user(user_id):
-        try:
-            return User.query.get(int(user_id))
-        except:
-            return None
+        # Served from the per-process user cache; see utils/user_cache.py
+        return user_cache.load(user_id)
     
-    @app.before_request
-    def make_session_permanent():
-        from flask import session
-        session.permanent = True
-
-    # Register blueprints
-    from routes.auth import auth
-    from routes.notes import notes
-    from routes.courses import courses
-    from routes.flashcards import flashcards
-    from routes.analytics import analytics
-    from routes.ai_assistant import ai_assistant
-    from routes.partners import partners
-    from routes.achievements import achievements
-    from routes.exam_predictor import exam_predictor
-    from routes.study_plans import study_plans
-    from routes.resources import resources
-    
-    app.register_blueprint(auth, url_prefix='/api/auth')
-    app.register_blueprint(notes, url_prefix='/api')
-    app.register_blueprint(courses, url_prefix='/api')
-    app.register_blueprint(flashcards, url_prefix='/api')
-    app.register_blueprint(analytics, url_prefix='/api')
-    app.register_blueprint(ai_assistant, url_prefix='/api')
-    app.register_blueprint(partners, url_prefix='/api')
-    app.register_blueprint(achievements, url_prefix='/api')
-    app.register_blueprint(exam_predictor, url_prefix='/api')
-    app.register_blueprint(study_plans, url_prefix='/api')
-    app.register_blueprint(resources, url_prefix='/api')
+    # Register blueprints (after the worker starts with LAZY_BLUEPRINTS, see utils/lazy_blueprints.py)
+    if app.config.get('LAZY_BLUEPRINTS'):
+        LazyBlueprintLoader(app, blueprints)
+    else:
+        for import_path, url_prefix, _ in blueprints:
+            app.register_blueprint(import_string(import_path), url_prefix=url_prefix)
 
     # Main Routes
     @app.route("/")
@@ -146,12 +183,24 @@ def create_app():
     # Import events to register handlers for SocketIO
     import events
 
-    with app.app_context():
-        db.create_all()
-        print("Database tables & app initialized!")
+    # Keep derived tables (search index, course graph, achievement counters,
+    # exam prediction terms, blob ref counts, cached course responses) in sync with model writes
+    import utils.search_index
+    import utils.partner_graph
+    import utils.achievements
+    import utils.exam_predictor
+    import utils.blob_store
+    import utils.course_cache
 
+    from commands import register_commands
+    register_commands(app)
+
+    # Tables are created by `flask init-db`, not on every worker boot
     return app
 
 if __name__ == "__main__":
     app = create_app()
+    warm_up(app)
+    with app.app_context():
+        db.create_all()  # development server convenience; deployments run `flask init-db`
     socketio.run(app, debug=True, allow_unsafe_werkzeug=True)
@@ -0,0 +1,115 @@
+"""
+GET /achievements: counting the user's rows on every load vs reading
+Achievement rows and cached counter progress.
+
+    python -m benchmarks.bench_achievements --notes 2000 --flashcards 10000
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from benchmarks.common import make_app, time_calls, summarize, print_header, print_row
+from extensions import db
+from models import User, Course, Note, Flashcard, StudyRoom, StudySession, Analytics, Achievement
+from utils import achievements
+
+
+def populate(args, rng):
+    db.session.add(User(email="bench@uni.edu", password_hash="x"))
+    db.session.add(Course(name="Course", code="C1"))
+    db.session.commit()
+    user_id = User.query.first().id
+    course_id = Course.query.first().id
+    db.session.add(StudyRoom(course_id=course_id, name="Room"))
+    db.session.commit()
+    room_id = StudyRoom.query.first().id
+
+    # Bulk inserts skip the mapper events; rebuild_counters() catches up below
+    db.session.execute(Note.__table__.insert(), [
+        {'user_id': user_id, 'course_id': course_id, 'title': f"Note {i}", 'content': ""}
+        for i in range(args.notes)
+    ])
+    db.session.commit()
+    note_ids = [row[0] for row in db.session.query(Note.id).all()]
+    db.session.execute(Flashcard.__table__.insert(), [
+        {'user_id': user_id, 'note_id': rng.choice(note_ids), 'front': "Q", 'back': "A",
+         'review_count': rng.randint(0, 5)}
+        for _ in range(args.flashcards)
+    ])
+    db.session.execute(StudySession.__table__.insert(), [
+        {'user_id': user_id, 'room_id': room_id, 'duration': rng.randint(10, 120)}
+        for _ in range(args.sessions)
+    ])
+    db.session.execute(Analytics.__table__.insert(), [
+        {'user_id': user_id, 'date': date(2026, 1, 1) - timedelta(days=i),
+         'study_time': rng.randint(10, 180), 'topics_covered': []}
+        for i in range(args.days)
+    ])
+    db.session.commit()
+    return user_id
+
+
+def recount_and_award(user_id):
+    """Baseline: count every entity on each page load, then award"""
+    counts = {
+        'notes': Note.query.filter_by(user_id=user_id).count(),
+        'flashcards': Flashcard.query.filter_by(user_id=user_id).count(),
+        'reviews': sum(card.review_count or 0 for card in Flashcard.query.filter_by(user_id=user_id).all()),
+        'study_sessions': StudySession.query.filter_by(user_id=user_id).count(),
+        'study_minutes': sum(row.study_time for row in Analytics.query.filter_by(user_id=user_id).all())
+    }
+    earned = {a.badge_type for a in Achievement.query.filter_by(user_id=user_id).all()}
+    for rule in achievements.ACHIEVEMENT_RULES:
+        if counts.get(rule['counter'], 0) >= rule['threshold'] and rule['badge_type'] not in earned:
+            db.session.add(Achievement(user_id=user_id, badge_type=rule['badge_type']))
+    db.session.commit()
+    return Achievement.query.filter_by(user_id=user_id).all()
+
+
+def read_only(user_id):
+    earned = achievements.list_achievements(user_id)
+    return earned, achievements.progress(user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--flashcards", type=int, default=10000)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = make_app()
+    rng = random.Random(args.seed)
+    with app.app_context():
+        user_id = populate(args, rng)
+        recount_and_award(user_id)
+        print_header(f"{args.notes} notes, {args.flashcards} flashcards, {args.sessions} sessions, {args.days} days")
+
+        print_row("recount on every GET", summarize(time_calls(lambda: recount_and_award(user_id), args.repeat)))
+        db.session.expunge_all()
+
+        from utils.analytics_pipeline import rebuild_rollups
+        rebuild_rollups()
+        achievements.rebuild_counters()
+
+        def uncached():
+            achievements.invalidate(user_id)
+            return read_only(user_id)
+
+        print_row("counters (uncached progress)", summarize(time_calls(uncached, args.repeat)))
+        print_row("counters (cached progress)", summarize(time_calls(lambda: read_only(user_id), args.repeat)))
+
+        pairs = [(user_id, counter) for counter in achievements.RULES_BY_COUNTER]
+        print_row("evaluate all rules for a write", summarize(time_calls(
+            lambda: achievements.evaluate(pairs), args.repeat
+        )))
+        print_row("evaluate rules for one counter", summarize(time_calls(
+            lambda: achievements.evaluate([(user_id, 'notes')]), args.repeat
+        )))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+AI requests: one model call per HTTP request vs the bounded job pool
+with request coalescing and the content-addressed result cache.
+
+Uses StubModel so it runs offline; --latency sets the simulated model
+latency. Prompts are drawn from a Zipf-like distribution over --notes
+notes, so popular notes are summarized by many users at once.
+
+    python -m benchmarks.bench_ai_jobs --requests 400 --clients 32
+"""
+import argparse
+import random
+import threading
+import time
+
+from flask import Flask
+from flask_socketio import SocketIO
+
+from benchmarks.common import summarize, print_header, print_row
+from utils.ai_jobs import AIJobRunner, ResultCache, StubModel
+
+
+def make_workload(args, rng):
+    weights = [1.0 / (rank + 1) ** args.zipf for rank in range(args.notes)]
+    picks = rng.choices(range(args.notes), weights=weights, k=args.requests)
+    return [f"Summarize note {index}: " + "lorem ipsum " * 50 for index in picks]
+
+
+def run_clients(prompts, clients, handle):
+    """Fire prompts from `clients` threads; returns (latencies ms, wall seconds)"""
+    latencies = []
+    lock = threading.Lock()
+    cursor = iter(enumerate(prompts))
+
+    def client():
+        while True:
+            with lock:
+                item = next(cursor, None)
+            if item is None:
+                return
+            start = time.perf_counter()
+            handle(item[0], item[1])
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+
+def report(label, latencies, wall, model, total):
+    print_row(label, summarize(latencies))
+    print(f"{'':<32} {total / wall:8.1f} req/s  upstream calls={model.calls}  "
+          f"peak concurrent={model.peak_active}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--latency", type=int, default=100, help="stub model latency in ms")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    prompts = make_workload(args, random.Random(args.seed))
+    print_header(f"{args.requests} requests, {args.clients} clients, {args.notes} notes, "
+                 f"{args.latency}ms model latency")
+
+    # Baseline: every request calls the model inline
+    model = StubModel(args.latency)
+    latencies, wall = run_clients(prompts, args.clients, lambda user_id, prompt: model.generate(prompt))
+    report("model call per request", latencies, wall, model, args.requests)
+
+    # Job pool: coalescing + cache, callers wait for their job to finish
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode="threading")
+    model = StubModel(args.latency)
+    runner = AIJobRunner(socketio, model, workers=args.workers, queue_size=args.requests,
+                         cache=ResultCache(1000, 3600))
+
+    def submit_and_wait(user_id, prompt):
+        runner.submit("summarize", prompt, user_id).done.wait()
+
+    latencies, wall = run_clients(prompts, args.clients, submit_and_wait)
+    report(f"job pool ({args.workers} workers)", latencies, wall, model, args.requests)
+    stats = runner.stats
+    print(f"{'':<32} cache hits={stats['cache_hits']} ({stats['cache_hits'] / float(args.requests):.0%})  "
+          f"coalesced={stats['coalesced']}  failed={stats['failed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Analytics dashboard: iterating analytics rows vs reading the rollups,
+for users with three years of daily study data.
+
+    python -m benchmarks.bench_analytics --users 20 --years 3
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from benchmarks.common import make_app, time_calls, summarize, print_header, print_row
+from extensions import db
+from models import User, Analytics
+from utils import analytics_pipeline
+
+TOPICS = [f"Topic {i}" for i in range(60)]
+
+
+def populate(users, days, rng, today):
+    db.session.execute(User.__table__.insert(), [
+        {'email': f"user{i}@uni.edu", 'password_hash': "x"} for i in range(users)
+    ])
+    db.session.commit()
+    user_ids = [row[0] for row in db.session.query(User.id).all()]
+
+    rows = []
+    for user_id in user_ids:
+        for offset in range(days):
+            if rng.random() < 0.15:
+                continue  # days off
+            rows.append({
+                'user_id': user_id,
+                'date': today - timedelta(days=offset),
+                'study_time': rng.randint(10, 180),
+                'topics_covered': rng.sample(TOPICS, k=rng.randint(1, 4))
+            })
+    db.session.execute(Analytics.__table__.insert(), rows)
+    db.session.commit()
+    return user_ids, rows
+
+
+def legacy_stats(user_id):
+    """Baseline /analytics/stats: every row the user has, summed in Python"""
+    rows = Analytics.query.filter_by(user_id=user_id).all()
+    return {
+        'total_study_time': sum(row.study_time for row in rows),
+        'days_active': len({row.date for row in rows})
+    }
+
+
+def legacy_dashboard(user_id, days, today):
+    """Baseline /analytics + /analytics/stats: load rows and aggregate in Python"""
+    start = today - timedelta(days=days - 1)
+    rows = Analytics.query.filter(
+        Analytics.user_id == user_id, Analytics.date >= start, Analytics.date <= today
+    ).order_by(Analytics.date).all()
+    topic_time = Counter()
+    for row in rows:
+        for topic in row.topics_covered or []:
+            topic_time[topic] += row.study_time
+    return {
+        'analytics': [{'date': row.date.isoformat(), 'study_time': row.study_time} for row in rows],
+        'summary': {
+            'total_study_time': sum(row.study_time for row in rows),
+            'days_active': len({row.date for row in rows}),
+            'total_topics': len(topic_time),
+            'weak_topics': sorted(topic_time.items(), key=lambda item: (item[1], item[0]))[:5]
+        },
+        'stats': legacy_stats(user_id)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = make_app()
+    rng = random.Random(args.seed)
+    today = date(2026, 6, 30)
+    days = 365 * args.years
+    with app.app_context():
+        user_ids, rows = populate(args.users, days, rng, today)
+        print_header(f"{args.users} users x {args.years} years of daily analytics ({len(rows)} rows)")
+
+        start = time.perf_counter()
+        analytics_pipeline.rebuild_rollups()
+        elapsed = time.perf_counter() - start
+        print(f"{'rollup ingest':<32} {len(rows) / elapsed:10.0f} events/s")
+
+        user_id = user_ids[0]
+        legacy = legacy_dashboard(user_id, days, today)['summary']
+        rolled = analytics_pipeline.dashboard(user_id, days=days, today=today)['summary']
+        assert legacy['total_study_time'] == rolled['total_study_time']
+        assert legacy['days_active'] == rolled['days_active']
+        assert legacy['total_topics'] == rolled['total_topics']
+        assert legacy['weak_topics'][0][0] == rolled['weak_topics'][0]['topic']
+
+        for window in (7, 30, 365, days):
+            print_row(f"row scan, {window} days", summarize(
+                time_calls(lambda: legacy_dashboard(user_id, window, today), args.repeat)
+            ))
+            db.session.expunge_all()
+            print_row(f"rollups, {window} days", summarize(
+                time_calls(lambda: analytics_pipeline.dashboard(user_id, days=window, today=today), args.repeat)
+            ))
+            print_row(f"rollups, {window} days, monthly", summarize(
+                time_calls(lambda: analytics_pipeline.dashboard(
+                    user_id, days=window, granularity='month', today=today
+                ), args.repeat)
+            ))
+
+
+if __name__ == "__main__":
+    main()
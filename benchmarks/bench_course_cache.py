@@ -0,0 +1,61 @@
+"""
+GET /courses: querying and serializing the courses table on every call
+vs the versioned response cache (hit, and 304 on If-None-Match).
+
+    python -m benchmarks.bench_course_cache --courses 500
+"""
+import argparse
+import json
+
+from flask import Response
+
+from benchmarks.common import make_app, time_calls, summarize, print_header, print_row
+from extensions import db
+from models import Course
+from utils.response_cache import init_response_cache
+from utils.course_cache import catalog_response, course_to_dict
+import utils.course_cache  # noqa: F401  (invalidation events)
+
+
+def uncached_catalog():
+    courses = Course.query.order_by(Course.id).all()
+    return Response(json.dumps({'courses': [course_to_dict(course) for course in courses]}),
+                    mimetype='application/json')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--courses", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    app = make_app()
+    cache = init_response_cache(app)
+    with app.app_context():
+        db.session.execute(Course.__table__.insert(), [
+            {'name': f"Course {i}", 'code': f"C{i:05d}", 'description': "Lecture course " * 8}
+            for i in range(args.courses)
+        ])
+        db.session.commit()
+
+    print_header(f"{args.courses} courses")
+    with app.test_request_context():
+        print_row("query + serialize per call", summarize(time_calls(uncached_catalog, args.repeat)))
+        etag = catalog_response(cache).get_etag()[0]
+        print_row("cache hit", summarize(time_calls(lambda: catalog_response(cache), args.repeat)))
+    with app.test_request_context(headers={'If-None-Match': f'"{etag}"'}):
+        print_row("cache hit, 304", summarize(time_calls(lambda: catalog_response(cache), args.repeat)))
+
+    with app.test_request_context():
+        def write_then_read():
+            course = db.session.get(Course, 1)
+            course.description = course.description + "."
+            db.session.commit()
+            return catalog_response(cache)
+
+        print_row("update + first read (miss)", summarize(time_calls(write_then_read, 50)))
+        print(f"{'':<32} {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
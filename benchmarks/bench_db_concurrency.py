@@ -0,0 +1,178 @@
+"""
+Concurrent clients against the notes and flashcards endpoints with the
+default SQLAlchemy engine vs the utils/db_engine.py profile.
+
+Each client is a thread with its own logged-in user, cycling through
+GET /notes, GET /flashcards/due, POST /flashcards/reviews and PUT
+/notes/<id>. On SQLite the profile is WAL + busy_timeout; with
+BENCH_DATABASE_URL pointing at PostgreSQL it is the tuned pool and
+statement timeout. DB waits release the GIL under psycopg2 and sqlite3,
+so threads stand in for gevent greenlets here.
+
+    python -m benchmarks.bench_db_concurrency --clients 200 --requests 10
+    BENCH_ALLOW_DROP=1 BENCH_DATABASE_URL=postgresql://localhost/studysync_bench python -m benchmarks.bench_db_concurrency
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask, jsonify, request
+from flask_login import LoginManager, current_user, login_required
+
+from benchmarks.common import make_app, temp_database_url, summarize, print_header, print_row
+from config import Config
+from extensions import db
+from models import User, Course, Note, Flashcard
+from utils.db_engine import engine_options, init_db_engine
+from utils.list_views import NOTES
+from utils.pagination import keyset_page
+from utils.review_queue import get_review_queue, parse_reviews, apply_reviews
+
+ENDPOINTS = ['GET /notes', 'GET /flashcards/due', 'POST /flashcards/reviews', 'PUT /notes/<id>']
+
+
+def populate(database_url, users, notes, cards):
+    """One user per client, each with `notes` notes and `cards` due flashcards"""
+    app = make_app(database_url)
+    with app.app_context():
+        db.session.add(Course(name="Course", code="C1"))
+        db.session.execute(User.__table__.insert(), [
+            {'email': f"user{i}@uni.edu", 'password_hash': "x"} for i in range(users)
+        ])
+        db.session.commit()
+        course_id = Course.query.first().id
+        user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id).all()]
+        db.session.execute(Note.__table__.insert(), [
+            {'user_id': user_id, 'course_id': course_id, 'title': f"Note {n}", 'content': "Lecture notes " * 20}
+            for user_id in user_ids for n in range(notes)
+        ])
+        db.session.commit()
+        first_notes = dict(db.session.query(Note.user_id, db.func.min(Note.id)).group_by(Note.user_id).all())
+        due = datetime.utcnow() - timedelta(days=1)
+        db.session.execute(Flashcard.__table__.insert(), [
+            {'user_id': user_id, 'note_id': first_notes[user_id], 'front': "Q", 'back': "A",
+             'next_review': due - timedelta(minutes=c), 'review_count': 0}
+            for user_id in user_ids for c in range(cards)
+        ])
+        db.session.commit()
+        note_ids = {user_id: [row[0] for row in db.session.query(Note.id).filter_by(user_id=user_id).all()]
+                    for user_id in user_ids}
+    return user_ids, note_ids
+
+
+def make_bench_app(database_url, tuned):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SECRET_KEY'] = 'bench'
+    if tuned:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    db.init_app(app)
+    if tuned:
+        init_db_engine(app)
+
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+
+    @app.route('/notes')
+    @login_required
+    def list_notes():
+        names = ['id', 'title', 'course_name']
+        notes, _ = keyset_page(NOTES.project(Note.query.filter(Note.user_id == current_user.id), names),
+                               Note, limit=20)
+        return jsonify([NOTES.serialize(note, names) for note in notes])
+
+    @app.route('/notes/<int:note_id>', methods=['PUT'])
+    @login_required
+    def update_note(note_id):
+        note = Note.query.filter_by(id=note_id, user_id=current_user.id).first_or_404()
+        note.content = request.get_json()['content']
+        db.session.commit()
+        return jsonify({'id': note.id})
+
+    @app.route('/flashcards/due')
+    @login_required
+    def due_flashcards():
+        cards, next_cursor = get_review_queue(current_user.id)
+        return jsonify({'ids': [card.id for card in cards], 'next_cursor': next_cursor})
+
+    @app.route('/flashcards/reviews', methods=['POST'])
+    @login_required
+    def submit_reviews():
+        apply_reviews(current_user.id, parse_reviews(request.get_json()['reviews']))
+        return jsonify({'ok': True})
+
+    return app
+
+
+def run_client(app, user_id, note_ids, requests, offset, results):
+    rng = random.Random(user_id)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    due = []
+    for i in range(requests):
+        endpoint = ENDPOINTS[(i + offset) % len(ENDPOINTS)]
+        start = time.perf_counter()
+        try:
+            if endpoint == 'GET /notes':
+                response = client.get('/notes')
+            elif endpoint == 'GET /flashcards/due':
+                response = client.get('/flashcards/due')
+                if response.status_code == 200:
+                    due = response.get_json()['ids']
+            elif endpoint == 'POST /flashcards/reviews':
+                card_ids = due[:5] or [0]
+                response = client.post('/flashcards/reviews', json={'reviews': [
+                    {'id': card_id, 'correct': rng.random() < 0.8} for card_id in card_ids
+                ]})
+            else:
+                response = client.put(f'/notes/{rng.choice(note_ids)}', json={'content': f"Edit {i} " * 50})
+            ok = response.status_code < 500
+        except Exception:
+            ok = False
+        results.append((endpoint, (time.perf_counter() - start) * 1000, ok))
+
+
+def run(app, user_ids, note_ids, requests):
+    results = []
+    threads = [
+        threading.Thread(target=run_client, args=(app, user_id, note_ids[user_id], requests, i, results))
+        for i, user_id in enumerate(user_ids)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--notes", type=int, default=20)
+    parser.add_argument("--cards", type=int, default=50)
+    args = parser.parse_args()
+
+    print_header(f"{args.clients} concurrent clients x {args.requests} requests, notes + flashcards endpoints")
+    for label, tuned in (("default engine", False), ("db_engine profile", True)):
+        # Fresh database per run: WAL mode persists in an SQLite file once set
+        database_url = temp_database_url()
+        user_ids, note_ids = populate(database_url, args.clients, args.notes, args.cards)
+        app = make_bench_app(database_url, tuned)
+        results, elapsed = run(app, user_ids, note_ids, args.requests)
+        errors = sum(1 for _, _, ok in results if not ok)
+        print(f"{label}: {len(results) / elapsed:.0f} req/s, {errors} errors")
+        for endpoint in ENDPOINTS:
+            print_row(f"  {endpoint}", summarize([ms for name, ms, ok in results if name == endpoint and ok] or [0.0]))
+        with app.app_context():
+            print(f"  pool: {db.engine.pool.status()}")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+/exam-predictor: re-analysing every note of a course per click vs
+regenerating from the incrementally maintained course term sums.
+
+    python -m benchmarks.bench_exam_predictor --notes 5000
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from benchmarks.common import make_app, time_calls, summarize, print_header, print_row
+from extensions import db
+from models import User, Course, Note, ExamPrediction
+from utils import exam_predictor
+
+CUES = ["Important:", "Remember", "Definition:", ""]
+
+
+def make_vocab(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def make_text(vocab, weights, rng, sentences):
+    parts = []
+    for _ in range(sentences):
+        words = rng.choices(vocab, weights=weights, k=rng.randint(8, 16))
+        parts.append(f"{rng.choice(CUES)} {' '.join(words)}.")
+    return " ".join(parts)
+
+
+def populate(notes, vocab_size, rng):
+    db.session.add(User(email="bench@uni.edu", password_hash="x"))
+    db.session.add(Course(name="Algorithms", code="CS301"))
+    db.session.commit()
+    user_id = User.query.first().id
+    course_id = Course.query.first().id
+
+    vocab = make_vocab(vocab_size, rng)
+    weights = [1.0 / (rank + 1) for rank in range(vocab_size)]
+    db.session.execute(Note.__table__.insert(), [
+        {'user_id': user_id, 'course_id': course_id, 'title': " ".join(rng.choices(vocab[:50], k=3)),
+         'content': make_text(vocab, weights, rng, rng.randint(8, 20))}
+        for _ in range(notes)
+    ])
+    db.session.commit()
+    return course_id, vocab, weights
+
+
+def full_reanalysis(course_id):
+    """Baseline: re-read and re-tokenise every note, then rewrite predictions"""
+    totals = Counter()
+    note_counts = Counter()
+    notes = Note.query.filter_by(course_id=course_id).all()
+    for note in notes:
+        terms = exam_predictor.extract_terms(note.title, note.content)
+        totals.update(terms)
+        note_counts.update(terms.keys())
+    ranked = sorted(totals, key=lambda term: (-note_counts[term], -totals[term], term))
+    ExamPrediction.query.filter_by(course_id=course_id).delete()
+    for rank, term in enumerate(ranked[:exam_predictor.MAX_PREDICTIONS]):
+        db.session.add(ExamPrediction(
+            course_id=course_id,
+            question_text=exam_predictor.QUESTION_TEMPLATES[rank % 5].format(term=term),
+            confidence_score=note_counts[term] / float(len(notes))
+        ))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notes", type=int, default=5000)
+    parser.add_argument("--vocab", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = make_app()
+    rng = random.Random(args.seed)
+    with app.app_context():
+        course_id, vocab, weights = populate(args.notes, args.vocab, rng)
+        print_header(f"1 course, {args.notes} notes")
+
+        print_row("full re-analysis per click", summarize(time_calls(lambda: full_reanalysis(course_id), 3)))
+        db.session.expunge_all()
+
+        start = time.perf_counter()
+        exam_predictor.rebuild_vectors(course_id=course_id)
+        print(f"{'initial vector build':<32} {(time.perf_counter() - start) * 1000:8.0f}ms (one-off)")
+
+        note_ids = [row[0] for row in db.session.query(Note.id).filter_by(course_id=course_id).all()]
+
+        def edit_note():
+            note = db.session.get(Note, rng.choice(note_ids))
+            note.content = make_text(vocab, weights, rng, rng.randint(8, 20))
+            db.session.commit()
+
+        print_row("note edit (incl. term deltas)", summarize(time_calls(edit_note, args.repeat)))
+
+        def regenerate():
+            exam_predictor.regenerate(course_id)
+            db.session.commit()
+
+        print_row("regenerate from course sums", summarize(time_calls(regenerate, args.repeat)))
+
+        def uncached_top():
+            exam_predictor.invalidate(course_id)
+            return exam_predictor.top_predictions(course_id)
+
+        print_row("top-k (uncached)", summarize(time_calls(uncached_top, args.repeat)))
+        print_row("top-k (cached)", summarize(time_calls(
+            lambda: exam_predictor.top_predictions(course_id), args.repeat
+        )))
+
+
+if __name__ == "__main__":
+    main()
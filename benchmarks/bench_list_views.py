@@ -0,0 +1,137 @@
+"""
+List endpoints: every row with full bodies in one response vs keyset
+pages with a `fields=` projection, and a buffered vs streamed export.
+
+    python -m benchmarks.bench_list_views --notes 5000 --content-kb 8
+"""
+import argparse
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_app, time_calls, summarize, print_header, print_row
+from extensions import db
+from models import User, Course, Note
+from utils.list_views import NOTES, EXPORT_BATCH_SIZE, stream_json
+from utils.pagination import keyset_page, encode_cursor
+
+LIST_FIELDS = 'id,title,course_name,created_at'
+
+
+def populate(notes, content_kb):
+    db.session.add(User(email="bench@uni.edu", password_hash="x"))
+    db.session.add(Course(name="Algorithms", code="CS301"))
+    db.session.commit()
+    user_id = User.query.first().id
+    course_id = Course.query.first().id
+    body = ("Lecture notes on graph algorithms. " * (content_kb * 30))[:content_kb * 1024]
+    start = datetime(2026, 1, 1)
+    db.session.execute(Note.__table__.insert(), [
+        {'user_id': user_id, 'course_id': course_id, 'title': f"Note {i}", 'content': body,
+         'created_at': start + timedelta(minutes=i), 'updated_at': start + timedelta(minutes=i)}
+        for i in range(notes)
+    ])
+    db.session.commit()
+    return user_id
+
+
+def user_notes(user_id):
+    """The query routes/listings.py projects and pages"""
+    return Note.query.filter(Note.user_id == user_id)
+
+
+def everything(user_id):
+    """Baseline: GET /notes returning all rows with every column"""
+    notes = NOTES.newest_first(NOTES.project(user_notes(user_id), NOTES.default)).all()
+    body = json.dumps({'notes': [NOTES.serialize(note, NOTES.default) for note in notes]})
+    db.session.expunge_all()
+    return body
+
+
+def first_page(user_id, names, limit):
+    rows, next_cursor = keyset_page(NOTES.project(user_notes(user_id), names), Note, limit=limit)
+    body = json.dumps({'notes': [NOTES.serialize(row, names) for row in rows], 'next_cursor': next_cursor})
+    db.session.expunge_all()
+    return body
+
+
+def offset_page(user_id, names, page, limit):
+    query = NOTES.newest_first(NOTES.project(user_notes(user_id), names))
+    rows = query.offset(page * limit).limit(limit).all()
+    db.session.expunge_all()
+    return rows
+
+
+def keyset_deep_page(user_id, names, cursor, limit):
+    rows, _ = keyset_page(NOTES.project(user_notes(user_id), names), Note, cursor=cursor, limit=limit)
+    db.session.expunge_all()
+    return rows
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notes", type=int, default=5000)
+    parser.add_argument("--content-kb", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    if args.limit < 1 or args.notes <= args.limit:
+        parser.error("--notes must be larger than --limit (at least two pages) and --limit at least 1")
+
+    app = make_app()
+    with app.app_context():
+        user_id = populate(args.notes, args.content_kb)
+        names = NOTES.parse_fields(LIST_FIELDS)
+        print_header(f"{args.notes} notes x {args.content_kb} KB content, page size {args.limit}")
+
+        size = len(everything(user_id))
+        print_row("all rows, full bodies", summarize(time_calls(lambda: everything(user_id), 3)))
+        print(f"{'':<32} {size / 1024 / 1024:8.1f} MB response")
+        size = len(first_page(user_id, NOTES.default, args.limit))
+        print_row("keyset page, all fields", summarize(time_calls(
+            lambda: first_page(user_id, NOTES.default, args.limit), args.repeat
+        )))
+        print(f"{'':<32} {size / 1024:8.1f} KB response")
+        size = len(first_page(user_id, names, args.limit))
+        print_row(f"keyset page, fields={LIST_FIELDS.split(',')[1]},..", summarize(time_calls(
+            lambda: first_page(user_id, names, args.limit), args.repeat
+        )))
+        print(f"{'':<32} {size / 1024:8.1f} KB response")
+
+        # A page near the oldest notes, reached by OFFSET vs by cursor
+        page = max(1, (args.notes - 1) // args.limit - 2)
+        first_row = offset_page(user_id, names, page, args.limit)[0]
+        previous = NOTES.newest_first(user_notes(user_id)).offset(page * args.limit - 1).first()
+        cursor = encode_cursor(previous.created_at, previous.id)
+        print_row(f"OFFSET page {page}", summarize(time_calls(
+            lambda: offset_page(user_id, names, page, args.limit), args.repeat
+        )))
+        print_row(f"keyset page {page}", summarize(time_calls(
+            lambda: keyset_deep_page(user_id, names, cursor, args.limit), args.repeat
+        )))
+        assert keyset_deep_page(user_id, names, cursor, args.limit)[0].id == first_row.id
+
+        def buffered_export():
+            everything(user_id)
+
+        def streamed_export():
+            rows = NOTES.newest_first(NOTES.project(user_notes(user_id), NOTES.default)).yield_per(EXPORT_BATCH_SIZE)
+            for _ in stream_json('notes', rows, lambda row: NOTES.serialize(row, NOTES.default)):
+                pass
+            db.session.expunge_all()
+
+        print(f"{'export peak memory, buffered':<32} {peak_memory(buffered_export) / 1024 / 1024:8.1f} MB")
+        print(f"{'export peak memory, streamed':<32} {peak_memory(streamed_export) / 1024 / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
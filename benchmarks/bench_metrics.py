@@ -0,0 +1,124 @@
+"""
+Metrics overhead: the same requests and SocketIO events with and without
+utils/metrics.py instrumentation, plus the cost of rendering /metrics.
+
+Both apps serve a route without SQL, a route running two queries and a
+room chat handler; batches alternate between the two apps so machine
+noise hits both equally. The cost of the recording hooks on their own is
+timed separately, since it is smaller than that noise.
+
+    python -m benchmarks.bench_metrics --requests 5000
+"""
+import argparse
+import statistics
+import time
+
+from flask import jsonify
+from flask_socketio import SocketIO, emit, join_room
+
+from benchmarks.common import make_app, temp_database_url, print_header
+from extensions import db
+from models import User
+from routes.metrics import metrics as metrics_routes
+from utils.metrics import init_metrics, room_label
+
+
+def build(database_url, instrumented):
+    app = make_app(database_url, reset=False)
+    app.config['METRICS_ENABLED'] = instrumented
+    socketio = SocketIO(app, async_mode='threading')
+
+    @app.route('/ping')
+    def ping():
+        return jsonify({'ok': True})
+
+    @app.route('/users')
+    def users():
+        count = db.session.query(User).count()
+        first = db.session.query(User).order_by(User.id).first()
+        return jsonify({'count': count, 'first': first.email})
+
+    @socketio.on('join')
+    def on_join(data):
+        join_room(str(data['room_id']))
+
+    @socketio.on('message')
+    def on_message(data):
+        emit('message', data, room=str(data['room_id']))
+
+    init_metrics(app)
+    app.register_blueprint(metrics_routes)
+    return app, socketio
+
+
+def timed(fn, count):
+    """Mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def compare(label, plain, instrumented, count, rounds):
+    plain_us, instrumented_us = [], []
+    for _ in range(rounds):
+        plain_us.append(timed(plain, count))
+        instrumented_us.append(timed(instrumented, count))
+    base, measured = statistics.median(plain_us), statistics.median(instrumented_us)
+    print(f"{label:<24} {base:9.1f}us {measured:9.1f}us {measured - base:+8.1f}us ({(measured / base - 1) * 100:+5.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--rooms", type=int, default=200, help="rooms with traffic before rendering /metrics")
+    args = parser.parse_args()
+
+    database_url = temp_database_url()
+    make_app(database_url)
+    plain_app, plain_socketio = build(database_url, False)
+    app, socketio = build(database_url, True)
+    with app.app_context():
+        db.session.add(User(email="metrics@uni.edu", password_hash="x"))
+        db.session.commit()
+
+    plain_client, client = plain_app.test_client(), app.test_client()
+    plain_socket, socket = plain_socketio.test_client(plain_app), socketio.test_client(app)
+    for s in (plain_socket, socket):
+        s.emit('join', {'room_id': 1})
+    count = args.requests // args.rounds
+
+    print_header(f"{args.requests} calls per case, median of {args.rounds} alternating rounds")
+    print(f"{'case':<24} {'plain':>11} {'metrics':>11} {'overhead':>10}")
+    compare("GET /ping", lambda: plain_client.get('/ping'), lambda: client.get('/ping'), count, args.rounds)
+    compare("GET /users (2 queries)", lambda: plain_client.get('/users'), lambda: client.get('/users'),
+            count, args.rounds)
+
+    def chat(s):
+        s.emit('message', {'room_id': 1, 'msg': 'hi'})
+        s.get_received()
+
+    compare("socket message + emit", lambda: chat(plain_socket), lambda: chat(socket), count, args.rounds)
+
+    # End to end numbers are within noise; time the recording itself too
+    metrics = app.extensions['metrics']
+    response = app.response_class('{}')
+    with app.test_request_context('/ping'):
+        hooks_us = timed(lambda: (metrics._start(), metrics._finish(response), metrics._teardown(None)), args.requests)
+    event_us = timed(lambda: metrics.record_event('message', 1, 0.001), args.requests)
+    print(f"{'request hooks only':<24} {'':>11} {'':>11} {hooks_us:+8.1f}us")
+    print(f"{'socket event record only':<24} {'':>11} {'':>11} {event_us:+8.1f}us")
+
+    for room in range(args.rooms):
+        metrics.record_event('message', room, 0.001)
+        metrics.events_out.inc(('message', room_label(room)))
+    body = client.get('/metrics').get_data(as_text=True)
+    render_ms = timed(metrics.render, 20) / 1000
+    series = sum(1 for line in body.splitlines() if line and not line.startswith('#'))
+    print(f"\n/metrics with {args.rooms} rooms: {series} series, {len(body) / 1024:.0f} KB, "
+          f"rendered in {render_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
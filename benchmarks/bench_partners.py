@@ -0,0 +1,83 @@
+"""
+/partners/find: scanning notes per candidate vs the user_courses graph.
+
+    python -m benchmarks.bench_partners --users 2000 --courses 200
+"""
+import argparse
+import random
+
+from benchmarks.common import make_app, time_calls, summarize, print_header, print_row
+from extensions import db
+from models import User, Course, Note
+from utils import partner_graph
+
+
+def populate(users, courses, notes_per_course, rng):
+    db.session.execute(Course.__table__.insert(), [
+        {'name': f"Course {i}", 'code': f"C{i}"} for i in range(courses)
+    ])
+    db.session.execute(User.__table__.insert(), [
+        {'email': f"user{i}@uni.edu", 'password_hash': "x"} for i in range(users)
+    ])
+    db.session.commit()
+    user_ids = [row[0] for row in db.session.query(User.id).all()]
+    course_ids = [row[0] for row in db.session.query(Course.id).all()]
+
+    rows = []
+    for user_id in user_ids:
+        for course_id in rng.sample(course_ids, k=rng.randint(2, 6)):
+            for n in range(notes_per_course):
+                rows.append({'user_id': user_id, 'course_id': course_id, 'title': f"Notes {n}", 'content': ""})
+    db.session.execute(Note.__table__.insert(), rows)
+    db.session.commit()
+    partner_graph.rebuild_graph()
+    return user_ids
+
+
+def scan_notes(user_id):
+    """Baseline: derive course sets from notes for every other user"""
+    own = {n.course_id for n in Note.query.filter_by(user_id=user_id).all()}
+    results = []
+    for other in User.query.filter(User.id != user_id).all():
+        theirs = {n.course_id for n in Note.query.filter_by(user_id=other.id).all()}
+        shared = own & theirs
+        if shared:
+            results.append((len(shared) / len(own | theirs), other.id))
+    return sorted(results, reverse=True)[:10]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--notes-per-course", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = make_app()
+    rng = random.Random(args.seed)
+    with app.app_context():
+        user_ids = populate(args.users, args.courses, args.notes_per_course, rng)
+        sample = rng.sample(user_ids, k=min(args.repeat, len(user_ids)))
+        print_header(f"{args.users} users, {args.courses} courses")
+
+        print_row("note scan (per request)", summarize(
+            [t for user_id in sample[:3] for t in time_calls(lambda: scan_notes(user_id), 1)]
+        ))
+        db.session.expunge_all()
+
+        uncached = []
+        for user_id in sample:
+            partner_graph.clear_cache()
+            uncached += time_calls(lambda: partner_graph.find_partners(user_id), 1)
+        print_row("course graph (uncached)", summarize(uncached))
+        for user_id in sample:
+            partner_graph.find_partners(user_id)
+        print_row("course graph (cached)", summarize(
+            [t for user_id in sample for t in time_calls(lambda: partner_graph.find_partners(user_id), 5)]
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Deck rescheduling: per-object ORM loop vs vectorized batch update.
+
+    python -m benchmarks.bench_scheduler --cards 200000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_app, print_header
+from extensions import db
+from models import User, Course, Note, Flashcard
+from utils import scheduler
+
+
+def populate(cards, rng):
+    user = User(email="bench@example.com", password_hash="x")
+    course = Course(name="Benchmark", code="BENCH101")
+    db.session.add_all([user, course])
+    db.session.commit()
+    note = Note(user_id=user.id, course_id=course.id, title="Deck", content="")
+    db.session.add(note)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    rows = []
+    for _ in range(cards):
+        rows.append({
+            'note_id': note.id,
+            'user_id': user.id,
+            'front': "Q",
+            'back': "A",
+            'difficulty': rng.randint(0, 2),
+            'review_count': rng.randint(0, 12),
+            'ease_factor': rng.uniform(1.3, 3.0),
+            'interval_days': 0.0,
+            'last_reviewed': now - timedelta(days=rng.randint(0, 60)),
+            'next_review': now
+        })
+        if len(rows) == 10000:
+            db.session.execute(Flashcard.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Flashcard.__table__.insert(), rows)
+    db.session.commit()
+    return user.id
+
+
+def orm_loop(user_id, params):
+    """Baseline: load every Flashcard object and recompute one at a time"""
+    for card in Flashcard.query.filter_by(user_id=user_id).all():
+        interval = float(scheduler.compute_intervals([card.review_count], [card.ease_factor], params)[0])
+        card.interval_days = interval
+        card.next_review = card.last_reviewed + timedelta(days=interval)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        user_id = populate(args.cards, random.Random(args.seed))
+        params = scheduler.get_params({'interval_modifier': 0.9})
+
+        print_header(f"Rescheduling {args.cards} flashcards")
+        start = time.perf_counter()
+        orm_loop(user_id, params)
+        orm_seconds = time.perf_counter() - start
+        db.session.expunge_all()
+
+        params = scheduler.get_params({'interval_modifier': 1.1})
+        start = time.perf_counter()
+        scheduler.reschedule(user_id=user_id, params=params)
+        batch_seconds = time.perf_counter() - start
+
+        print(f"{'ORM per-object loop':<32} {orm_seconds:8.2f}s  ({args.cards / orm_seconds:10.0f} cards/s)")
+        print(f"{'vectorized batch':<32} {batch_seconds:8.2f}s  ({args.cards / batch_seconds:10.0f} cards/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Compare /ai/search latency: per-request Trie rebuild vs persistent index.
+
+    python -m benchmarks.bench_search --sizes 1000,10000,100000
+"""
+import argparse
+import random
+
+from benchmarks.common import make_app, time_calls, summarize, print_header, print_row
+from extensions import db
+from models import User, Course, Note
+from utils import search_index
+
+COMMON_WORDS = [
+    "array", "linked", "list", "stack", "queue", "tree", "binary", "search", "graph",
+    "heap", "hash", "table", "sort", "merge", "quick", "recursion", "dynamic",
+    "programming", "complexity", "pointer", "memory", "algorithm", "node", "edge",
+    "vertex", "path", "cycle", "matrix", "vector", "integral", "derivative", "limit",
+    "cell", "membrane", "protein", "enzyme", "energy", "force", "motion", "velocity"
+]
+# Long tail of rarer terms so term frequencies look roughly Zipfian
+VOCABULARY = COMMON_WORDS + [f"term{i}" for i in range(5000)]
+WEIGHTS = [1.0 / (rank + 1) for rank in range(len(VOCABULARY))]
+QUERIES = ["binary search tree", "hash table", "recursion", "dynamic programming", "graph cycle"]
+
+
+class TrieNode:
+    def __init__(self):
+        self.children = {}
+        self.note_ids = set()
+
+
+def trie_search(user_id, query):
+    """Baseline: rebuild a keyword Trie over every note on each call"""
+    root = TrieNode()
+    for note in Note.query.filter_by(user_id=user_id).all():
+        for word in search_index.tokenize(f"{note.title} {note.content}"):
+            node = root
+            for ch in word:
+                node = node.children.setdefault(ch, TrieNode())
+            node.note_ids.add(note.id)
+
+    scores = {}
+    for word in search_index.tokenize(query):
+        node = root
+        for ch in word:
+            node = node.children.get(ch)
+            if node is None:
+                break
+        if node is not None:
+            for note_id in node.note_ids:
+                scores[note_id] = scores.get(note_id, 0) + 1
+    return sorted(scores.items(), key=lambda item: -item[1])[:10]
+
+
+def populate(size, rng):
+    db.session.query(Note).delete()
+    user = User.query.first()
+    if user is None:
+        user = User(email="bench@example.com", password_hash="x")
+        course = Course(name="Benchmark", code="BENCH101")
+        db.session.add_all([user, course])
+        db.session.commit()
+    course = Course.query.first()
+
+    # Core inserts bypass the mapper events; the index is built afterwards
+    rows = [
+        {
+            'user_id': user.id,
+            'course_id': course.id,
+            'title': f"Lecture {i}",
+            'content': " ".join(rng.choices(VOCABULARY, WEIGHTS, k=rng.randint(20, 120)))
+        }
+        for i in range(size)
+    ]
+    db.session.execute(Note.__table__.insert(), rows)
+    db.session.commit()
+    search_index.rebuild_index()
+    return user.id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = make_app()
+    rng = random.Random(args.seed)
+    with app.app_context():
+        for size in [int(s) for s in args.sizes.split(",")]:
+            user_id = populate(size, rng)
+            print_header(f"{size} notes per user")
+
+            trie_repeat = max(3, args.repeat // 4) if size >= 10000 else args.repeat
+            trie_samples, index_samples = [], []
+            for query in QUERIES:
+                trie_samples += time_calls(lambda: trie_search(user_id, query), trie_repeat)
+                db.session.expunge_all()
+                index_samples += time_calls(lambda: search_index.search(user_id, query), args.repeat)
+            print_row("trie (rebuilt per request)", summarize(trie_samples))
+            print_row("inverted index (BM25)", summarize(index_samples))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Session cookies: a before_request hook setting session.permanent on
+every request (the cookie is re-signed and re-sent on each response) vs
+the sliding cookie interface and server-side sessions.
+
+Reports CPU time per request and Set-Cookie bytes per response for an
+authenticated API call and a static file.
+
+    python -m benchmarks.bench_sessions --requests 3000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from flask import Flask, session
+
+from utils.sessions import SlidingCookieSessionInterface, ServerSideSessionInterface, MemorySessionStore
+from benchmarks.common import print_header
+from config import Config
+
+
+def make_bench_app(mode, static_folder):
+    app = Flask(__name__, static_folder=static_folder, static_url_path='/static')
+    app.config.from_object(Config)
+
+    if mode == 'per-request':
+        @app.before_request
+        def make_session_permanent():
+            session.permanent = True
+    elif mode == 'sliding cookie':
+        app.session_interface = SlidingCookieSessionInterface()
+    else:
+        app.session_interface = ServerSideSessionInterface(MemorySessionStore())
+
+    @app.route('/api/ping')
+    def ping():
+        return {'user': session.get('_user_id')}
+
+    return app
+
+
+def run(app, path, requests):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = '1'
+        sess['_fresh'] = True
+        sess['csrf'] = 'x' * 40
+    client.get(path)
+
+    cookie_bytes = 0
+    start = time.process_time()
+    for _ in range(requests):
+        response = client.get(path)
+        cookie_bytes += sum(len(value) for value in response.headers.getlist('Set-Cookie'))
+        response.close()
+    cpu_ms = (time.process_time() - start) * 1000 / requests
+    return cpu_ms, cookie_bytes / float(requests)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    static_folder = tempfile.mkdtemp(prefix="studysync-bench-")
+    with open(os.path.join(static_folder, "app.css"), "w") as out:
+        out.write("body { margin: 0; }\n" * 50)
+
+    print_header(f"{args.requests} requests per row")
+    print(f"{'':<30} {'path':<16} {'cpu/request':>12} {'Set-Cookie/response':>20}")
+    for mode in ('per-request', 'sliding cookie', 'server-side'):
+        app = make_bench_app(mode, static_folder)
+        for path in ('/api/ping', '/static/app.css'):
+            cpu_ms, cookie_bytes = run(app, path, args.requests)
+            print(f"{mode:<30} {path:<16} {cpu_ms:10.3f}ms {cookie_bytes:18.0f} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Cold start: import time, create_app() and time-to-first-request with
+every blueprint imported at startup vs LAZY_BLUEPRINTS.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --factory app:create_app --path /api/catalog/courses --target-ms 1500
+
+Each measurement runs in a fresh interpreter so nothing is already in
+sys.modules. The import-time breakdown comes from `python -X importtime`
+and is summed per top-level package (self time), which is where a slow
+dependency shows up. Exits 1 when the lazy time-to-first-request median
+is above --target-ms.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.common import print_header
+
+
+def child(args):
+    """Runs in the subprocess: time import, create_app() and one request"""
+    import importlib
+
+    start = time.perf_counter()
+    module_name, factory_name = args.factory.split(':')
+    factory = getattr(importlib.import_module(module_name), factory_name)
+    imported = time.perf_counter()
+    app = factory()
+    created = time.perf_counter()
+    if args.init_db:
+        from extensions import db
+        with app.app_context():
+            db.create_all()
+        return
+    response = app.test_client().get(args.path)
+    served = time.perf_counter()
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'create_ms': (created - imported) * 1000,
+        'request_ms': (served - created) * 1000,
+        'total_ms': (served - start) * 1000,
+        'status': response.status_code,
+        'modules': len(sys.modules)
+    }))
+
+
+def run_child(args, env, extra=()):
+    command = [sys.executable, '-m', 'benchmarks.bench_startup', '--child',
+               '--factory', args.factory, '--path', args.path, *extra]
+    result = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    lines = result.stdout.strip().splitlines()
+    return json.loads(lines[-1]) if lines else None
+
+
+def import_breakdown(args, env):
+    """Self import time per top-level package, from -X importtime"""
+    module_name = args.factory.split(':')[0]
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module_name}'],
+                            env=env, capture_output=True, text=True, check=True)
+    totals = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        totals[name.strip().split('.')[0]] += int(self_us)
+    return sorted(totals.items(), key=lambda item: -item[1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--factory", default="app:create_app")
+    parser.add_argument("--path", default="/api/catalog/courses")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--target-ms", type=float, default=None,
+                        help="fail if the lazy time-to-first-request median is above this")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--init-db", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="studysync-startup-"), "startup.db"))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    run_child(args, env, ['--init-db'])
+
+    print_header(f"{args.factory}, first request GET {args.path}, {args.repeat} cold starts each")
+    print(f"{'mode':<10} {'import':>9} {'create_app':>11} {'1st request':>12} {'total':>9} {'modules':>8} {'status':>7}")
+    medians = {}
+    for mode in ('eager', 'lazy'):
+        mode_env = dict(env, LAZY_BLUEPRINTS='true' if mode == 'lazy' else 'false')
+        runs = [run_child(args, mode_env) for _ in range(args.repeat)]
+        median = {key: statistics.median(run[key] for run in runs)
+                  for key in ('import_ms', 'create_ms', 'request_ms', 'total_ms', 'modules')}
+        medians[mode] = median
+        print(f"{mode:<10} {median['import_ms']:8.0f}ms {median['create_ms']:10.0f}ms "
+              f"{median['request_ms']:11.0f}ms {median['total_ms']:8.0f}ms {median['modules']:8.0f} "
+              f"{runs[-1]['status']:>7}")
+
+    print()
+    print(f"Import time by top-level package (self, importing {args.factory.split(':')[0]}):")
+    for name, micros in import_breakdown(args, env)[:args.top]:
+        print(f"  {name:<30} {micros / 1000:8.1f}ms")
+
+    if args.target_ms is not None:
+        actual = medians['lazy']['total_ms']
+        if actual > args.target_ms:
+            print(f"\nFAIL: time-to-first-request {actual:.0f}ms is above the {args.target_ms:.0f}ms target")
+            sys.exit(1)
+        print(f"\nOK: time-to-first-request {actual:.0f}ms is within the {args.target_ms:.0f}ms target")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Study plans: regenerating every plan of a user and rewriting its
+StudyPlan.schedule JSON on each change vs the incremental engine in
+utils/study_planner.py.
+
+Each user has several concurrent plans spanning a semester; changes
+happen mid-semester (--elapsed days in). A logged study session only
+consumes planned rows; a moved exam reallocates from that day on and
+rewrites the (plan, day) groups that changed.
+
+    python -m benchmarks.bench_study_planner --users 50 --plans 4 --days 120
+"""
+import argparse
+import json
+import random
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import make_app, time_calls, summarize, print_header, print_row
+from extensions import db
+from models import User, StudyPlan, StudyPlanDay
+from utils import study_planner
+
+TOPICS = ["Graphs", "Trees", "Sorting", "Hashing", "Heaps", "Dynamic Programming", "Greedy",
+          "Recursion", "Limits", "Derivatives", "Integrals", "Series", "Vectors", "Matrices",
+          "Probability", "Statistics"]
+
+
+def populate(users, plans, days, topics, semester_start, rng):
+    db.session.execute(User.__table__.insert(), [
+        {'email': f"user{i}@uni.edu", 'password_hash': "x", 'profile_data': {'daily_study_hours': 4}}
+        for i in range(users)
+    ])
+    db.session.commit()
+    user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id).all()]
+    for user_id in user_ids:
+        for p in range(plans):
+            # Exams spread over the last weeks of the semester
+            exam = semester_start + timedelta(days=days - rng.randint(0, 21))
+            chosen = [(name, rng.choice([1.0, 1.5, 2.0]), None) for name in rng.sample(TOPICS, topics)]
+            plan = study_planner.create_plan(user_id, f"Plan {p}", exam, chosen, hours=rng.randint(40, 80),
+                                             today=semester_start)
+            plan.created_at = datetime.combine(semester_start, datetime.min.time())
+        db.session.commit()
+    return user_ids
+
+
+def regenerate_all(user_id, semester_start):
+    """Baseline: recompute every plan of the user from scratch and rewrite its schedule JSON"""
+    plans = StudyPlan.query.filter_by(user_id=user_id).all()
+    demands = [
+        study_planner.PlanDemand(plan.id, study_planner.exam_day(plan),
+                                 {t.topic: max(0.0, t.target_hours - (t.done_hours or 0)) for t in plan.topics})
+        for plan in plans
+    ]
+    allocation, _ = study_planner.allocate(demands, semester_start,
+                                           study_planner.daily_budget(db.session.get(User, user_id)))
+    by_plan = {plan.id: {} for plan in plans}
+    for (plan_id, day, topic), hours in allocation.items():
+        entry = by_plan[plan_id].setdefault(day, {'date': day.isoformat(), 'topics': [], 'hours': 0})
+        entry['topics'].append(topic)
+        entry['hours'] += hours
+    written = 0
+    for plan in plans:
+        plan.schedule = [by_plan[plan.id][day] for day in sorted(by_plan[plan.id])]
+        written += len(json.dumps(plan.schedule))
+    db.session.commit()
+    db.session.expunge_all()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--plans", type=int, default=4)
+    parser.add_argument("--topics", type=int, default=8)
+    parser.add_argument("--days", type=int, default=120, help="semester length")
+    parser.add_argument("--elapsed", type=int, default=60, help="days into the semester when changes happen")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = make_app()
+    rng = random.Random(args.seed)
+    semester_start = date.today()
+    today = semester_start + timedelta(days=args.elapsed)
+    with app.app_context():
+        user_ids = populate(args.users, args.plans, args.days, args.topics, semester_start, rng)
+        rows = StudyPlanDay.query.count()
+        print_header(f"{args.users} users x {args.plans} plans x {args.topics} topics, "
+                     f"{args.days}-day semester, day {args.elapsed}; {rows} planned rows")
+
+        sizes = []
+        print_row("regenerate + rewrite JSON", summarize(time_calls(
+            lambda: sizes.append(regenerate_all(rng.choice(user_ids), semester_start)), args.repeat
+        )))
+        print(f"{'':<32} {sum(sizes) / len(sizes) / 1024:8.1f} KB of schedule JSON written per change")
+
+        def log_study():
+            user_id = rng.choice(user_ids)
+            plan = StudyPlan.query.filter_by(user_id=user_id).first()
+            topic = rng.choice(plan.topics).topic
+            study_planner.record_study([(user_id, today, rng.randint(30, 120), [topic])])
+            touched.append(len(db.session.dirty) + len(db.session.deleted))
+            db.session.commit()
+            db.session.expunge_all()
+
+        touched = []
+        print_row("log study time (incremental)", summarize(time_calls(log_study, args.repeat)))
+        print(f"{'':<32} {sum(touched) / len(touched):8.1f} rows written per logged session")
+
+        rewritten = []
+
+        def move_exam():
+            user_id = rng.choice(user_ids)
+            plan = StudyPlan.query.filter_by(user_id=user_id).first()
+            new_date = study_planner.exam_day(plan) + timedelta(days=rng.choice([-3, -1, 2, 5]))
+            rewritten.append(study_planner.move_exam(plan, new_date, today=today))
+            db.session.commit()
+            db.session.expunge_all()
+
+        print_row("move exam (replan from today)", summarize(time_calls(move_exam, args.repeat)))
+        total_days = args.plans * (args.days - args.elapsed)
+        print(f"{'':<32} {sum(rewritten) / len(rewritten):8.1f} of ~{total_days} remaining (plan, day) groups rewritten")
+
+        demands = [
+            study_planner.PlanDemand(p, semester_start + timedelta(days=args.days - p),
+                                     {topic: 10.0 for topic in TOPICS[:args.topics]})
+            for p in range(args.plans)
+        ]
+        print_row("allocate() only, full semester", summarize(time_calls(
+            lambda: study_planner.allocate(demands, semester_start, lambda day: 4.0), args.repeat
+        )))
+
+
+if __name__ == "__main__":
+    main()
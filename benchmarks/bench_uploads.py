@@ -0,0 +1,100 @@
+"""
+Uploads: buffering the whole request body before writing it vs
+streaming it to disk in CHUNK_SIZE chunks with save_stream().
+
+Reports latency and peak Python memory per upload. Text extraction and
+thumbnails run in the ingestion process pool either way and are not
+part of the request. A second run uploads a course's slides many times
+over and compares disk usage of one file per upload with the
+content-addressed blob store.
+
+    python -m benchmarks.bench_uploads --size-mb 16 --uploads 200 --distinct 20
+"""
+import argparse
+import io
+import os
+import shutil
+import random
+import tempfile
+import tracemalloc
+import uuid
+
+from werkzeug.wsgi import LimitedStream
+
+from benchmarks.common import time_calls, summarize, print_header, print_row
+from utils.ingest import save_stream, CHUNK_SIZE
+
+
+def buffered_save_as(body, folder, name):
+    data = LimitedStream(io.BytesIO(body), len(body)).read()
+    with open(os.path.join(folder, name + ".pdf"), "wb") as out:
+        out.write(data)
+
+
+def buffered_save(body, folder):
+    """Baseline: read the whole body into memory, then write it out"""
+    buffered_save_as(body, folder, "upload")
+
+
+def streamed_save(body, folder):
+    save_stream(LimitedStream(io.BytesIO(body), len(body)), folder, "upload.pdf", len(body))
+
+
+def disk_usage(folder):
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(folder) for name in names)
+
+
+def dedup_run(args):
+    rng = random.Random(42)
+    slides = [b"%PDF-1.4\n" + os.urandom(args.dedup_size_kb * 1024) for _ in range(args.distinct)]
+    uploads = [rng.choice(slides) for _ in range(args.uploads)]
+    print_header(f"{args.uploads} uploads of {args.distinct} distinct {args.dedup_size_kb} KB files")
+
+    for label, save in (
+        ("one file per upload", lambda body, folder: buffered_save_as(body, folder, uuid.uuid4().hex)),
+        ("content-addressed store", streamed_save)
+    ):
+        folder = tempfile.mkdtemp(prefix="studysync-bench-")
+        try:
+            queue = iter(uploads)
+            samples = time_calls(lambda: save(next(queue), folder), len(uploads))
+            print_row(label, summarize(samples))
+            print(f"{'':<32} disk used={disk_usage(folder) / 1024 / 1024:8.2f} MB")
+        finally:
+            shutil.rmtree(folder)
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=20)
+    parser.add_argument("--dedup-size-kb", type=int, default=2048)
+    args = parser.parse_args()
+
+    body = b"%PDF-1.4\n" + os.urandom(args.size_mb * 1024 * 1024 - 9)
+    folder = tempfile.mkdtemp(prefix="studysync-bench-")
+    try:
+        print_header(f"{args.size_mb} MB upload, {CHUNK_SIZE // 1024} KB chunks")
+        for label, fn in (("buffer whole body", buffered_save), ("stream to disk", streamed_save)):
+            print_row(label, summarize(time_calls(lambda: fn(body, folder), args.repeat)))
+            peak = peak_memory(lambda: fn(body, folder))
+            print(f"{'':<32} peak memory={peak / 1024 / 1024:8.2f} MB")
+    finally:
+        shutil.rmtree(folder)
+
+    dedup_run(args)
+
+
+if __name__ == "__main__":
+    main()
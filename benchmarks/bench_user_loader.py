@@ -0,0 +1,82 @@
+"""
+Authenticated requests: User.query.get() in the user loader on every
+request vs the per-process user cache.
+
+Requests/sec on a trivial @login_required endpoint through the Flask test
+client; the user has a sizeable profile_data to show the cost of loading
+the whole row.
+
+    python -m benchmarks.bench_user_loader --requests 5000
+"""
+import argparse
+import time
+
+from flask_login import LoginManager, current_user, login_required
+
+from benchmarks.common import make_app, time_calls, summarize, print_header, print_row
+from extensions import db
+from models import User
+from utils.query_profiler import count_queries
+from utils.user_cache import init_user_cache
+
+
+def make_bench_app(database_url, cached):
+    app = make_app(database_url, reset=False)
+    app.config['SECRET_KEY'] = 'bench'
+    login_manager = LoginManager(app)
+
+    if cached:
+        cache = init_user_cache(app)
+        login_manager.user_loader(cache.load)
+    else:
+        @login_manager.user_loader
+        def load_user(user_id):
+            return User.query.get(int(user_id))
+
+    @app.route('/ping')
+    @login_required
+    def ping():
+        return str(current_user.id)
+
+    return app
+
+
+def run(app, user_id, requests):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    client.get('/ping')
+
+    with count_queries() as stats:
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get('/ping')
+        elapsed = time.perf_counter() - start
+    samples = time_calls(lambda: client.get('/ping'), min(requests, 1000))
+    return requests / elapsed, stats.count / float(requests), samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--profile-kb", type=int, default=16)
+    args = parser.parse_args()
+
+    setup = make_app()
+    database_url = setup.config['SQLALCHEMY_DATABASE_URI']
+    with setup.app_context():
+        profile = {'bio': 'x' * (args.profile_kb * 1024), 'courses': list(range(50))}
+        user = User(email="bench@uni.edu", password_hash="x" * 100, profile_data=profile)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    print_header(f"{args.requests} authenticated requests, {args.profile_kb} KB profile_data")
+    for label, cached in (("User.query.get per request", False), ("cached user loader", True)):
+        rate, queries, samples = run(make_bench_app(database_url, cached), user_id, args.requests)
+        print_row(label, summarize(samples))
+        print(f"{'':<32} {rate:8.0f} req/s  {queries:.2f} queries/request")
+
+
+if __name__ == "__main__":
+    main()
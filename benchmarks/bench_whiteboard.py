@@ -0,0 +1,109 @@
+"""
+Whiteboard bytes-on-wire and events/sec: raw `draw` relay vs batched strokes.
+
+One client draws continuous pen strokes (one `draw` per pointer move,
+about every --interval-ms) while --viewers other clients watch. Sizes
+are measured on the encoded Socket.IO packets each viewer receives.
+
+    python -m benchmarks.bench_whiteboard --segments 2000 --viewers 5
+"""
+import argparse
+import time
+
+from flask_socketio import SocketIO, emit
+from socketio import packet
+
+import events
+from benchmarks.common import make_app, print_header
+from extensions import login_manager
+from utils.chat_history import init_chat_history
+from utils.presence import MemoryPresenceStore, init_presence
+from utils.room_sessions import init_room_sessions
+from utils.whiteboard import MemoryStrokeLog, init_whiteboard, encode_for_wire
+
+
+def legacy_draw(data):
+    """The previous handler: relay every payload as its own event"""
+    emit('draw', data, room=str(data.get('room_id')), include_self=False)
+
+
+def make_server(mode, batch_ms):
+    app = make_app()
+    app.config['WHITEBOARD_BATCH_MS'] = batch_ms
+    login_manager.init_app(app)
+    # Benchmark clients are anonymous
+    login_manager.user_loader(lambda user_id: None)
+    socketio = SocketIO(app, async_mode='threading')
+    init_presence(app, MemoryPresenceStore())
+    init_whiteboard(app, MemoryStrokeLog())
+    init_chat_history(app)
+    init_room_sessions(app)
+    socketio.on('join')(events.on_join)
+    socketio.on('draw')(legacy_draw if mode == 'legacy' else events.on_draw)
+    return app, socketio
+
+
+def packet_size(event, binary=False):
+    args = list(event['args'])
+    if binary and event['name'] == 'draw_batch':
+        args[0] = dict(args[0], strokes=encode_for_wire(args[0]['strokes'], binary=True))
+    pkt = packet.Packet(packet.EVENT, data=[event['name']] + args)
+    encoded = pkt.encode()
+    if isinstance(encoded, list):
+        return sum(len(part) for part in encoded)
+    return len(encoded)
+
+
+def run(mode, args):
+    app, socketio = make_server(mode, args.batch_ms)
+    drawer = socketio.test_client(app)
+    viewers = [socketio.test_client(app) for _ in range(args.viewers)]
+    for i, client in enumerate([drawer] + viewers):
+        client.emit('join', {'username': f"user{i}", 'room_id': 1})
+    for client in viewers:
+        client.get_received()
+
+    start = time.perf_counter()
+    x, y = 100, 100
+    for n in range(args.segments):
+        nx, ny = x + (n % 7) - 3, y + (n % 5) - 2
+        drawer.emit('draw', {'room_id': 1, 'x0': x, 'y0': y, 'x1': nx, 'y1': ny, 'color': '#1e88e5', 'size': 3})
+        x, y = nx, ny
+        time.sleep(args.interval_ms / 1000.0)
+    time.sleep(max(args.batch_ms, 1) * 4 / 1000.0)
+    elapsed = time.perf_counter() - start
+
+    received = [e for e in viewers[0].get_received() if e['name'] in ('draw', 'draw_batch')]
+    total_bytes = sum(packet_size(e) for e in received)
+    # Binary frames carry the same batches with varint-packed point lists
+    binary_bytes = sum(packet_size(e, binary=True) for e in received)
+    strokes = sum(len(e['args'][0]['strokes']) if e['name'] == 'draw_batch' else 1 for e in received)
+    return {
+        'events': len(received),
+        'strokes': strokes,
+        'bytes': total_bytes,
+        'binary_bytes': binary_bytes,
+        'events_per_sec': len(received) / elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, default=2000)
+    parser.add_argument("--viewers", type=int, default=5)
+    parser.add_argument("--interval-ms", type=float, default=1.0)
+    parser.add_argument("--batch-ms", type=int, default=25)
+    args = parser.parse_args()
+
+    print_header(f"{args.segments} draw events, {args.viewers} viewers, {args.batch_ms}ms batches")
+    print(f"{'mode':<16}{'events/viewer':>14}{'strokes':>10}{'bytes/viewer':>14}{'events/s':>12}")
+    legacy = run('legacy', args)
+    batched = run('batched', args)
+    rows = [('legacy', legacy, legacy['bytes']), ('batched', batched, batched['bytes']),
+            ('batched+binary', batched, batched['binary_bytes'])]
+    for mode, result, size in rows:
+        print(f"{mode:<16}{result['events']:>14}{result['strokes']:>10}{size:>14}{result['events_per_sec']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a bare Flask app with only the database
+initialised, so they can be run without the full blueprint set:
+
+    python -m benchmarks.bench_search
+
+Set BENCH_DATABASE_URL to benchmark against PostgreSQL instead of a
+throwaway SQLite file. Benchmarks drop and recreate every table, so a
+database other than a throwaway SQLite file is only used with
+BENCH_ALLOW_DROP=1 as well:
+
+    BENCH_ALLOW_DROP=1 BENCH_DATABASE_URL=postgresql://localhost/studysync_bench python -m benchmarks.bench_search
+"""
+import os
+import statistics
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy.engine import make_url
+
+from config import Config
+from extensions import db
+
+
+def temp_database_url():
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="studysync-bench-"), "bench.db")
+        url = f"sqlite:///{path}"
+    return url
+
+
+def is_scratch_database(url):
+    """True for in-memory SQLite and SQLite files in the temp directory"""
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite':
+        return False
+    if url.database in (None, '', ':memory:'):
+        return True
+    tmp = os.path.realpath(tempfile.gettempdir())
+    return os.path.realpath(url.database).startswith(tmp + os.sep)
+
+
+def make_app(database_url=None, reset=True):
+    """Bare app with the database initialised; reset drops and recreates all tables"""
+    database_url = database_url or temp_database_url()
+    if reset and not is_scratch_database(database_url) and os.getenv("BENCH_ALLOW_DROP") != "1":
+        raise SystemExit(f"Refusing to drop every table in {make_url(database_url).render_as_string()}; "
+                         f"set BENCH_ALLOW_DROP=1 if it is a scratch database")
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    db.init_app(app)
+
+    if reset:
+        with app.app_context():
+            import models  # noqa: F401  (register tables)
+            db.drop_all()
+            db.create_all()
+    return app
+
+
+def create_tree_app():
+    """app.create_app() with the BLUEPRINTS whose modules import in this tree"""
+    import importlib
+    from app import BLUEPRINTS, create_app
+    present, skipped = [], []
+    for spec in BLUEPRINTS:
+        module = spec[0].split(':')[0]
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            skipped.append(f'{spec[0]} ({e})')
+            continue
+        present.append(spec)
+    if skipped:
+        print("Skipping blueprints that do not import:\n  " + "\n  ".join(skipped))
+    return create_app(blueprints=present)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_calls(fn, repeat):
+    """Call fn() `repeat` times and return per-call latencies in ms"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    return {
+        'p50': percentile(samples, 50),
+        'p95': percentile(samples, 95),
+        'p99': percentile(samples, 99),
+        'mean': statistics.fmean(samples) if samples else 0.0
+    }
+
+
+def print_header(title):
+    print("\n" + "=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def print_row(label, stats):
+    print(f"{label:<32} p50={stats['p50']:8.2f}ms  p95={stats['p95']:8.2f}ms  p99={stats['p99']:8.2f}ms")
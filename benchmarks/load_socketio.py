@@ -0,0 +1,170 @@
+"""
+Load test: room broadcasts across several SocketIO workers.
+
+Each "worker" is its own Flask app + SocketIO server; they share an
+InProcessBroker (standing in for Redis) and one presence store, exactly
+as separate gunicorn workers would share SOCKETIO_MESSAGE_QUEUE and
+PRESENCE_URL. Clients are spread round-robin over the workers, and
+every `message` must reach every client in the room and every `draw`
+stroke must reach every other client (via batched `draw_batch` events).
+One client more than the room's capacity must be turned away, and
+disconnecting must leave the room empty.
+
+    python -m benchmarks.load_socketio --workers 4 --clients 40 --messages 200
+"""
+import argparse
+import random
+import time
+
+from flask_socketio import SocketIO
+
+import events
+from benchmarks.common import make_app, temp_database_url, print_header
+from extensions import db, login_manager
+from models import ChatMessage, Course, StudyRoom
+from utils.chat_history import init_chat_history
+from utils.message_queue import InProcessBroker, InProcessManager
+from utils.presence import MemoryPresenceStore, init_presence
+from utils.room_sessions import init_room_sessions
+from utils.whiteboard import MemoryStrokeLog, init_whiteboard
+
+EVENT_HANDLERS = [
+    ('join', events.on_join),
+    ('leave', events.on_leave),
+    ('disconnect', events.on_disconnect),
+    ('message', events.on_message),
+    ('history', events.on_history),
+    ('draw', events.on_draw),
+    ('clear_board', events.on_clear)
+]
+
+
+def make_worker(database_url, broker, store, stroke_log, batch_ms):
+    app = make_app(database_url, reset=False)
+    app.config['WHITEBOARD_BATCH_MS'] = batch_ms
+    login_manager.init_app(app)
+    # Load-test clients are anonymous
+    login_manager.user_loader(lambda user_id: None)
+    socketio = SocketIO(app, client_manager=InProcessManager(broker), async_mode='threading')
+    init_presence(app, store)
+    init_whiteboard(app, stroke_log)
+    init_chat_history(app)
+    init_room_sessions(app)
+    for name, handler in EVENT_HANDLERS:
+        socketio.on(name)(handler)
+    return app, socketio
+
+
+def drain(clients, expected, timeout):
+    """Collect received events per client until each has `expected` or timeout"""
+    received = {i: [] for i in range(len(clients))}
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for i, client in enumerate(clients):
+            received[i].extend(client.get_received())
+        if all(len(events_) >= expected(i) for i, events_ in received.items()):
+            break
+        time.sleep(0.01)
+    return received
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=40)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--batch-ms", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    broker = InProcessBroker()
+    store = MemoryPresenceStore()
+    stroke_log = MemoryStrokeLog()
+    database_url = temp_database_url()
+    with make_app(database_url).app_context():
+        course = Course(name="Load Test", code="LOAD101")
+        db.session.add(course)
+        db.session.commit()
+        db.session.add(StudyRoom(name="Load Test Room", course_id=course.id, max_participants=args.clients))
+        db.session.commit()
+    workers = [make_worker(database_url, broker, store, stroke_log, args.batch_ms) for _ in range(args.workers)]
+
+    clients = []
+    for i in range(args.clients):
+        app, socketio = workers[i % args.workers]
+        clients.append(socketio.test_client(app))
+
+    room_id = 1
+    for i, client in enumerate(clients):
+        client.emit('join', {'username': f"user{i}", 'room_id': room_id})
+    # presence_diff (own and later joiners'), presence, whiteboard_state, history
+    joins = drain(clients, lambda i: 4 + (args.clients - i - 1), timeout=10)
+    diffs = min(sum(e['name'] == 'presence_diff' for e in got) for got in joins.values())
+
+    members = store.members(str(room_id))
+    print_header(f"{args.workers} workers, {args.clients} clients, {args.messages} messages + draws")
+    print(f"presence: {len(members)}/{args.clients} members visible to every worker")
+
+    extra = workers[0][1].test_client(workers[0][0])
+    extra.emit('join', {'username': "latecomer", 'room_id': room_id})
+    turned_away = [e['name'] for e in extra.get_received()] == ['room_full']
+    extra.disconnect()
+    print(f"capacity: client {args.clients + 1} {'turned away' if turned_away else 'ADMITTED'}")
+
+    senders = [rng.randrange(args.clients) for _ in range(args.messages)]
+    start = time.perf_counter()
+    for n, sender in enumerate(senders):
+        clients[sender].emit('message', {'username': f"user{sender}", 'msg': f"hello {n}", 'room_id': room_id})
+        clients[sender].emit('draw', {
+            'room_id': room_id, 'username': f"user{sender}", 'seq': n,
+            'x0': n, 'y0': n, 'x1': n + 1, 'y1': n + 1
+        })
+
+    def strokes_from_others(i, got):
+        return sorted(
+            stroke['style']['seq']
+            for e in got if e['name'] == 'draw_batch'
+            for stroke in e['args'][0]['strokes']
+            if stroke['style']['username'] != f"user{i}"
+        )
+
+    want_draws = {i: sorted(n for n, sender in enumerate(senders) if sender != i) for i in range(args.clients)}
+    received = {i: [] for i in range(args.clients)}
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        for i, client in enumerate(clients):
+            received[i].extend(client.get_received())
+        if all(strokes_from_others(i, got) == want_draws[i] for i, got in received.items()):
+            break
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    failures = 0
+    for i, got in received.items():
+        # The test client unwraps 'message' payloads but not other events
+        messages = sorted(e['args']['msg'] for e in got if e['name'] == 'message')
+        if len(messages) != args.messages or strokes_from_others(i, got) != want_draws[i]:
+            failures += 1
+
+    delivered = sum(len(got) for got in received.values())
+    state = stroke_log.state(str(room_id))
+    print(f"whiteboard log: {len(state[0])} snapshot strokes + {len(state[1])} tail strokes")
+    for app, _ in workers:
+        app.extensions['chat_history'].flush()
+    with workers[0][0].app_context():
+        persisted = ChatMessage.query.count()
+    print(f"chat history: {persisted}/{args.messages} messages persisted")
+    print(f"delivered {delivered} events in {elapsed:.2f}s ({delivered / elapsed:.0f} events/s)")
+    print(f"clients with missing or extra events: {failures}")
+    for client in clients:
+        client.disconnect()
+    remaining = store.count(str(room_id))
+    print(f"after disconnect: {remaining} members left in the room")
+    broken = not turned_away or remaining or diffs < 1
+    if failures or broken or len(members) != args.clients or persisted != args.messages:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
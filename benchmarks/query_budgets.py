@@ -0,0 +1,172 @@
+"""
+Query budgets: the maximum number of SQL statements each endpoint may
+run, and a check that the count does not grow with the data.
+
+    python -m benchmarks.query_budgets              # exits 1 on a regression
+    python -m benchmarks.query_budgets --rows 50 --factory app:create_app
+
+Every endpoint in BUDGETS is requested after seeding --rows rows of each
+kind, then again after doubling them. It fails when it runs more
+statements than its budget, more statements at 2x rows than at 1x (a
+query per row, i.e. an N+1), or answers 404 (the endpoint is gone, so
+its budget guards nothing). The first section prints lazy vs projected
+counts for the list views in utils/list_views.py that serialize a
+relationship.
+
+The default factory is benchmarks.common:create_tree_app, which leaves
+out blueprints whose modules do not import.
+"""
+import os
+import tempfile
+
+# Config reads DATABASE_URL at import time, so point it at a scratch database first
+os.environ.setdefault(
+    "DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="studysync-budgets-"), "budgets.db")
+)
+
+import argparse  # noqa: E402
+import importlib  # noqa: E402
+import sys  # noqa: E402
+from datetime import datetime, timedelta  # noqa: E402
+
+from sqlalchemy import or_  # noqa: E402
+
+from extensions import db  # noqa: E402
+from models import (User, Course, Note, Flashcard, StudyPartner, StudyRoom, ChatMessage,  # noqa: E402
+                    Resource, Analytics)
+from utils.list_views import NOTES, FLASHCARDS, RESOURCES, PARTNERS  # noqa: E402
+from utils.query_profiler import count_queries  # noqa: E402
+
+# (path, max statements). {course_id} and {room_id} are filled in from the seed data.
+# Budgets include the user_loader query of authenticated requests.
+BUDGETS = [
+    ('/api/catalog/courses', 2),
+    ('/api/list/notes', 3),
+    ('/api/list/flashcards', 3),
+    ('/api/list/partners', 3),
+    ('/api/list/resources', 3),
+    ('/api/flashcards/due', 3),
+    ('/api/achievements/progress', 4),
+    ('/api/analytics/dashboard', 6),
+    ('/api/rooms/{room_id}/messages', 4),
+    ('/api/exam-predictor/{course_id}/predictions', 3),
+]
+
+
+def seed(user_id, course_id, room_id, rows, offset):
+    """Add `rows` of each kind for user_id, numbered from offset"""
+    others = [User(email=f"partner{offset + i}@uni.edu", password_hash="x") for i in range(rows)]
+    db.session.add_all(others)
+    db.session.flush()
+    notes = [Note(user_id=user_id, course_id=course_id, title=f"Note {offset + i}",
+                  content=f"Lecture {offset + i} covers binary search trees and hashing.") for i in range(rows)]
+    db.session.add_all(notes)
+    db.session.flush()
+    db.session.add_all(
+        [Flashcard(user_id=user_id, note_id=note.id, front="Q", back="A") for note in notes]
+        + [StudyPartner(user1_id=user_id, user2_id=other.id, status='accepted') for other in others]
+        + [Resource(course_id=course_id, uploader_id=user_id, title=f"Slides {offset + i}",
+                    file_path=f"/tmp/slides{offset + i}.pdf", file_type="pdf") for i in range(rows)]
+        + [ChatMessage(message_uid=f"m{offset + i}", room_id=room_id, user_id=user_id, username="bench",
+                       message=f"message {offset + i}") for i in range(rows)]
+        + [Analytics(user_id=user_id, date=(datetime.utcnow() - timedelta(days=offset + i)).date(),
+                     study_time=30, topics_covered=["Trees"]) for i in range(rows)]
+    )
+    db.session.commit()
+
+
+def loader_counts(user_id, course_id):
+    """Statements needed to serialize each list lazily vs projected by its ListView"""
+    cases = [
+        (PARTNERS, ['id', 'partner_email'],
+         StudyPartner.query.filter(or_(StudyPartner.user1_id == user_id, StudyPartner.user2_id == user_id))),
+        (NOTES, ['id', 'title', 'course_name'], Note.query.filter(Note.user_id == user_id)),
+        (FLASHCARDS, ['id', 'front', 'note_title'], Flashcard.query.filter(Flashcard.user_id == user_id)),
+        (RESOURCES, ['id', 'title', 'course_name'], Resource.query.filter(Resource.course_id == course_id)),
+    ]
+    print(f"{'list':<32} {'lazy':>6} {'eager':>6}")
+    for view, names, query in cases:
+        counts = []
+        for load in (query, view.project(query, names)):
+            db.session.expunge_all()
+            with count_queries() as stats:
+                for row in load.all():
+                    view.serialize(row, names, user_id)
+            counts.append(stats.count)
+        print(f"{view.name + ' (' + ','.join(names[1:]) + ')':<32} {counts[0]:>6} {counts[1]:>6}")
+
+
+def measure(client, paths):
+    counts = {}
+    for path in paths:
+        with count_queries() as stats:
+            response = client.get(path)
+        counts[path] = (response.status_code, stats.count, stats.repeated(3))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=25)
+    parser.add_argument("--factory", default="benchmarks.common:create_tree_app",
+                        help="module:function building the app")
+    args = parser.parse_args()
+
+    module, function = args.factory.split(":")
+    app = getattr(importlib.import_module(module), function)()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.create_all()
+        user = User(email="budget@uni.edu", password_hash="x")
+        course = Course(name="Algorithms", code="BUDGET101")
+        db.session.add_all([user, course])
+        db.session.flush()
+        room = StudyRoom(course_id=course.id, name="Room")
+        db.session.add(room)
+        db.session.commit()
+        ids = {'user_id': user.id, 'course_id': course.id, 'room_id': room.id}
+
+        seed(ids['user_id'], ids['course_id'], ids['room_id'], args.rows, 0)
+        print(f"\nLoader strategies ({args.rows} rows)")
+        loader_counts(ids['user_id'], ids['course_id'])
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(ids['user_id'])
+        session['_fresh'] = True
+
+    paths = [path.format(**ids) for path, _ in BUDGETS]
+    first = measure(client, paths)
+    with app.app_context():
+        seed(ids['user_id'], ids['course_id'], ids['room_id'], args.rows, args.rows)
+    second = measure(client, paths)
+
+    print(f"\n{'endpoint':<48} {'status':>6} {'1x':>4} {'2x':>4} {'budget':>6}")
+    failures = []
+    for (template, budget), path in zip(BUDGETS, paths):
+        status, count, repeated = first[path]
+        _, count_2x, repeated_2x = second[path]
+        if status == 404:
+            verdict = "MISSING"
+        elif status >= 400:
+            verdict = f"STATUS {status}"
+        elif count_2x > budget or count > budget:
+            verdict = "OVER BUDGET"
+        elif count_2x > count:
+            verdict = "N+1"
+        else:
+            verdict = "ok"
+        print(f"{path:<48} {status:>6} {count:>4} {count_2x:>4} {budget:>6}  {verdict}")
+        if verdict != "ok":
+            failures.append(path)
+            for statement, times in repeated_2x:
+                print(f"    {times} x {statement[:100]}")
+
+    if failures:
+        print(f"\n{len(failures)} endpoint(s) failed their query budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
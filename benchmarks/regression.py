@@ -0,0 +1,266 @@
+"""
+Performance regression suite: REST and SocketIO hot paths, in process,
+compared against a stored baseline.
+
+    python -m benchmarks.regression --update-baseline   # record benchmarks/baseline.json
+    python -m benchmarks.regression                     # exits 1 on a regression
+
+The app is built by --factory against a scratch database filled by
+utils/synthetic_data.py, then every scenario is driven through the
+Flask test client (REST), the Flask-SocketIO test client (room events)
+or a direct call inside a request context (search and partner matching,
+which have no route of their own in this tree) by --clients signed-in
+users in turn. Each scenario reports throughput, p50/p95/p99 latency and
+SQL statements per call.
+
+The default factory, benchmarks.common:create_tree_app, is create_app()
+with every blueprint in BLUEPRINTS whose module imports, so the suite
+also runs on a partial checkout; the skipped modules are listed at
+startup with the reason. Pass --factory app:create_app to require all
+of them.
+
+A run fails when a scenario runs more statements per call than in the
+baseline, its p95 is more than --tolerance slower (and at least
+--min-ms, so sub-millisecond noise doesn't count), or it answers with a
+different status (a baseline 200 turning into a 404 included). A
+scenario whose endpoint answers 404 always fails, baseline or not, so a
+route that silently dropped out of the app cannot pass. Latency
+baselines only mean something on the machine that recorded them; record
+one per CI runner.
+"""
+import os
+import tempfile
+
+# Config reads DATABASE_URL at import time. The run fills the database with generated
+# rows, so it never uses DATABASE_URL itself: a scratch SQLite file, or an empty
+# database given as BENCH_DATABASE_URL
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or (
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="studysync-regression-"), "regression.db")
+)
+
+import argparse  # noqa: E402
+import importlib  # noqa: E402
+import json  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+from datetime import date  # noqa: E402
+
+from benchmarks.common import summarize, print_header  # noqa: E402
+from extensions import db, socketio  # noqa: E402
+from models import Course, StudyRoom, User  # noqa: E402
+from utils import partner_graph, search_index  # noqa: E402
+from utils.query_profiler import count_queries  # noqa: E402
+from utils.synthetic_data import generate  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+END_DATE = date(2026, 1, 31)  # fixed so every run generates the same rows
+
+# (name, method, path, body). Paths and bodies are filled in per client.
+REST_SCENARIOS = [
+    ('flashcards.due', 'GET', '/api/flashcards/due', None),
+    ('analytics.dashboard', 'GET', '/api/analytics/dashboard?days=30', None),
+    ('catalog.courses', 'GET', '/api/catalog/courses', None),
+    ('list.notes', 'GET', '/api/list/notes', None),
+]
+CALL_SCENARIOS = ['search_index.search', 'partner_graph.find']
+SOCKET_SCENARIOS = ['room.join', 'room.message', 'room.draw']
+SEARCH_TERMS = ['graphs', 'derivatives', 'mitosis', 'equilibrium', 'momentum', 'memory']
+
+
+def fill(value, values):
+    if isinstance(value, str):
+        return value.format(**values)
+    if isinstance(value, dict):
+        return {key: fill(item, values) for key, item in value.items()}
+    return value
+
+
+class Client:
+    """One signed-in user with an HTTP and a SocketIO test client"""
+
+    def __init__(self, app, user_id, email, room_id, index):
+        self.app = app
+        self.user_id = user_id
+        self.http = app.test_client()
+        with self.http.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        self.socket = socketio.test_client(app, flask_test_client=self.http)
+        self.values = {'email': email, 'term': SEARCH_TERMS[index % len(SEARCH_TERMS)]}
+        self.username = f'student{user_id}'
+        self.room_id = room_id
+        self.seq = 0
+
+    def rest(self, method, path, body):
+        response = self.http.open(fill(path, self.values), method=method, json=fill(body, self.values))
+        return response.status_code
+
+    def call(self, scenario):
+        with self.app.test_request_context():
+            if scenario == 'search_index.search':
+                start = time.perf_counter()
+                search_index.search_notes(self.user_id, self.values['term'])
+            else:
+                # Time the top-k query itself, not a cache hit
+                partner_graph.invalidate(self.user_id)
+                start = time.perf_counter()
+                partner_graph.find_partners(self.user_id)
+        return 200, start
+
+    def emit(self, scenario):
+        room = {'room_id': self.room_id, 'username': self.username}
+        self.seq += 1
+        if scenario == 'room.join':
+            self.socket.emit('leave', room)
+            self.socket.get_received()
+            start = time.perf_counter()
+            self.socket.emit('join', room)
+            return 200, start
+        start = time.perf_counter()
+        if scenario == 'room.message':
+            self.socket.emit('message', dict(room, msg=f'message {self.seq}'))
+        else:
+            self.socket.emit('draw', dict(room, seq=self.seq, x0=self.seq, y0=0, x1=self.seq + 1, y1=1))
+        return 200, start
+
+
+def run_scenario(clients, call, requests, warmup):
+    """Call call(client) round-robin over clients; returns the scenario's stats"""
+    for i in range(warmup):
+        call(clients[i % len(clients)])
+    samples = []
+    queries = 0
+    statuses = set()
+    started = time.perf_counter()
+    for i in range(requests):
+        with count_queries() as stats:
+            status, start = call(clients[i % len(clients)])
+        samples.append((time.perf_counter() - start) * 1000)
+        queries += stats.count
+        statuses.add(status)
+    elapsed = time.perf_counter() - started
+    result = summarize(samples)
+    result.update({
+        'status': max(statuses),
+        'rps': requests / elapsed if elapsed else 0.0,
+        'queries': queries / requests
+    })
+    return result
+
+
+def seed(options):
+    generate(seed=options.seed, end_date=END_DATE, users=options.users, courses=options.courses,
+             notes_per_user=options.notes_per_user, defer_indexes=True)
+    # Bulk loads skip the mapper events that maintain the search index
+    search_index.rebuild_index()
+    course_id = db.session.query(Course.id).order_by(Course.id).first()[0]
+    room = StudyRoom(name="Regression Room", course_id=course_id, max_participants=options.clients + 1)
+    db.session.add(room)
+    db.session.commit()
+    users = User.query.order_by(User.id).limit(options.clients).all()
+    return [(user.id, user.email) for user in users], room.id
+
+
+def compare(results, baseline, tolerance, min_ms):
+    """Verdict per scenario against the baseline results"""
+    verdicts = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if result['status'] >= 500:
+            verdicts[name] = 'ERROR'
+        elif result['status'] == 404:
+            verdicts[name] = 'MISSING'
+        elif base is not None and result['status'] != base['status']:
+            verdicts[name] = f"STATUS {base['status']}->{result['status']}"
+        elif base is None:
+            verdicts[name] = 'new'
+        elif result['queries'] > base['queries'] + 1e-9:
+            verdicts[name] = 'MORE QUERIES'
+        elif result['p95'] > base['p95'] * (1 + tolerance) and result['p95'] - base['p95'] >= min_ms:
+            verdicts[name] = 'SLOWER'
+        else:
+            verdicts[name] = 'ok'
+    return verdicts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--factory", default="benchmarks.common:create_tree_app",
+                        help="module:function building the app")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--courses", type=int, default=50)
+    parser.add_argument("--notes-per-user", type=float, default=20)
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200, help="measured calls per scenario")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="ignore p95 increases smaller than this")
+    args = parser.parse_args()
+
+    module, function = args.factory.split(":")
+    app = getattr(importlib.import_module(module), function)()
+    app.config['TESTING'] = True
+    options = {key: getattr(args, key) for key in ('users', 'courses', 'notes_per_user', 'clients', 'seed')}
+
+    with app.app_context():
+        db.create_all()
+        users, room_id = seed(args)
+    clients = [Client(app, user_id, email, room_id, i) for i, (user_id, email) in enumerate(users)]
+    for client in clients:
+        client.socket.emit('join', {'room_id': room_id, 'username': client.username})
+
+    results = {}
+    for name, method, path, body in REST_SCENARIOS:
+        def call(client):
+            start = time.perf_counter()
+            return client.rest(method, path, body), start
+        results[name] = run_scenario(clients, call, args.requests, args.warmup)
+    for name in CALL_SCENARIOS:
+        results[name] = run_scenario(clients, lambda client: client.call(name), args.requests, args.warmup)
+    for name in SOCKET_SCENARIOS:
+        results[name] = run_scenario(clients, lambda client: client.emit(name), args.requests, args.warmup)
+        for client in clients:
+            client.socket.get_received()
+    for client in clients:
+        client.socket.disconnect()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored.get('options') != options:
+            print(f"{args.baseline} was recorded with {stored.get('options')}, not {options}; "
+                  f"rerun with the same options or --update-baseline")
+            sys.exit(2)
+        baseline = stored['results']
+    verdicts = compare(results, baseline, args.tolerance, args.min_ms)
+
+    print_header(f"{args.users} users, {args.clients} clients, {args.requests} calls per scenario")
+    print(f"{'scenario':<26} {'status':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} "
+          f"{'base p95':>9}  verdict")
+    for name, result in results.items():
+        base = baseline.get(name)
+        print(f"{name:<26} {result['status']:>6} {result['rps']:>8.0f} {result['p50']:>7.2f}ms "
+              f"{result['p95']:>7.2f}ms {result['p99']:>7.2f}ms {result['queries']:>8.1f} "
+              f"{('%.2fms' % base['p95']) if base else '-':>9}  {verdicts[name]}")
+
+    missing = [name for name, verdict in verdicts.items() if verdict == 'MISSING']
+    if args.update_baseline:
+        if missing:
+            print(f"\nNot writing a baseline: no endpoint for {', '.join(missing)}")
+            sys.exit(1)
+        with open(args.baseline, 'w') as f:
+            json.dump({'options': options, 'results': results}, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+    failures = [name for name, verdict in verdicts.items() if verdict not in ('ok', 'new')]
+    if failures:
+        print(f"\n{len(failures)} scenario(s) regressed: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import functools
+
+import click
+from flask.cli import with_appcontext
+
+
+def long_running(f):
+    """Run the command without DB_STATEMENT_TIMEOUT_MS; it is meant for request handlers"""
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        from utils.db_engine import disable_statement_timeout
+        disable_statement_timeout()
+        return f(*args, **kwargs)
+    return wrapper
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db():
+    """Create any missing database tables and indexes"""
+    from extensions import db
+    import models  # noqa: F401  (register tables)
+    db.create_all()
+    # create_all() skips tables that already exist, including indexes added to them later
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    click.echo("✅ Database tables and indexes created")
+
+
+@click.command('rebuild-search-index')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user\'s notes')
+@with_appcontext
+@long_running
+def rebuild_search_index(user_id):
+    """Rebuild the note search index from the notes table"""
+    from extensions import db
+    from utils.search_index import rebuild_index
+    db.create_all()
+    count = rebuild_index(user_id=user_id)
+    click.echo(f"✅ Indexed {count} notes")
+
+
+@click.command('rebuild-course-graph')
+@with_appcontext
+@long_running
+def rebuild_course_graph():
+    """Rebuild the user <-> course graph used for partner matching"""
+    from extensions import db
+    from utils.partner_graph import rebuild_graph
+    db.create_all()
+    count = rebuild_graph()
+    click.echo(f"✅ Rebuilt {count} user-course edges")
+
+
+@click.command('reschedule-flashcards')
+@click.option('--user-id', type=int, default=None, help='Only reschedule this user\'s deck')
+@click.option('--param', 'params', multiple=True, metavar='NAME=VALUE',
+              help='Override a scheduler parameter, e.g. --param interval_modifier=0.9')
+@with_appcontext
+@long_running
+def reschedule_flashcards(user_id, params):
+    """Recompute next_review for reviewed flashcards after a parameter change"""
+    from utils.scheduler import get_params, reschedule
+    try:
+        overrides = dict(param.split('=', 1) for param in params)
+        scheduler_params = get_params(overrides)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--param')
+    count = reschedule(user_id=user_id, params=scheduler_params)
+    click.echo(f"✅ Rescheduled {count} flashcards")
+
+
+@click.command('rebuild-analytics-rollups')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user\'s rollups')
+@with_appcontext
+@long_running
+def rebuild_analytics_rollups(user_id):
+    """Rebuild day/week/month analytics rollups from the analytics table"""
+    from extensions import db
+    from utils.analytics_pipeline import rebuild_rollups
+    db.create_all()
+    count = rebuild_rollups(user_id=user_id)
+    click.echo(f"✅ Rolled up {count} analytics rows")
+
+
+@click.command('rebuild-achievements')
+@with_appcontext
+@long_running
+def rebuild_achievements():
+    """Recompute achievement counters and award any badges already earned"""
+    from extensions import db
+    from utils.achievements import rebuild_counters, evaluate_all
+    db.create_all()
+    count = rebuild_counters()
+    awarded = evaluate_all()
+    click.echo(f"✅ Rebuilt {count} achievement counters, awarded {awarded} badges")
+
+
+@click.command('rebuild-exam-predictions')
+@click.option('--course-id', type=int, default=None, help='Only rebuild this course')
+@with_appcontext
+@long_running
+def rebuild_exam_predictions(course_id):
+    """Recompute note term vectors, course term sums and exam predictions"""
+    from extensions import db
+    from utils.exam_predictor import rebuild_vectors
+    db.create_all()
+    count = rebuild_vectors(course_id=course_id)
+    click.echo(f"✅ Analyzed {count} notes")
+
+
+@click.command('reprocess-uploads')
+@click.option('--failed', is_flag=True, help='Also retry uploads that failed')
+@with_appcontext
+@long_running
+def reprocess_uploads(failed):
+    """Process uploads left unfinished (e.g. by a restart) in this process"""
+    from flask import current_app
+    from extensions import db
+    from models import Upload
+    from utils.ingest import process_inline
+    db.create_all()
+    statuses = ['processing', 'error'] if failed else ['processing']
+    uploads = Upload.query.filter(Upload.status.in_(statuses)).order_by(Upload.id).all()
+    for upload in uploads:
+        process_inline(upload, current_app.config)
+        db.session.commit()
+    click.echo(f"✅ Processed {len(uploads)} uploads")
+
+
+@click.command('rebuild-blob-refs')
+@with_appcontext
+@long_running
+def rebuild_blob_refs():
+    """Recount blob references from the notes and resources tables"""
+    from extensions import db
+    from utils.blob_store import rebuild_refs
+    db.create_all()
+    count = rebuild_refs()
+    click.echo(f"✅ Counted references to {count} stored files")
+
+
+@click.command('gc-blobs')
+@click.option('--grace-seconds', type=int, default=None, help='Override BLOB_GC_GRACE_SECONDS')
+@with_appcontext
+@long_running
+def gc_blobs(grace_seconds):
+    """Delete stored files no note or resource refers to any more"""
+    from flask import current_app
+    from utils.blob_store import collect_garbage
+    if grace_seconds is None:
+        grace_seconds = current_app.config.get('BLOB_GC_GRACE_SECONDS', 3600)
+    removed = collect_garbage(current_app.config['UPLOAD_FOLDER'], grace_seconds)
+    click.echo(f"✅ Removed {removed} unreferenced files")
+
+
+@click.command('generate-data')
+@click.option('--users', type=int, default=1000, show_default=True)
+@click.option('--courses', type=int, default=200, show_default=True)
+@click.option('--courses-per-user', type=float, default=4, show_default=True, help='Mean enrolments per user')
+@click.option('--notes-per-user', type=float, default=20, show_default=True, help='Mean of a log-normal')
+@click.option('--note-kb', type=float, default=2, show_default=True, help='Mean note size')
+@click.option('--note-size-sigma', type=float, default=1.0, show_default=True, help='Spread of note sizes')
+@click.option('--flashcards-per-note', type=float, default=2, show_default=True)
+@click.option('--analytics-days', type=int, default=180, show_default=True, help='Days of history per user')
+@click.option('--partners-per-user', type=int, default=3, show_default=True)
+@click.option('--seed', type=int, default=42, show_default=True)
+@click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Last day of generated history (default today)')
+@click.option('--batch-size', type=int, default=20000, show_default=True, help='Rows per COPY / transaction')
+@click.option('--defer-indexes', is_flag=True, help='Drop secondary indexes during the load and rebuild them after')
+@with_appcontext
+@long_running
+def generate_data(end_date, **options):
+    """Bulk-load a deterministic synthetic dataset for performance work"""
+    import time
+    from extensions import db
+    from utils.synthetic_data import generate
+    db.create_all()
+    start = time.perf_counter()
+    last_report = [start]
+
+    def progress(counts):
+        if time.perf_counter() - last_report[0] >= 5:
+            last_report[0] = time.perf_counter()
+            click.echo(f"   {sum(counts.values()):,} rows written...")
+
+    counts = generate(end_date=end_date.date() if end_date else None, progress=progress, **options)
+    elapsed = time.perf_counter() - start
+    for table, count in counts.items():
+        click.echo(f"   {table:<16} {count:>12,}")
+    total = sum(counts.values())
+    click.echo(f"✅ Generated {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+    click.echo("   Derived tables are not maintained by bulk loads; run rebuild-search-index, "
+               "rebuild-analytics-rollups, rebuild-achievements and rebuild-exam-predictions")
+
+
+def register_commands(app):
+    app.cli.add_command(init_db)
+    app.cli.add_command(rebuild_search_index)
+    app.cli.add_command(rebuild_course_graph)
+    app.cli.add_command(reschedule_flashcards)
+    app.cli.add_command(rebuild_analytics_rollups)
+    app.cli.add_command(rebuild_achievements)
+    app.cli.add_command(rebuild_exam_predictions)
+    app.cli.add_command(reprocess_uploads)
+    app.cli.add_command(rebuild_blob_refs)
+    app.cli.add_command(gc_blobs)
+    app.cli.add_command(generate_data)
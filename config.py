@@ -3,6 +3,16 @@ import os
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///studysync.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Engine profile, see utils/db_engine.py. Pool sizes are per worker process.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = 10  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = 1800
+    DB_POOL_PRE_PING = True
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 15000))  # 0 disables; long CLI commands lift it themselves
+    DB_GEVENT = os.getenv("DB_GEVENT", "auto")  # green psycopg2; auto = when gevent has patched sockets
+    SQLITE_WAL = True
+    SQLITE_BUSY_TIMEOUT_MS = 5000
     SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key-change-in-production")
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max limit
@@ -12,3 +22,90 @@ class Config:
     SESSION_COOKIE_NAME = 'session'
     PERMANENT_SESSION_LIFETIME = 86400  # 24 hours
     SESSION_PERMANENT = True
+    # Re-issue an unchanged session cookie only once it is this fraction of its lifetime old
+    SESSION_REFRESH_AFTER = 0.5
+    SESSION_SKIP_PATHS = ('/static/',)
+    # Decoded but never written: socket.io handlers need current_user from the cookie
+    SESSION_READONLY_PATHS = ('/socket.io',)
+    # redis://... keeps session data server-side with only a signed id in the cookie
+    SESSION_STORE_URL = os.getenv("SESSION_STORE_URL")
+
+    # Shared SocketIO fan-out and room presence (e.g. redis://localhost:6379/0).
+    # Unset means a single worker with in-process presence.
+    SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+    PRESENCE_URL = os.getenv("PRESENCE_URL")
+    # A worker without a presence heartbeat for this long is treated as dead and its sockets dropped
+    PRESENCE_TTL_SECONDS = 30
+
+    # Whiteboard: draw events are broadcast in batches every WHITEBOARD_BATCH_MS
+    WHITEBOARD_BATCH_MS = int(os.getenv("WHITEBOARD_BATCH_MS", 25))
+    WHITEBOARD_BINARY_FRAMES = os.getenv("WHITEBOARD_BINARY_FRAMES", "false").lower() == "true"
+    WHITEBOARD_SNAPSHOT_EVERY = 200  # strokes in the tail before compacting into the snapshot
+    WHITEBOARD_MAX_STROKES = 5000  # newest strokes a compacted board keeps
+    WHITEBOARD_MAX_ROOMS = 1000  # boards held in memory without Redis
+    WHITEBOARD_IDLE_SECONDS = 6 * 3600  # boards untouched this long are dropped
+
+    # Study room chat: last CHAT_HISTORY_SIZE messages per active room are cached in memory
+    CHAT_HISTORY_SIZE = 100
+    CHAT_MAX_ROOMS = 500
+    CHAT_IDLE_SECONDS = 600  # evict a room's cache after this long without activity
+    CHAT_FLUSH_INTERVAL_MS = 500  # write-behind interval for chat inserts
+    # With several workers each cache only sees its own messages, so re-read periodically
+    CHAT_CACHE_REFRESH_SECONDS = 5 if SOCKETIO_MESSAGE_QUEUE else 0
+    # Study room time: StudySession opens/closes are written in batches every interval
+    ROOM_SESSION_FLUSH_INTERVAL_MS = 1000
+
+    # Analytics: study-time events are queued and rolled up every ANALYTICS_FLUSH_INTERVAL_MS
+    ANALYTICS_FLUSH_INTERVAL_MS = 1000
+
+    # Achievements: counters change with each write, badges are awarded every ACHIEVEMENT_EVAL_INTERVAL_MS
+    ACHIEVEMENT_EVAL_INTERVAL_MS = 1000
+
+    # Exam predictions are regenerated in the background at most once per interval per course
+    EXAM_PREDICTION_INTERVAL_MS = 2000
+
+    # AI assistant: requests run as background jobs on AI_WORKERS workers.
+    # AI_MODEL=gemini needs GEMINI_API_KEY; the default stub model works offline.
+    AI_MODEL = os.getenv("AI_MODEL", "gemini" if os.getenv("GEMINI_API_KEY") else "stub")
+    AI_MODEL_NAME = os.getenv("AI_MODEL_NAME", "gemini-2.0-flash")
+    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+    AI_WORKERS = int(os.getenv("AI_WORKERS", 4))
+    AI_QUEUE_SIZE = 100  # pending jobs before new submits are rejected
+    AI_CACHE_SIZE = 1000
+    AI_CACHE_TTL_SECONDS = 3600
+    AI_STUB_LATENCY_MS = 300
+
+    # Uploads are streamed to UPLOAD_FOLDER and processed (PDF text, thumbnails) in a process pool
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+    INGEST_POLL_INTERVAL_MS = 500
+
+    # Uploaded files are deduplicated by content; `flask gc-blobs` removes unreferenced
+    # ones after the grace period. USE_X_SENDFILE hands file responses to the front proxy.
+    BLOB_GC_GRACE_SECONDS = 3600
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "false").lower() == "true"
+
+    # Course catalog/detail response cache; a redis:// URL shares it (and invalidations) across workers
+    RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")
+    RESPONSE_CACHE_SIZE = 1000
+    RESPONSE_CACHE_TTL_SECONDS = 300
+
+    # SQL profiling: X-Query-Count/X-Query-Time-Ms headers, slow-query and N+1 warnings
+    QUERY_PROFILER = os.getenv("QUERY_PROFILER", "false").lower() == "true"
+    QUERY_SLOW_MS = 100
+    QUERY_N_PLUS_ONE_THRESHOLD = 5  # identical statements in one request before warning
+
+    # Prometheus metrics at /metrics: request/DB latency histograms, SocketIO event counters.
+    # Off by default; outside debug the endpoint answers only "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+    # Authenticated user lookups (login_manager.user_loader) are cached per process
+    USER_CACHE_SIZE = 10000
+    USER_CACHE_TTL_SECONDS = 60
+
+    # Study plans (utils/study_planner.py); users can override the daily hours per weekday
+    STUDY_PLAN_DAILY_HOURS = 3
+    STUDY_PLAN_DEFAULT_HOURS = 30  # total hours of a plan created without `hours`
+
+    # Import and register route blueprints after startup (gunicorn post_worker_init) instead of in create_app()
+    LAZY_BLUEPRINTS = os.getenv("LAZY_BLUEPRINTS", "false").lower() == "true"
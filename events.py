@@ -1,11 +1,41 @@
 from flask import request
-from flask_socketio import emit, join_room, leave_room
+from flask_socketio import emit, join_room, leave_room, rooms
 from flask_login import current_user
 from extensions import socketio, db
 from models import StudyRoom, User
-from datetime import datetime
+from utils.presence import get_presence, get_presence_monitor, FULL, JOINED
+from utils.room_sessions import get_room_sessions
+from utils.whiteboard import get_whiteboard
+from utils.chat_history import get_chat_history, serialize
 
-users_in_room = {}
+@socketio.on('connect')
+def on_connect(auth=None):
+    # First socket on this worker: start the presence heartbeat and clean up after dead workers
+    get_presence_monitor().start()
+    # Per-user room for pushes such as finished AI jobs
+    if current_user.is_authenticated:
+        join_room(f'user:{current_user.id}')
+
+def study_room(room_id):
+    """The StudyRoom behind a socket room id, or None for ad-hoc rooms"""
+    try:
+        return db.session.get(StudyRoom, int(room_id))
+    except (TypeError, ValueError):
+        return None
+
+def broadcast_diff(room, joined=(), left=()):
+    emit('presence_diff', {
+        'room_id': room,
+        'joined': list(joined),
+        'left': list(left),
+        'count': get_presence().count(room)
+    }, room=room)
+
+def member_left(room, member):
+    """A member's last connection left room: tell the room and close their session"""
+    broadcast_diff(room, left=[member])
+    if current_user.is_authenticated and room.isdigit():
+        get_room_sessions().close(int(room), current_user.id)
 
 @socketio.on('join')
 def on_join(data):
@@ -16,52 +46,84 @@ def on_join(data):
         return
         
     room = str(room_id)
+    record = study_room(room_id)
+    capacity = record.max_participants if record else None
+    
+    presence = get_presence()
+    user_id = current_user.id if current_user.is_authenticated else None
+    status = presence.join(room, request.sid, username, capacity=capacity, user_id=user_id)
+    if status == FULL:
+        emit('room_full', {'room_id': room, 'max_participants': capacity})
+        return
     join_room(room)
     
-    if room not in users_in_room:
-        users_in_room[room] = []
-        
-    if username not in users_in_room[room]:
-        users_in_room[room].append(username)
+    if status == JOINED:
+        broadcast_diff(room, joined=[username])
+        if record and current_user.is_authenticated:
+            get_room_sessions().open(record.id, current_user.id)
     
-    emit('status', {
-        'msg': f'{username} has entered the room.',
-        'users': users_in_room[room]
-    }, room=room)
+    # The joiner gets the full list once; everyone else only sees diffs
+    emit('presence', {'room_id': room, 'users': presence.members(room)})
+    # Late joiners get the board so far: compacted snapshot + recent strokes
+    emit('whiteboard_state', get_whiteboard().state(room))
+    send_history(room)
 
 @socketio.on('leave')
 def on_leave(data):
-    username = data.get('username')
-    room_id = data.get('room_id')
-    
-    room = str(room_id)
+    room = str(data.get('room_id'))
     leave_room(room)
     
-    if room in users_in_room and username in users_in_room[room]:
-        users_in_room[room].remove(username)
-        
-    emit('status', {
-        'msg': f'{username} has left the room.',
-        'users': users_in_room.get(room, [])
-    }, room=room)
+    member, last = get_presence().leave(room, request.sid)
+    if last:
+        member_left(room, member)
+
+@socketio.on('disconnect')
+def on_disconnect(reason=None):
+    """Drop the socket from every room it was still in"""
+    for room, member, last in get_presence().disconnect(request.sid):
+        if last:
+            member_left(room, member)
 
 @socketio.on('message')
 def on_message(data):
     """Handle chat messages"""
     room = str(data.get('room_id'))
-    emit('message', {
-        'username': data.get('username'),
-        'msg': data.get('msg'),
-        'timestamp': datetime.utcnow().strftime('%H:%M')
-    }, room=room)
+    if not data.get('msg'):
+        return
+    user_id = current_user.id if current_user.is_authenticated else None
+    message = get_chat_history().add(room, data.get('username'), data.get('msg'), user_id=user_id)
+    emit('message', serialize(message), room=room)
+
+def send_history(room, before=None, limit=50):
+    """Emit a page of chat history (oldest first) to the requesting client"""
+    try:
+        messages, next_cursor = get_chat_history().page(room, cursor=before, limit=limit)
+    except (TypeError, ValueError) as e:
+        emit('history', {'room_id': room, 'error': str(e)})
+        return
+    emit('history', {
+        'room_id': room,
+        'messages': [serialize(m) for m in messages],
+        'next_cursor': next_cursor
+    })
+
+@socketio.on('history')
+def on_history(data):
+    """Handle requests for older chat messages"""
+    send_history(str(data.get('room_id')), before=data.get('before'), limit=data.get('limit', 50))
 
 @socketio.on('draw')
 def on_draw(data):
-    """Handle whiteboard drawing events"""
+    """Handle whiteboard drawing events (broadcast in batches as draw_batch)"""
     room = str(data.get('room_id'))
-    emit('draw', data, room=room, include_self=False)
+    if room not in rooms():
+        return
+    get_whiteboard().add_stroke(room, data, request.sid)
 
 @socketio.on('clear_board')
 def on_clear(data):
     room = str(data.get('room_id'))
+    if room not in rooms():
+        return
+    get_whiteboard().clear(room)
     emit('clear_board', {}, room=room)
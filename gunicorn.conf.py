@@ -0,0 +1,7 @@
+# Picked up automatically by gunicorn from the working directory (see Procfile)
+
+
+def post_worker_init(worker):
+    """Register LAZY_BLUEPRINTS route modules before the worker accepts requests"""
+    from utils.lazy_blueprints import warm_up
+    warm_up(worker.wsgi)
@@ -64,6 +64,11 @@ class Note(db.Model):
     # Relationships
     flashcards = db.relationship('Flashcard', backref='note', lazy=True, cascade='all, delete-orphan')
     
+    # Keyset pages: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+    __table_args__ = (
+        db.Index('idx_notes_user_created', 'user_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Note {self.id}>'
 
@@ -78,8 +83,18 @@ class Flashcard(db.Model):
     difficulty = db.Column(db.Integer, default=0)  # 0=easy, 1=medium, 2=hard
     next_review = db.Column(db.DateTime, default=datetime.utcnow)
     review_count = db.Column(db.Integer, default=0)
+    # SM-2 scheduling state, see utils/scheduler.py
+    ease_factor = db.Column(db.Float, default=2.5)
+    interval_days = db.Column(db.Float, default=0.0)
+    last_reviewed = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Serves the review queue: WHERE user_id = ? AND next_review <= ? ORDER BY next_review, id
+    __table_args__ = (
+        db.Index('idx_flashcards_user_next_review', 'user_id', 'next_review', 'id'),
+        db.Index('idx_flashcards_user_created', 'user_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Flashcard {self.id}>'
 
@@ -120,6 +135,11 @@ class ExamPrediction(db.Model):
     confidence_score = db.Column(db.Float, default=0.0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('idx_exam_predictions_course_confidence', 'course_id', 'confidence_score'),
+        db.Index('idx_exam_predictions_course_created', 'course_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<ExamPrediction {self.id}>'
 
@@ -133,6 +153,12 @@ class StudyPartner(db.Model):
     status = db.Column(db.String(50), default='pending')  # pending, accepted, rejected
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Keyset pages over either side of the partnership
+    __table_args__ = (
+        db.Index('idx_study_partners_user1_created', 'user1_id', 'created_at', 'id'),
+        db.Index('idx_study_partners_user2_created', 'user2_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<StudyPartner {self.id}>'
 
@@ -157,6 +183,9 @@ class Achievement(db.Model):
     badge_type = db.Column(db.String(100), nullable=False)
     earned_date = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'badge_type', name='uq_achievements_user_badge'),
+    )
     
     def __repr__(self):
         return f'<Achievement {self.id}>'
@@ -173,9 +202,44 @@ class StudyPlan(db.Model):
     # Structure: [{'date': '2023-10-27', 'topics': ['Math', 'Physics'], 'hours': 4}]
     schedule = db.Column(db.JSON, default=[]) 
     
+    # Plans built by utils/study_planner.py keep their schedule in rows instead
+    topics = db.relationship('StudyPlanTopic', backref='plan', lazy=True, cascade='all, delete-orphan')
+    days = db.relationship('StudyPlanDay', backref='plan', lazy=True, cascade='all, delete-orphan')
+    
     def __repr__(self):
         return f'<StudyPlan {self.title}>'
 
+class StudyPlanTopic(db.Model):
+    __tablename__ = 'study_plan_topics'
+    
+    plan_id = db.Column(db.Integer, db.ForeignKey('study_plans.id'), primary_key=True)
+    topic = db.Column(db.String(200), primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'))
+    weight = db.Column(db.Float, default=1.0)  # after prediction/familiarity adjustment
+    target_hours = db.Column(db.Float, default=0.0)
+    done_hours = db.Column(db.Float, default=0.0)  # logged through analytics events
+    
+    def __repr__(self):
+        return f'<StudyPlanTopic {self.plan_id}:{self.topic}>'
+
+class StudyPlanDay(db.Model):
+    __tablename__ = 'study_plan_days'
+    
+    # Hours planned for one topic of a plan on one day
+    plan_id = db.Column(db.Integer, db.ForeignKey('study_plans.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    topic = db.Column(db.String(200), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    hours = db.Column(db.Float, default=0.0)
+    
+    # A user's calendar across plans: WHERE user_id = ? AND date BETWEEN ? AND ?
+    __table_args__ = (
+        db.Index('idx_study_plan_days_user_date', 'user_id', 'date'),
+    )
+    
+    def __repr__(self):
+        return f'<StudyPlanDay {self.plan_id}:{self.date}:{self.topic}>'
+
 class Resource(db.Model):
     __tablename__ = 'resources'
     
@@ -188,7 +252,171 @@ class Resource(db.Model):
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('idx_resources_course_created', 'course_id', 'created_at', 'id'),
+        db.Index('idx_resources_created', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Resource {self.title}>'
 
 
+
+class NoteTerm(db.Model):
+    __tablename__ = 'note_terms'
+    
+    # One posting per (note, term); maintained by utils/search_index.py
+    id = db.Column(db.Integer, primary_key=True)
+    note_id = db.Column(db.Integer, db.ForeignKey('notes.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    term = db.Column(db.String(100), nullable=False)
+    term_frequency = db.Column(db.Integer, default=0)
+    positions = db.Column(db.JSON, default=[])
+    
+    __table_args__ = (
+        db.Index('idx_note_terms_user_term', 'user_id', 'term'),
+    )
+    
+    def __repr__(self):
+        return f'<NoteTerm {self.term}>'
+
+class NoteDocument(db.Model):
+    __tablename__ = 'note_documents'
+    
+    # Per-note token count, needed for BM25 length normalisation
+    note_id = db.Column(db.Integer, db.ForeignKey('notes.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    length = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<NoteDocument {self.note_id}>'
+
+class UserCourse(db.Model):
+    __tablename__ = 'user_courses'
+    
+    # User <-> course adjacency derived from notes; maintained by utils/partner_graph.py
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), primary_key=True, index=True)
+    note_count = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<UserCourse {self.user_id}:{self.course_id}>'
+
+class ChatMessage(db.Model):
+    __tablename__ = 'chat_messages'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Assigned when the message is accepted, before the write-behind insert
+    message_uid = db.Column(db.String(32), unique=True, nullable=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('study_rooms.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    username = db.Column(db.String(120))
+    message = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_chat_messages_room_created', 'room_id', 'created_at', 'message_uid'),
+    )
+    
+    def __repr__(self):
+        return f'<ChatMessage {self.id}>'
+
+class AnalyticsRollup(db.Model):
+    __tablename__ = 'analytics_rollups'
+    
+    # Study time summed per day/week/month; maintained by utils/analytics_pipeline.py
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    period = db.Column(db.String(5), primary_key=True)  # day, week, month
+    period_start = db.Column(db.Date, primary_key=True)
+    study_time = db.Column(db.Integer, default=0)  # in minutes
+    sessions = db.Column(db.Integer, default=0)
+    days_active = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<AnalyticsRollup {self.user_id}:{self.period}:{self.period_start}>'
+
+class TopicRollup(db.Model):
+    __tablename__ = 'analytics_topic_rollups'
+    
+    # Per-topic counters exploded out of topics_covered, same periods as AnalyticsRollup
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    period = db.Column(db.String(5), primary_key=True)
+    period_start = db.Column(db.Date, primary_key=True)
+    topic = db.Column(db.String(200), primary_key=True)
+    study_time = db.Column(db.Integer, default=0)
+    sessions = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<TopicRollup {self.user_id}:{self.period}:{self.period_start}:{self.topic}>'
+
+class AchievementCounter(db.Model):
+    __tablename__ = 'achievement_counters'
+    
+    # Per-user activity counters that achievement rules read; maintained by utils/achievements.py
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    counter = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<AchievementCounter {self.user_id}:{self.counter}={self.value}>'
+
+class NoteTermVector(db.Model):
+    __tablename__ = 'note_term_vectors'
+    
+    # Weighted key terms of one note, kept so edits can be diffed; maintained by utils/exam_predictor.py
+    note_id = db.Column(db.Integer, db.ForeignKey('notes.id'), primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False, index=True)
+    terms = db.Column(db.JSON, default={})
+    
+    def __repr__(self):
+        return f'<NoteTermVector {self.note_id}>'
+
+class CourseTerm(db.Model):
+    __tablename__ = 'course_terms'
+    
+    # Sum of the note vectors of a course
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), primary_key=True)
+    term = db.Column(db.String(201), primary_key=True)
+    weight = db.Column(db.Integer, default=0)
+    note_count = db.Column(db.Integer, default=0)
+    
+    __table_args__ = (
+        db.Index('idx_course_terms_course_notes', 'course_id', 'note_count', 'weight'),
+    )
+    
+    def __repr__(self):
+        return f'<CourseTerm {self.course_id}:{self.term}>'
+
+class Upload(db.Model):
+    __tablename__ = 'uploads'
+    
+    # A streamed upload and the state of its background processing; see utils/ingest.py
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    note_id = db.Column(db.Integer, db.ForeignKey('notes.id', ondelete='SET NULL'))
+    resource_id = db.Column(db.Integer, db.ForeignKey('resources.id', ondelete='SET NULL'))
+    filename = db.Column(db.String(255))
+    file_path = db.Column(db.String(500), nullable=False)
+    file_type = db.Column(db.String(50))
+    size = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), default='processing') # processing, done, error
+    page_count = db.Column(db.Integer)
+    thumbnail_path = db.Column(db.String(500))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<Upload {self.filename}>'
+
+class Blob(db.Model):
+    __tablename__ = 'blobs'
+    
+    # Content-addressed upload file; ref_count = notes + resources pointing at it (utils/blob_store.py)
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, default=0)
+    ref_count = db.Column(db.Integer, default=0, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Blob {self.sha256[:12]} refs={self.ref_count}>'
@@ -0,0 +1,17 @@
+from flask import Blueprint, jsonify
+from flask_login import current_user
+from utils.auth_decorator import api_login_required
+from utils.achievements import list_achievements, achievement_to_dict, progress
+
+achievement_progress = Blueprint('achievement_progress', __name__)
+
+@achievement_progress.route('/achievements/progress', methods=['GET'])
+@api_login_required
+def get_achievement_progress():
+    """Earned badges plus cached progress toward the rest"""
+    earned = list_achievements(current_user.id)
+    return jsonify({
+        'achievements': [achievement_to_dict(a) for a in earned],
+        'total_count': len(earned),
+        'progress': progress(current_user.id)
+    }), 200
@@ -0,0 +1,50 @@
+from flask import Blueprint, request, jsonify
+from flask_login import current_user
+from extensions import db
+from models import Note
+from utils.auth_decorator import api_login_required
+from utils.ai_jobs import get_ai_jobs, summarize_prompt, ask_prompt, QueueFullError
+
+ai_jobs = Blueprint('ai_jobs', __name__)
+
+MAX_WAIT_SECONDS = 10
+
+@ai_jobs.route('/ai/jobs', methods=['POST'])
+@api_login_required
+def submit_job():
+    """Queue a summarize/ask request; identical in-flight requests share one job"""
+    data = request.get_json(silent=True) or {}
+    kind = data.get('type')
+
+    if kind == 'summarize':
+        note = db.session.get(Note, data.get('note_id') or 0)
+        if note is None or note.user_id != current_user.id:
+            return jsonify({'error': 'Note not found'}), 404
+        prompt = summarize_prompt(note)
+    elif kind == 'ask':
+        question = (data.get('question') or '').strip()
+        if not question:
+            return jsonify({'error': 'Question is required'}), 400
+        prompt = ask_prompt(current_user.id, question)
+    else:
+        return jsonify({'error': 'type must be summarize or ask'}), 400
+
+    try:
+        job = get_ai_jobs().submit(kind, prompt, current_user.id)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+
+    return jsonify(job.to_dict()), 200 if job.done.is_set() else 202
+
+@ai_jobs.route('/ai/jobs/<job_id>', methods=['GET'])
+@api_login_required
+def get_job(job_id):
+    """Job status and result; ?wait=N blocks up to N seconds for completion"""
+    job = get_ai_jobs().get(job_id, current_user.id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    wait = min(max(request.args.get('wait', 0, type=float), 0), MAX_WAIT_SECONDS)
+    if wait:
+        job.done.wait(wait)
+    return jsonify(job.to_dict()), 200
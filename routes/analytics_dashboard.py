@@ -0,0 +1,45 @@
+from flask import Blueprint, request, jsonify
+from flask_login import current_user
+from utils.auth_decorator import api_login_required
+from utils.analytics_pipeline import parse_event, dashboard, get_analytics_pipeline
+
+analytics_dashboard = Blueprint('analytics_dashboard', __name__)
+
+MAX_EVENTS_PER_REQUEST = 500
+
+@analytics_dashboard.route('/analytics/events', methods=['POST'])
+@api_login_required
+def record_study_events():
+    """Queue study-time events for the next rollup flush"""
+    data = request.get_json(silent=True) or {}
+    events = data.get('events', [data])
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': 'events must be a non-empty list'}), 400
+    if len(events) > MAX_EVENTS_PER_REQUEST:
+        return jsonify({'error': f'At most {MAX_EVENTS_PER_REQUEST} events per request'}), 400
+
+    try:
+        parsed = [parse_event(event) for event in events]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    pipeline = get_analytics_pipeline()
+    for day, study_time, topics in parsed:
+        pipeline.record(current_user.id, day, study_time, topics)
+
+    return jsonify({'message': f'{len(parsed)} events queued', 'queued': len(parsed)}), 202
+
+@analytics_dashboard.route('/analytics/dashboard', methods=['GET'])
+@api_login_required
+def get_dashboard():
+    """Dashboard summary for the last `days` days, read from the rollups"""
+    try:
+        result = dashboard(
+            current_user.id,
+            days=request.args.get('days', 7, type=int),
+            granularity=request.args.get('granularity', 'day')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(result), 200
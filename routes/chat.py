@@ -0,0 +1,29 @@
+from flask import Blueprint, request, jsonify
+from extensions import db
+from models import StudyRoom
+from utils.auth_decorator import api_login_required
+from utils.chat_history import get_chat_history, serialize, DEFAULT_PAGE_SIZE
+
+chat = Blueprint('chat', __name__)
+
+@chat.route('/rooms/<int:room_id>/messages', methods=['GET'])
+@api_login_required
+def get_room_messages(room_id):
+    """Page backwards through a study room's chat history"""
+    if db.session.get(StudyRoom, room_id) is None:
+        return jsonify({'error': 'Study room not found'}), 404
+
+    try:
+        messages, next_cursor = get_chat_history().page(
+            str(room_id),
+            cursor=request.args.get('before'),
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'messages': [serialize(m) for m in messages],
+        'count': len(messages),
+        'next_cursor': next_cursor
+    }), 200
@@ -0,0 +1,26 @@
+from flask import Blueprint, jsonify
+from utils.auth_decorator import api_login_required
+from utils.response_cache import get_response_cache
+from utils.course_cache import catalog_response, course_response
+
+course_catalog = Blueprint('course_catalog', __name__)
+
+@course_catalog.route('/catalog/courses', methods=['GET'])
+@api_login_required
+def get_catalog():
+    """All courses, served from the response cache (ETag / If-None-Match aware)"""
+    return catalog_response(get_response_cache())
+
+@course_catalog.route('/catalog/courses/<int:course_id>', methods=['GET'])
+@api_login_required
+def get_catalog_course(course_id):
+    try:
+        return course_response(get_response_cache(), course_id)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+
+@course_catalog.route('/cache/stats', methods=['GET'])
+@api_login_required
+def cache_stats():
+    """Hit rate and latency counters of the response cache"""
+    return jsonify(get_response_cache().stats()), 200
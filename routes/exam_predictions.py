@@ -0,0 +1,32 @@
+from flask import Blueprint, request, jsonify
+from extensions import db
+from models import Course
+from utils.auth_decorator import api_login_required
+from utils.exam_predictor import top_predictions, get_exam_predictor, DEFAULT_TOP_K
+
+exam_predictions = Blueprint('exam_predictions', __name__)
+
+@exam_predictions.route('/exam-predictor/<int:course_id>/refresh', methods=['POST'])
+@api_login_required
+def refresh_predictions(course_id):
+    """Queue a background regeneration of a course's predictions"""
+    if db.session.get(Course, course_id) is None:
+        return jsonify({'error': 'Course not found'}), 404
+
+    get_exam_predictor().enqueue({course_id})
+    return jsonify({'message': 'Prediction refresh queued', 'course_id': course_id}), 202
+
+@exam_predictions.route('/exam-predictor/<int:course_id>/predictions', methods=['GET'])
+@api_login_required
+def get_top_predictions(course_id):
+    """Cached top-k predictions for a course"""
+    if db.session.get(Course, course_id) is None:
+        return jsonify({'error': 'Course not found'}), 404
+
+    k = request.args.get('k', DEFAULT_TOP_K, type=int)
+    predictions = top_predictions(course_id, k=k)
+    return jsonify({
+        'predictions': predictions,
+        'count': len(predictions),
+        'pending': get_exam_predictor().is_pending(course_id)
+    }), 200
@@ -0,0 +1,103 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_login import current_user
+from sqlalchemy import or_
+from extensions import db
+from models import Course, ExamPrediction, Flashcard, Note, Resource, StudyPartner
+from utils.auth_decorator import api_login_required
+from utils.pagination import keyset_page, DEFAULT_PAGE_SIZE
+from utils.list_views import (NOTES, FLASHCARDS, RESOURCES, PARTNERS, EXAM_PREDICTIONS,
+                              EXPORT_BATCH_SIZE, stream_json)
+
+listings = Blueprint('listings', __name__)
+
+def list_response(view, query):
+    """One keyset page of query projected onto the requested fields"""
+    try:
+        names = view.parse_fields(request.args.get('fields'))
+        rows, next_cursor = keyset_page(
+            view.project(query, names), view.model,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        view.name: [view.serialize(row, names, current_user.id) for row in rows],
+        'count': len(rows),
+        'next_cursor': next_cursor
+    }), 200
+
+def export_response(view, query):
+    """Every row of query, serialized while it is read"""
+    try:
+        names = view.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    viewer_id = current_user.id
+    rows = view.newest_first(view.project(query, names)).yield_per(EXPORT_BATCH_SIZE)
+    body = stream_json(view.name, rows, lambda row: view.serialize(row, names, viewer_id))
+    return Response(stream_with_context(body), mimetype='application/json')
+
+def notes_query():
+    query = Note.query.filter(Note.user_id == current_user.id)
+    course_id = request.args.get('course_id', type=int)
+    if course_id:
+        query = query.filter(Note.course_id == course_id)
+    return query
+
+def partners_query():
+    query = StudyPartner.query.filter(or_(
+        StudyPartner.user1_id == current_user.id, StudyPartner.user2_id == current_user.id
+    ))
+    status = request.args.get('status')
+    if status:
+        query = query.filter(StudyPartner.status == status)
+    return query
+
+def resources_query():
+    query = Resource.query
+    course_id = request.args.get('course_id', type=int)
+    if course_id:
+        query = query.filter(Resource.course_id == course_id)
+    return query
+
+@listings.route('/list/notes', methods=['GET'])
+@api_login_required
+def list_notes():
+    """Paginated notes; ?fields=id,title skips the note bodies"""
+    return list_response(NOTES, notes_query())
+
+@listings.route('/list/flashcards', methods=['GET'])
+@api_login_required
+def list_flashcards():
+    return list_response(FLASHCARDS, Flashcard.query.filter(Flashcard.user_id == current_user.id))
+
+@listings.route('/list/resources', methods=['GET'])
+@api_login_required
+def list_resources():
+    return list_response(RESOURCES, resources_query())
+
+@listings.route('/list/partners', methods=['GET'])
+@api_login_required
+def list_partners():
+    return list_response(PARTNERS, partners_query())
+
+@listings.route('/list/exam-predictor/<int:course_id>', methods=['GET'])
+@api_login_required
+def list_exam_predictions(course_id):
+    if db.session.get(Course, course_id) is None:
+        return jsonify({'error': 'Course not found'}), 404
+    return list_response(EXAM_PREDICTIONS, ExamPrediction.query.filter(ExamPrediction.course_id == course_id))
+
+@listings.route('/export/notes', methods=['GET'])
+@api_login_required
+def export_notes():
+    """All of the user's notes as one streamed JSON document"""
+    return export_response(NOTES, notes_query())
+
+@listings.route('/export/flashcards', methods=['GET'])
+@api_login_required
+def export_flashcards():
+    return export_response(FLASHCARDS, Flashcard.query.filter(Flashcard.user_id == current_user.id))
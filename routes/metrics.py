@@ -0,0 +1,19 @@
+import hmac
+from flask import Blueprint, Response, current_app, request, jsonify
+from utils.metrics import get_metrics
+
+metrics = Blueprint('metrics', __name__)
+
+@metrics.route('/metrics', methods=['GET'])
+def scrape():
+    """Prometheus text format (METRICS_ENABLED=true only); needs the METRICS_TOKEN bearer outside debug"""
+    registry = get_metrics()
+    if registry is None:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        if not current_app.debug:
+            return jsonify({'error': 'METRICS_TOKEN is not configured'}), 403
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
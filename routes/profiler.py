@@ -0,0 +1,14 @@
+from flask import Blueprint, jsonify
+from utils.auth_decorator import api_login_required
+from utils.query_profiler import get_query_profiler
+
+profiler = Blueprint('profiler', __name__)
+
+@profiler.route('/profiler/queries', methods=['GET'])
+@api_login_required
+def query_report():
+    """Per-endpoint query counts and DB time (QUERY_PROFILER=true only)"""
+    query_profiler = get_query_profiler()
+    if query_profiler is None:
+        return jsonify({'error': 'Query profiler is disabled'}), 404
+    return jsonify({'endpoints': query_profiler.report()}), 200
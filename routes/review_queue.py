@@ -0,0 +1,65 @@
+from flask import Blueprint, request, jsonify
+from flask_login import current_user
+from extensions import db
+from utils.auth_decorator import api_login_required
+from utils.review_queue import get_review_queue, parse_reviews, apply_reviews, DEFAULT_QUEUE_SIZE
+
+review_queue = Blueprint('review_queue', __name__)
+
+def flashcard_to_dict(card):
+    return {
+        'id': card.id,
+        'note_id': card.note_id,
+        'front': card.front,
+        'back': card.back,
+        'difficulty': card.difficulty,
+        'next_review': card.next_review.isoformat() if card.next_review else None,
+        'review_count': card.review_count
+    }
+
+@review_queue.route('/flashcards/due', methods=['GET'])
+@api_login_required
+def get_due_flashcards():
+    """Keyset-paginated review queue, oldest due first"""
+    try:
+        limit = request.args.get('limit', DEFAULT_QUEUE_SIZE, type=int)
+        cursor = request.args.get('cursor')
+        cards, next_cursor = get_review_queue(current_user.id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'review_queue': [flashcard_to_dict(card) for card in cards],
+        'count': len(cards),
+        'next_cursor': next_cursor
+    }), 200
+
+@review_queue.route('/flashcards/reviews', methods=['POST'])
+@api_login_required
+def submit_reviews():
+    """Apply a batch of review outcomes in a single transaction"""
+    data = request.get_json(silent=True) or {}
+    try:
+        reviews = parse_reviews(data.get('reviews'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        updated, missing = apply_reviews(current_user.id, reviews)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({
+        'message': f'{len(updated)} reviews recorded',
+        'updated': [
+            {
+                'id': row['id'],
+                'difficulty': row['difficulty'],
+                'review_count': row['review_count'],
+                'next_review': row['next_review'].isoformat()
+            }
+            for row in updated
+        ],
+        'missing': missing
+    }), 200
@@ -0,0 +1,113 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from flask_login import current_user
+from extensions import db
+from models import StudyPlan, User
+from utils.auth_decorator import api_login_required
+from utils import study_planner as planner
+
+study_planner = Blueprint('study_planner', __name__)
+
+def parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be YYYY-MM-DD')
+
+def get_own_plan(plan_id):
+    plan = db.session.get(StudyPlan, plan_id)
+    if plan is None or plan.user_id != current_user.id:
+        return None
+    return plan
+
+@study_planner.route('/planner/plans', methods=['POST'])
+@api_login_required
+def create_plan():
+    """Build a plan from an exam date and weighted topics, sharing the daily budget with other plans"""
+    data = request.get_json(silent=True) or {}
+    try:
+        exam_date = parse_date(data.get('exam_date'), 'exam_date')
+        topics = planner.parse_topics(data.get('topics'))
+        hours = data.get('hours')
+        if hours is not None and (isinstance(hours, bool) or not isinstance(hours, (int, float)) or hours <= 0):
+            raise ValueError('hours must be a positive number')
+        plan = planner.create_plan(current_user.id, data.get('title') or 'Study plan', exam_date, topics, hours)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'plan': planner.plan_to_dict(plan)}), 201
+
+@study_planner.route('/planner/plans/<int:plan_id>', methods=['GET'])
+@api_login_required
+def get_plan(plan_id):
+    """A plan with its per-day schedule (optionally ?from=&to=)"""
+    plan = get_own_plan(plan_id)
+    if plan is None:
+        return jsonify({'error': 'Plan not found'}), 404
+    try:
+        start = parse_date(request.args['from'], 'from') if request.args.get('from') else None
+        end = parse_date(request.args['to'], 'to') if request.args.get('to') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'plan': planner.plan_to_dict(plan), 'schedule': planner.schedule([plan.id], start, end)}), 200
+
+@study_planner.route('/planner/plans/<int:plan_id>', methods=['PATCH'])
+@api_login_required
+def move_exam(plan_id):
+    """Move the exam; only days from today on are reallocated"""
+    plan = get_own_plan(plan_id)
+    if plan is None:
+        return jsonify({'error': 'Plan not found'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get('title'):
+            plan.title = data['title']
+        rewritten = 0
+        if data.get('exam_date'):
+            rewritten = planner.move_exam(plan, parse_date(data['exam_date'], 'exam_date'))
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'plan': planner.plan_to_dict(plan), 'days_rewritten': rewritten}), 200
+
+@study_planner.route('/planner/plans/<int:plan_id>', methods=['DELETE'])
+@api_login_required
+def delete_plan(plan_id):
+    plan = get_own_plan(plan_id)
+    if plan is None:
+        return jsonify({'error': 'Plan not found'}), 404
+    planner.delete_plan(plan)
+    db.session.commit()
+    return jsonify({'message': 'Plan deleted'}), 200
+
+@study_planner.route('/planner/calendar', methods=['GET'])
+@api_login_required
+def get_calendar():
+    """Every plan's days in ?from=&to=, merged per day"""
+    try:
+        start = parse_date(request.args['from'], 'from') if request.args.get('from') else None
+        end = parse_date(request.args['to'], 'to') if request.args.get('to') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    plan_ids = [row[0] for row in db.session.query(StudyPlan.id).filter(StudyPlan.user_id == current_user.id)]
+    return jsonify({'schedule': planner.schedule(plan_ids, start, end)}), 200
+
+@study_planner.route('/planner/budget', methods=['PUT'])
+@api_login_required
+def set_budget():
+    """Daily study hours (one number, or seven starting Monday); replans from today"""
+    data = request.get_json(silent=True) or {}
+    try:
+        daily_hours = planner.parse_budget(data.get('daily_hours'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rewritten = planner.set_budget(db.session.get(User, current_user.id), daily_hours)
+    db.session.commit()
+    return jsonify({'daily_hours': daily_hours, 'days_rewritten': rewritten}), 200
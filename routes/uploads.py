@@ -0,0 +1,157 @@
+import mimetypes
+import os
+from flask import Blueprint, request, jsonify, current_app, send_file
+from flask_login import current_user
+from extensions import db
+from models import Course, Note, Resource, Upload
+from utils.auth_decorator import api_login_required
+from utils.ingest import save_stream, get_ingestion, upload_to_dict, UploadError, FILE_TYPES, file_extension
+from utils.blob_store import blob_key
+
+uploads = Blueprint('uploads', __name__)
+
+def _incoming_file():
+    """(stream, filename) for a raw request body or a multipart `file` field.
+
+    Only the raw body is streamed straight from the socket; werkzeug spools
+    a multipart file (to a temporary file above 500KB) before we see it.
+    """
+    if request.mimetype == 'multipart/form-data':
+        file = request.files.get('file')
+        if file is None:
+            raise UploadError('No file provided')
+        return file.stream, file.filename
+    filename = request.args.get('filename') or request.headers.get('X-Filename')
+    if not filename:
+        raise UploadError('filename is required')
+    return request.stream, filename
+
+def _save_upload():
+    stream, filename = _incoming_file()
+    stored, file_type = save_stream(
+        stream, current_app.config['UPLOAD_FOLDER'], filename, current_app.config['MAX_CONTENT_LENGTH']
+    )
+    return Upload(user_id=current_user.id, filename=filename, file_path=stored.path, file_type=file_type,
+                  size=stored.size)
+
+def _course_or_error():
+    course_id = request.values.get('course_id', type=int)
+    if course_id is None:
+        raise UploadError('course_id is required')
+    course = db.session.get(Course, course_id)
+    if course is None:
+        raise LookupError('Course not found')
+    return course
+
+@uploads.route('/uploads/notes', methods=['POST'])
+@api_login_required
+def upload_note():
+    """Stream a PDF/image to disk and create a note whose text is filled in by the pipeline"""
+    try:
+        course = _course_or_error()
+        upload = _save_upload()
+        note = Note(
+            user_id=current_user.id,
+            course_id=course.id,
+            title=request.values.get('title') or upload.filename,
+            content=request.values.get('content', ''),
+            file_path=upload.file_path
+        )
+        db.session.add(note)
+        db.session.flush()
+        upload.note_id = note.id
+        db.session.add(upload)
+        db.session.commit()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+
+    get_ingestion().submit(upload)
+    return jsonify(upload_to_dict(upload)), 202
+
+@uploads.route('/uploads/resources', methods=['POST'])
+@api_login_required
+def upload_resource():
+    """Stream a course resource to disk; thumbnails and page counts follow in the background"""
+    try:
+        course = _course_or_error()
+        upload = _save_upload()
+        resource = Resource(
+            course_id=course.id,
+            uploader_id=current_user.id,
+            title=request.values.get('title') or upload.filename,
+            description=request.values.get('description'),
+            file_path=upload.file_path,
+            file_type=upload.file_type
+        )
+        db.session.add(resource)
+        db.session.flush()
+        upload.resource_id = resource.id
+        db.session.add(upload)
+        db.session.commit()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+
+    get_ingestion().submit(upload)
+    return jsonify(upload_to_dict(upload)), 202
+
+def _own_upload(upload_id):
+    upload = db.session.get(Upload, upload_id)
+    if upload is None or upload.user_id != current_user.id:
+        return None
+    return upload
+
+@uploads.route('/uploads/<int:upload_id>', methods=['GET'])
+@api_login_required
+def get_upload(upload_id):
+    """Processing status of an upload"""
+    upload = _own_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(upload_to_dict(upload)), 200
+
+@uploads.route('/uploads/<int:upload_id>/thumbnail', methods=['GET'])
+@api_login_required
+def get_thumbnail(upload_id):
+    upload = _own_upload(upload_id)
+    if upload is None or not upload.thumbnail_path:
+        return jsonify({'error': 'Thumbnail not found'}), 404
+    return send_file(upload.thumbnail_path, mimetype='image/jpeg', max_age=86400)
+
+def _send_blob(path, file_type, download_name):
+    """Stream a stored file with Range/conditional support; the content hash is a strong ETag"""
+    if not path or not os.path.exists(path):
+        return jsonify({'error': 'File not found'}), 404
+    if file_type in FILE_TYPES and '.' not in download_name:
+        download_name = f'{download_name}.{file_type}'
+    return send_file(
+        path,
+        mimetype=mimetypes.guess_type(download_name)[0] or 'application/octet-stream',
+        download_name=download_name,
+        conditional=True,
+        etag=blob_key(path) or True,
+        max_age=86400
+    )
+
+@uploads.route('/files/resources/<int:resource_id>', methods=['GET'])
+@api_login_required
+def download_resource(resource_id):
+    """Course resource file (supports Range requests)"""
+    resource = db.session.get(Resource, resource_id)
+    if resource is None:
+        return jsonify({'error': 'Resource not found'}), 404
+    return _send_blob(resource.file_path, resource.file_type, resource.title)
+
+@uploads.route('/files/notes/<int:note_id>', methods=['GET'])
+@api_login_required
+def download_note_file(note_id):
+    """File attached to one of the user's notes (supports Range requests)"""
+    note = db.session.get(Note, note_id)
+    if note is None or note.user_id != current_user.id:
+        return jsonify({'error': 'Note not found'}), 404
+    upload = Upload.query.filter_by(note_id=note.id).first()
+    file_type = upload.file_type if upload else file_extension(os.path.basename(note.file_path or ''))
+    return _send_blob(note.file_path, file_type, note.title or 'note')
@@ -37,6 +37,7 @@ CREATE TABLE IF NOT EXISTS notes (
 
 CREATE INDEX idx_notes_user_id ON notes(user_id);
 CREATE INDEX idx_notes_course_id ON notes(course_id);
+CREATE INDEX idx_notes_user_created ON notes(user_id, created_at, id);
 
 -- Flashcards table
 CREATE TABLE IF NOT EXISTS flashcards (
@@ -48,12 +49,17 @@ CREATE TABLE IF NOT EXISTS flashcards (
     difficulty INTEGER DEFAULT 0,
     next_review TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     review_count INTEGER DEFAULT 0,
+    ease_factor FLOAT DEFAULT 2.5,
+    interval_days FLOAT DEFAULT 0.0,
+    last_reviewed TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX idx_flashcards_note_id ON flashcards(note_id);
 CREATE INDEX idx_flashcards_user_id ON flashcards(user_id);
 CREATE INDEX idx_flashcards_next_review ON flashcards(next_review);
+CREATE INDEX idx_flashcards_user_next_review ON flashcards(user_id, next_review, id);
+CREATE INDEX idx_flashcards_user_created ON flashcards(user_id, created_at, id);
 
 -- Study Rooms table
 CREATE TABLE IF NOT EXISTS study_rooms (
@@ -89,6 +95,8 @@ CREATE TABLE IF NOT EXISTS exam_predictions (
 );
 
 CREATE INDEX idx_exam_predictions_course_id ON exam_predictions(course_id);
+CREATE INDEX idx_exam_predictions_course_confidence ON exam_predictions(course_id, confidence_score);
+CREATE INDEX idx_exam_predictions_course_created ON exam_predictions(course_id, created_at, id);
 
 -- Study Partners table
 CREATE TABLE IF NOT EXISTS study_partners (
@@ -102,6 +110,8 @@ CREATE TABLE IF NOT EXISTS study_partners (
 
 CREATE INDEX idx_study_partners_user1_id ON study_partners(user1_id);
 CREATE INDEX idx_study_partners_user2_id ON study_partners(user2_id);
+CREATE INDEX idx_study_partners_user1_created ON study_partners(user1_id, created_at, id);
+CREATE INDEX idx_study_partners_user2_created ON study_partners(user2_id, created_at, id);
 
 -- Analytics table
 CREATE TABLE IF NOT EXISTS analytics (
@@ -121,8 +131,179 @@ CREATE TABLE IF NOT EXISTS achievements (
     id SERIAL PRIMARY KEY,
     user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     badge_type VARCHAR(100) NOT NULL,
-    earned_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    earned_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_achievements_user_badge UNIQUE (user_id, badge_type)
 );
 
 CREATE INDEX idx_achievements_user_id ON achievements(user_id);
 
+
+-- Note search index (postings maintained incrementally from notes writes)
+CREATE TABLE IF NOT EXISTS note_terms (
+    id SERIAL PRIMARY KEY,
+    note_id INTEGER NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    term VARCHAR(100) NOT NULL,
+    term_frequency INTEGER DEFAULT 0,
+    positions JSONB DEFAULT '[]'
+);
+
+CREATE INDEX idx_note_terms_note_id ON note_terms(note_id);
+CREATE INDEX idx_note_terms_user_term ON note_terms(user_id, term varchar_pattern_ops);
+
+CREATE TABLE IF NOT EXISTS note_documents (
+    note_id INTEGER PRIMARY KEY REFERENCES notes(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    length INTEGER DEFAULT 0
+);
+
+CREATE INDEX idx_note_documents_user_id ON note_documents(user_id);
+
+-- User <-> course membership graph (derived from notes)
+CREATE TABLE IF NOT EXISTS user_courses (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    note_count INTEGER DEFAULT 0,
+    PRIMARY KEY (user_id, course_id)
+);
+
+CREATE INDEX idx_user_courses_course_id ON user_courses(course_id);
+
+-- Study room chat history
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id SERIAL PRIMARY KEY,
+    message_uid VARCHAR(32) UNIQUE NOT NULL,
+    room_id INTEGER NOT NULL REFERENCES study_rooms(id) ON DELETE CASCADE,
+    user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+    username VARCHAR(120),
+    message TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_chat_messages_room_created ON chat_messages(room_id, created_at, message_uid);
+
+-- Analytics rollups (day / week / month)
+CREATE TABLE IF NOT EXISTS analytics_rollups (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    period VARCHAR(5) NOT NULL,
+    period_start DATE NOT NULL,
+    study_time INTEGER DEFAULT 0,
+    sessions INTEGER DEFAULT 0,
+    days_active INTEGER DEFAULT 0,
+    PRIMARY KEY (user_id, period, period_start)
+);
+
+CREATE TABLE IF NOT EXISTS analytics_topic_rollups (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    period VARCHAR(5) NOT NULL,
+    period_start DATE NOT NULL,
+    topic VARCHAR(200) NOT NULL,
+    study_time INTEGER DEFAULT 0,
+    sessions INTEGER DEFAULT 0,
+    PRIMARY KEY (user_id, period, period_start, topic)
+);
+
+-- Achievement counters (maintained from note/flashcard/session/partner writes)
+CREATE TABLE IF NOT EXISTS achievement_counters (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    counter VARCHAR(50) NOT NULL,
+    value INTEGER DEFAULT 0,
+    PRIMARY KEY (user_id, counter)
+);
+
+-- Exam prediction term vectors (per note) and their per-course sums
+CREATE TABLE IF NOT EXISTS note_term_vectors (
+    note_id INTEGER PRIMARY KEY REFERENCES notes(id) ON DELETE CASCADE,
+    course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    terms JSONB DEFAULT '{}'
+);
+
+CREATE INDEX idx_note_term_vectors_course_id ON note_term_vectors(course_id);
+
+CREATE TABLE IF NOT EXISTS course_terms (
+    course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    term VARCHAR(201) NOT NULL,
+    weight INTEGER DEFAULT 0,
+    note_count INTEGER DEFAULT 0,
+    PRIMARY KEY (course_id, term)
+);
+
+CREATE INDEX idx_course_terms_course_notes ON course_terms(course_id, note_count, weight);
+
+-- Shared course resources
+CREATE TABLE IF NOT EXISTS resources (
+    id SERIAL PRIMARY KEY,
+    course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    uploader_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    title VARCHAR(200) NOT NULL,
+    file_path VARCHAR(500) NOT NULL,
+    file_type VARCHAR(50),
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_resources_course_id ON resources(course_id);
+CREATE INDEX idx_resources_created ON resources(created_at, id);
+CREATE INDEX idx_resources_course_created ON resources(course_id, created_at, id);
+
+-- File uploads (processed in the background) and their content-addressed blobs
+CREATE TABLE IF NOT EXISTS uploads (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    note_id INTEGER REFERENCES notes(id) ON DELETE SET NULL,
+    resource_id INTEGER REFERENCES resources(id) ON DELETE SET NULL,
+    filename VARCHAR(255),
+    file_path VARCHAR(500) NOT NULL,
+    file_type VARCHAR(50),
+    size INTEGER DEFAULT 0,
+    status VARCHAR(20) DEFAULT 'processing',
+    page_count INTEGER,
+    thumbnail_path VARCHAR(500),
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP
+);
+
+CREATE INDEX idx_uploads_user_id ON uploads(user_id);
+
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 VARCHAR(64) PRIMARY KEY,
+    size BIGINT DEFAULT 0,
+    ref_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_blobs_ref_count ON blobs(ref_count);
+
+-- Study plans, their weighted topics and the per-day schedule
+CREATE TABLE IF NOT EXISTS study_plans (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    title VARCHAR(200),
+    exam_date TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    schedule JSON DEFAULT '[]'
+);
+
+CREATE INDEX idx_study_plans_user_id ON study_plans(user_id);
+
+CREATE TABLE IF NOT EXISTS study_plan_topics (
+    plan_id INTEGER NOT NULL REFERENCES study_plans(id) ON DELETE CASCADE,
+    topic VARCHAR(200) NOT NULL,
+    course_id INTEGER REFERENCES courses(id) ON DELETE CASCADE,
+    weight FLOAT DEFAULT 1.0,
+    target_hours FLOAT DEFAULT 0.0,
+    done_hours FLOAT DEFAULT 0.0,
+    PRIMARY KEY (plan_id, topic)
+);
+
+CREATE TABLE IF NOT EXISTS study_plan_days (
+    plan_id INTEGER NOT NULL REFERENCES study_plans(id) ON DELETE CASCADE,
+    date DATE NOT NULL,
+    topic VARCHAR(200) NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    hours FLOAT DEFAULT 0.0,
+    PRIMARY KEY (plan_id, date, topic)
+);
+
+CREATE INDEX idx_study_plan_days_user_date ON study_plan_days(user_id, date);
@@ -0,0 +1,337 @@
+"""
+Event-driven achievements.
+
+Each user has a small set of counters in achievement_counters (notes,
+flashcards, reviews, study sessions, study minutes, partners). Mapper
+events and the bulk write paths bump them in the same transaction as
+the write itself, and remember which (user, counter) pairs changed.
+
+Once that transaction commits, the pairs are queued on the app's
+AchievementEngine. A background task evaluates only the rules that
+watch those counters and inserts any newly earned Achievement rows, so
+reading achievements never has to count anything.
+"""
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from models import Achievement, AchievementCounter, AnalyticsRollup, Flashcard, Note, StudyPartner, StudySession
+from utils.upsert import insert_ignore, upsert_increment
+
+ACHIEVEMENT_RULES = [
+    {'badge_type': 'first_note', 'counter': 'notes', 'threshold': 1, 'description': 'Create your first note'},
+    {'badge_type': 'note_taker', 'counter': 'notes', 'threshold': 10, 'description': 'Create 10 notes'},
+    {'badge_type': 'note_master', 'counter': 'notes', 'threshold': 50, 'description': 'Create 50 notes'},
+    {'badge_type': 'first_flashcard', 'counter': 'flashcards', 'threshold': 1, 'description': 'Create your first flashcard'},
+    {'badge_type': 'flashcard_collector', 'counter': 'flashcards', 'threshold': 100, 'description': 'Create 100 flashcards'},
+    {'badge_type': 'first_review', 'counter': 'reviews', 'threshold': 1, 'description': 'Review a flashcard'},
+    {'badge_type': 'dedicated_reviewer', 'counter': 'reviews', 'threshold': 500, 'description': 'Review 500 flashcards'},
+    {'badge_type': 'first_session', 'counter': 'study_sessions', 'threshold': 1, 'description': 'Join a study room session'},
+    {'badge_type': 'study_group_regular', 'counter': 'study_sessions', 'threshold': 10, 'description': 'Join 10 study room sessions'},
+    {'badge_type': 'ten_hours', 'counter': 'study_minutes', 'threshold': 600, 'description': 'Log 10 hours of study'},
+    {'badge_type': 'hundred_hours', 'counter': 'study_minutes', 'threshold': 6000, 'description': 'Log 100 hours of study'},
+    {'badge_type': 'first_partner', 'counter': 'partners', 'threshold': 1, 'description': 'Team up with a study partner'}
+]
+
+RULES_BY_COUNTER = defaultdict(list)
+for _rule in ACHIEVEMENT_RULES:
+    RULES_BY_COUNTER[_rule['counter']].append(_rule)
+
+PROGRESS_TTL = 60  # seconds; bounds staleness from writes in other workers
+PROGRESS_MAX_ENTRIES = 10000
+SESSION_KEY = 'achievement_counters'
+
+_progress_cache = {}
+
+
+def invalidate(*user_ids):
+    for user_id in user_ids:
+        _progress_cache.pop(user_id, None)
+
+
+# ---------------------------------------------------------------------------
+# Counters
+# ---------------------------------------------------------------------------
+
+def bump(executor, session, deltas):
+    """Add {(user_id, counter): delta} to the counters inside the current transaction"""
+    deltas = {key: delta for key, delta in deltas.items() if delta and key[0] is not None}
+    if not deltas:
+        return
+    upsert_increment(executor, AchievementCounter.__table__, [
+        {'user_id': user_id, 'counter': counter, 'value': delta}
+        for (user_id, counter), delta in deltas.items()
+    ], keys=['user_id', 'counter'], increments=['value'])
+    if session is not None:
+        session.info.setdefault(SESSION_KEY, set()).update(deltas)
+
+
+@event.listens_for(Note, 'after_insert')
+def _note_inserted(mapper, connection, note):
+    bump(connection, object_session(note), {(note.user_id, 'notes'): 1})
+
+
+@event.listens_for(Note, 'after_delete')
+def _note_deleted(mapper, connection, note):
+    bump(connection, object_session(note), {(note.user_id, 'notes'): -1})
+
+
+@event.listens_for(Flashcard, 'after_insert')
+def _flashcard_inserted(mapper, connection, card):
+    bump(connection, object_session(card), {(card.user_id, 'flashcards'): 1})
+
+
+@event.listens_for(Flashcard, 'after_update')
+def _flashcard_updated(mapper, connection, card):
+    state = inspect(card)
+    if state.attrs.review_count.history.has_changes() or state.attrs.last_reviewed.history.has_changes():
+        bump(connection, object_session(card), {(card.user_id, 'reviews'): 1})
+
+
+@event.listens_for(Flashcard, 'after_delete')
+def _flashcard_deleted(mapper, connection, card):
+    bump(connection, object_session(card), {(card.user_id, 'flashcards'): -1})
+
+
+@event.listens_for(StudySession, 'after_insert')
+def _session_inserted(mapper, connection, study_session):
+    bump(connection, object_session(study_session), {(study_session.user_id, 'study_sessions'): 1})
+
+
+def _partner_delta(partnership, was_accepted, is_accepted):
+    delta = int(is_accepted) - int(was_accepted)
+    return {(partnership.user1_id, 'partners'): delta, (partnership.user2_id, 'partners'): delta}
+
+
+@event.listens_for(StudyPartner, 'after_insert')
+def _partnership_inserted(mapper, connection, partnership):
+    bump(connection, object_session(partnership),
+         _partner_delta(partnership, False, partnership.status == 'accepted'))
+
+
+@event.listens_for(StudyPartner, 'after_update')
+def _partnership_updated(mapper, connection, partnership):
+    history = inspect(partnership).attrs.status.history
+    if history.has_changes():
+        was_accepted = bool(history.deleted) and history.deleted[0] == 'accepted'
+        bump(connection, object_session(partnership),
+             _partner_delta(partnership, was_accepted, partnership.status == 'accepted'))
+
+
+@event.listens_for(StudyPartner, 'after_delete')
+def _partnership_deleted(mapper, connection, partnership):
+    bump(connection, object_session(partnership),
+         _partner_delta(partnership, partnership.status == 'accepted', False))
+
+
+@event.listens_for(Session, 'after_commit')
+def _queue_committed(session):
+    touched = session.info.pop(SESSION_KEY, None)
+    if not touched:
+        return
+    invalidate(*{user_id for user_id, _ in touched})
+    if has_app_context() and 'achievements' in current_app.extensions:
+        current_app.extensions['achievements'].enqueue(touched)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_uncommitted(session):
+    session.info.pop(SESSION_KEY, None)
+
+
+def rebuild_counters():
+    """Recompute every counter from the source tables. Returns the row count."""
+    counts = defaultdict(int)
+    sources = [
+        ('notes', db.session.query(Note.user_id, func.count()).group_by(Note.user_id)),
+        ('flashcards', db.session.query(Flashcard.user_id, func.count()).group_by(Flashcard.user_id)),
+        # review_count restarts after a miss, so older history is undercounted
+        ('reviews', db.session.query(
+            Flashcard.user_id, func.coalesce(func.sum(Flashcard.review_count), 0)
+        ).group_by(Flashcard.user_id)),
+        ('study_sessions', db.session.query(StudySession.user_id, func.count()).group_by(StudySession.user_id)),
+        ('study_minutes', db.session.query(
+            AnalyticsRollup.user_id, func.coalesce(func.sum(AnalyticsRollup.study_time), 0)
+        ).filter(AnalyticsRollup.period == 'month').group_by(AnalyticsRollup.user_id))
+    ]
+    for counter, query in sources:
+        for user_id, value in query.all():
+            counts[(user_id, counter)] += int(value)
+    for column in (StudyPartner.user1_id, StudyPartner.user2_id):
+        for user_id, value in db.session.query(column, func.count()).filter(
+            StudyPartner.status == 'accepted'
+        ).group_by(column).all():
+            counts[(user_id, 'partners')] += value
+
+    db.session.execute(AchievementCounter.__table__.delete())
+    if counts:
+        db.session.execute(AchievementCounter.__table__.insert(), [
+            {'user_id': user_id, 'counter': counter, 'value': value}
+            for (user_id, counter), value in counts.items()
+        ])
+    db.session.commit()
+    _progress_cache.clear()
+    return len(counts)
+
+
+# ---------------------------------------------------------------------------
+# Rule evaluation
+# ---------------------------------------------------------------------------
+
+def evaluate(pairs, now=None):
+    """Award badges for the rules watching the given (user_id, counter) pairs.
+
+    Returns the newly awarded (user_id, badge_type) pairs; the caller commits.
+    """
+    pairs = {(user_id, counter) for user_id, counter in pairs if RULES_BY_COUNTER.get(counter)}
+    if not pairs:
+        return []
+    user_ids = {user_id for user_id, _ in pairs}
+    counters = {counter for _, counter in pairs}
+    badges = {rule['badge_type'] for counter in counters for rule in RULES_BY_COUNTER[counter]}
+
+    values = {
+        (user_id, counter): value
+        for user_id, counter, value in db.session.query(
+            AchievementCounter.user_id, AchievementCounter.counter, AchievementCounter.value
+        ).filter(AchievementCounter.user_id.in_(user_ids), AchievementCounter.counter.in_(counters)).all()
+    }
+    earned = set(db.session.query(Achievement.user_id, Achievement.badge_type).filter(
+        Achievement.user_id.in_(user_ids), Achievement.badge_type.in_(badges)
+    ).all())
+
+    awarded = sorted({
+        (user_id, rule['badge_type'])
+        for user_id, counter in pairs
+        for rule in RULES_BY_COUNTER[counter]
+        if values.get((user_id, counter), 0) >= rule['threshold'] and (user_id, rule['badge_type']) not in earned
+    })
+    now = now or datetime.utcnow()
+    # Another worker may award the same badge concurrently; the unique key keeps one
+    insert_ignore(db.session, Achievement.__table__, [
+        {'user_id': user_id, 'badge_type': badge_type, 'earned_date': now}
+        for user_id, badge_type in awarded
+    ], keys=['user_id', 'badge_type'])
+    return awarded
+
+
+def evaluate_all():
+    """Evaluate every rule for every user with counters. Returns badges awarded."""
+    pairs = db.session.query(AchievementCounter.user_id, AchievementCounter.counter).all()
+    awarded = evaluate(pairs)
+    db.session.commit()
+    _progress_cache.clear()
+    return len(awarded)
+
+
+class AchievementEngine:
+    def __init__(self, app, socketio, eval_interval_ms=1000):
+        self.app = app
+        self.socketio = socketio
+        self.eval_interval = eval_interval_ms / 1000.0
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._process_lock = threading.Lock()
+        self._worker_started = False
+
+    def enqueue(self, pairs):
+        with self._lock:
+            self._pending.update(pairs)
+            if not self._worker_started:
+                self._worker_started = True
+                self.socketio.start_background_task(self._run)
+
+    def process(self):
+        """Evaluate everything queued so far. Returns the awarded (user_id, badge_type) pairs."""
+        with self._process_lock:
+            with self._lock:
+                pairs, self._pending = self._pending, set()
+            if not pairs:
+                return []
+            with self.app.app_context():
+                try:
+                    awarded = evaluate(pairs)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    with self._lock:
+                        self._pending.update(pairs)
+                    raise
+            invalidate(*{user_id for user_id, _ in awarded})
+            return awarded
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.eval_interval)
+            try:
+                self.process()
+            except Exception:
+                self.app.logger.exception('Achievement evaluation failed')
+
+
+def init_achievements(app):
+    engine = AchievementEngine(
+        app,
+        app.extensions['socketio'],
+        eval_interval_ms=app.config.get('ACHIEVEMENT_EVAL_INTERVAL_MS', 1000)
+    )
+    app.extensions['achievements'] = engine
+    return engine
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+def achievement_to_dict(achievement):
+    return {
+        'id': achievement.id,
+        'badge_type': achievement.badge_type,
+        'earned_date': achievement.earned_date.isoformat() if achievement.earned_date else None
+    }
+
+
+def list_achievements(user_id):
+    """Earned badges, newest first: one indexed read, no counting"""
+    return Achievement.query.filter_by(user_id=user_id).order_by(
+        Achievement.earned_date.desc(), Achievement.id.desc()
+    ).all()
+
+
+def progress(user_id):
+    """Counters and per-rule progress, cached per user until their counters change"""
+    entry = _progress_cache.get(user_id)
+    now = time.monotonic()
+    if entry and now - entry[0] < PROGRESS_TTL:
+        return entry[1]
+
+    counters = dict(db.session.query(AchievementCounter.counter, AchievementCounter.value).filter(
+        AchievementCounter.user_id == user_id
+    ).all())
+    earned = {row[0] for row in db.session.query(Achievement.badge_type).filter(
+        Achievement.user_id == user_id
+    ).all()}
+    result = {
+        'counters': {counter: counters.get(counter, 0) for counter in RULES_BY_COUNTER},
+        'achievements': [
+            {
+                'badge_type': rule['badge_type'],
+                'description': rule['description'],
+                'current': min(counters.get(rule['counter'], 0), rule['threshold']),
+                'threshold': rule['threshold'],
+                'earned': rule['badge_type'] in earned
+            }
+            for rule in ACHIEVEMENT_RULES
+        ],
+        'earned_count': len(earned)
+    }
+    if len(_progress_cache) >= PROGRESS_MAX_ENTRIES:
+        _progress_cache.pop(next(iter(_progress_cache)))
+    _progress_cache[user_id] = (now, result)
+    return result
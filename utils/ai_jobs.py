@@ -0,0 +1,315 @@
+"""
+Background execution of AI requests (note summaries, questions).
+
+Requests are submitted as jobs and answered by a bounded pool of
+workers instead of calling the model inside the HTTP request:
+
+- every job has a content key: a SHA-256 of the model, the prompt and
+  the note text it is built from
+- a finished key is served from a TTL/LRU ResultCache without calling
+  the model at all
+- a key that is already queued or running is coalesced: the new caller
+  is attached to the existing job and one upstream call answers both
+- when the queue is full the submit is rejected instead of piling up
+
+Clients poll GET /ai/jobs/<id> or listen for the `ai_job` socket event,
+which is pushed to the `user:<id>` room of every subscriber.
+
+Workers are socketio background tasks, i.e. greenlets under the gevent
+worker. google-generativeai talks gRPC, which does not yield to gevent,
+so when gevent is active model calls are handed to a gevent ThreadPool
+of AI_WORKERS real OS threads and the worker greenlet waits on it
+cooperatively; the rest of the process keeps serving requests.
+
+GeminiModel calls google-generativeai; StubModel is a local stand-in
+with configurable latency for development and benchmarks.
+"""
+import hashlib
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+
+from utils.db_engine import gevent_active
+from utils.search_index import search_notes
+
+SUMMARIZE_PROMPT = (
+    "Summarize the following study notes in a few concise bullet points, "
+    "keeping definitions and key facts:\n\n{text}"
+)
+ASK_PROMPT = (
+    "Answer the student's question using the study notes below when they are relevant.\n\n"
+    "Notes:\n{text}\n\nQuestion: {question}"
+)
+ASK_CONTEXT_NOTES = 3
+MAX_CONTEXT_CHARS = 4000
+JOB_RETENTION_SECONDS = 600
+MAX_JOBS = 10000
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def summarize_prompt(note):
+    return SUMMARIZE_PROMPT.format(text=(note.content or '')[:MAX_CONTEXT_CHARS])
+
+
+def ask_prompt(user_id, question):
+    """Question plus the user's best-matching notes as context"""
+    context = '\n\n'.join(
+        f'{note.title or "Untitled"}: {note.content or ""}'
+        for note, _ in search_notes(user_id, question, limit=ASK_CONTEXT_NOTES)
+    )
+    return ASK_PROMPT.format(text=context[:MAX_CONTEXT_CHARS] or '(no matching notes)', question=question)
+
+
+# ---------------------------------------------------------------------------
+# Models
+# ---------------------------------------------------------------------------
+
+class GeminiModel:
+    def __init__(self, api_key, model_name='gemini-2.0-flash'):
+        try:
+            import google.generativeai as genai
+        except ImportError as e:
+            raise RuntimeError('GeminiModel requires the google-generativeai package') from e
+        genai.configure(api_key=api_key)
+        self.name = f'gemini:{model_name}'
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt):
+        return self._model.generate_content(prompt).text
+
+
+class StubModel:
+    """Deterministic offline model: echoes the start of the prompt after a delay"""
+
+    def __init__(self, latency_ms=300):
+        self.name = 'stub'
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.active -= 1
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        body = ' '.join(prompt.split()[:40])
+        return f'[stub {digest}] {body}'
+
+
+def make_model(config):
+    if config.get('AI_MODEL', 'stub') == 'gemini':
+        return GeminiModel(config.get('GEMINI_API_KEY'), config.get('AI_MODEL_NAME', 'gemini-2.0-flash'))
+    return StubModel(config.get('AI_STUB_LATENCY_MS', 300))
+
+
+# ---------------------------------------------------------------------------
+# Result cache
+# ---------------------------------------------------------------------------
+
+class ResultCache:
+    """Content-addressed results with a TTL, evicting least recently used first"""
+
+    def __init__(self, max_entries=1000, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def content_key(model_name, prompt):
+    return hashlib.sha256(f'{model_name}\0{prompt}'.encode('utf-8')).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Jobs
+# ---------------------------------------------------------------------------
+
+class AIJob:
+    def __init__(self, kind, key, prompt):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.prompt = prompt
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.cached = False
+        self.subscribers = set()
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+        self.finished_monotonic = None
+        self.done = threading.Event()
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.status = 'error' if error else 'done'
+        self.finished_at = datetime.utcnow()
+        self.finished_monotonic = time.monotonic()
+        self.done.set()
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'type': self.kind,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'cached': self.cached,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class AIJobRunner:
+    def __init__(self, socketio, model, workers=4, queue_size=100, cache=None):
+        self.socketio = socketio
+        self.model = model
+        self.workers = workers
+        self.cache = cache or ResultCache()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._workers_started = False
+        self._threadpool = None
+        self.stats = {'submitted': 0, 'cache_hits': 0, 'coalesced': 0, 'upstream_calls': 0,
+                      'failed': 0, 'rejected': 0}
+
+    def submit(self, kind, prompt, user_id):
+        """Queue prompt for user_id; returns the (possibly shared or cached) AIJob"""
+        key = content_key(self.model.name, prompt)
+        with self._lock:
+            self.stats['submitted'] += 1
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                job = AIJob(kind, key, prompt)
+                job.cached = True
+                job.subscribers.add(user_id)
+                job.finish(cached)
+                self._remember(job)
+                return job
+
+            job = self._inflight.get(key)
+            if job is not None:
+                self.stats['coalesced'] += 1
+                job.subscribers.add(user_id)
+                return job
+
+            job = AIJob(kind, key, prompt)
+            job.subscribers.add(user_id)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.stats['rejected'] += 1
+                raise QueueFullError('AI queue is full, try again shortly')
+            self._inflight[key] = job
+            self._remember(job)
+            if not self._workers_started:
+                self._workers_started = True
+                if gevent_active():
+                    from gevent.threadpool import ThreadPool
+                    self._threadpool = ThreadPool(self.workers)
+                for _ in range(self.workers):
+                    self.socketio.start_background_task(self._work)
+            return job
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+        while self._jobs:
+            oldest = next(iter(self._jobs.values()))
+            expired = oldest.done.is_set() and oldest.finished_monotonic < cutoff
+            if len(self._jobs) <= MAX_JOBS and not expired:
+                break
+            self._jobs.popitem(last=False)
+
+    def get(self, job_id, user_id):
+        """The job if user_id is subscribed to it, else None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or user_id not in job.subscribers:
+            return None
+        return job
+
+    def _generate(self, prompt):
+        if self._threadpool is not None:
+            # Blocks only this greenlet; the call runs on a real thread
+            return self._threadpool.apply(self.model.generate, (prompt,))
+        return self.model.generate(prompt)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.status = 'running'
+            try:
+                with self._lock:
+                    self.stats['upstream_calls'] += 1
+                result = self._generate(job.prompt)
+                self.cache.put(job.key, result)
+                error = None
+            except Exception as e:
+                result, error = None, str(e)
+                with self._lock:
+                    self.stats['failed'] += 1
+            with self._lock:
+                self._inflight.pop(job.key, None)
+                job.finish(result, error)
+                subscribers = list(job.subscribers)
+            for user_id in subscribers:
+                self.socketio.emit('ai_job', job.to_dict(), to=f'user:{user_id}')
+
+
+def init_ai_jobs(app, model=None):
+    runner = AIJobRunner(
+        app.extensions['socketio'],
+        model or make_model(app.config),
+        workers=app.config.get('AI_WORKERS', 4),
+        queue_size=app.config.get('AI_QUEUE_SIZE', 100),
+        cache=ResultCache(app.config.get('AI_CACHE_SIZE', 1000), app.config.get('AI_CACHE_TTL_SECONDS', 3600))
+    )
+    app.extensions['ai_jobs'] = runner
+    return runner
+
+
+def get_ai_jobs():
+    return current_app.extensions['ai_jobs']
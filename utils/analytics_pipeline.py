@@ -0,0 +1,461 @@
+"""
+Write-behind aggregation pipeline for study analytics.
+
+Study-time events are appended to an in-process queue instead of being
+upserted into analytics one request at a time. A background task drains
+the queue every ANALYTICS_FLUSH_INTERVAL_MS, coalesces the batch in
+memory and applies it as increments to precomputed rollups:
+
+    analytics_rollups        study time, sessions and days active per
+                             user per day, week (Monday) and month
+    analytics_topic_rollups  the same per topic, exploded out of
+                             topics_covered
+
+Each flushed event is also appended to the analytics table in the same
+transaction. That table stays the source of truth: rebuild_rollups()
+recomputes the rollups from it, so a rebuild keeps every event recorded
+through the pipeline.
+
+Dashboard reads only touch the rollups: a date window is split into the
+coarsest whole months/weeks it contains plus the leftover days, so three
+years of history is a few dozen rows instead of a thousand JSON blobs.
+"""
+import atexit
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, bindparam, func, or_, select
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+from models import Analytics, AnalyticsRollup, TopicRollup
+from utils import achievements, study_planner
+from utils.upsert import upsert_increment
+
+PERIODS = ('day', 'week', 'month')
+FLUSH_BATCH_SIZE = 5000
+MAX_PENDING = 100000
+MAX_TOPIC_LENGTH = 200
+MAX_STUDY_TIME = 24 * 60  # minutes in one event
+MAX_DASHBOARD_DAYS = 3660
+WEAK_TOPIC_COUNT = 5
+
+
+# ---------------------------------------------------------------------------
+# Periods
+# ---------------------------------------------------------------------------
+
+def period_start(day, period):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def period_end(start, period):
+    """First day after the period beginning at start"""
+    if period == 'week':
+        return start + timedelta(days=7)
+    if period == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def split_range(start, end):
+    """Cover [start, end] with whole months, then whole weeks, then days.
+
+    Returns {period: [period_start, ...]}.
+    """
+    spans = {period: [] for period in PERIODS}
+    cursor = start
+    while cursor <= end:
+        for period in ('month', 'week', 'day'):
+            if period_start(cursor, period) == cursor and period_end(cursor, period) <= end + timedelta(days=1):
+                spans[period].append(cursor)
+                cursor = period_end(cursor, period)
+                break
+    return spans
+
+
+# ---------------------------------------------------------------------------
+# Events
+# ---------------------------------------------------------------------------
+
+def parse_event(data):
+    """Validate a study-time event payload -> (date, study_time, topics)"""
+    if not isinstance(data, dict):
+        raise ValueError('Event must be an object')
+    raw_date = data.get('date')
+    if raw_date:
+        try:
+            day = datetime.strptime(raw_date, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise ValueError('date must be YYYY-MM-DD')
+    else:
+        day = datetime.utcnow().date()
+
+    study_time = data.get('study_time', 0)
+    if isinstance(study_time, bool) or not isinstance(study_time, int) or not 0 <= study_time <= MAX_STUDY_TIME:
+        raise ValueError(f'study_time must be an integer from 0 to {MAX_STUDY_TIME} (minutes)')
+
+    topics = data.get('topics_covered') or []
+    if not isinstance(topics, list):
+        raise ValueError('topics_covered must be a list')
+    return day, study_time, normalize_topics(topics)
+
+
+def normalize_topics(topics):
+    seen = []
+    for topic in topics:
+        if not isinstance(topic, str):
+            continue
+        topic = topic.strip()[:MAX_TOPIC_LENGTH]
+        if topic and topic not in seen:
+            seen.append(topic)
+    return seen
+
+
+def aggregate(events):
+    """Coalesce (user_id, date, study_time, topics) events into rollup deltas"""
+    totals = defaultdict(lambda: [0, 0])
+    topics = defaultdict(lambda: [0, 0])
+    days = set()
+    for user_id, day, study_time, event_topics in events:
+        days.add((user_id, day))
+        for period in PERIODS:
+            start = period_start(day, period)
+            entry = totals[(user_id, period, start)]
+            entry[0] += study_time
+            entry[1] += 1
+            for topic in event_topics:
+                entry = topics[(user_id, period, start, topic)]
+                entry[0] += study_time
+                entry[1] += 1
+    return totals, topics, days
+
+
+# ---------------------------------------------------------------------------
+# Applying deltas
+# ---------------------------------------------------------------------------
+
+def _refresh_days_active(keys):
+    """Recount active days for the given week/month rollups from their day rows"""
+    if not keys:
+        return
+    table = AnalyticsRollup.__table__
+    day_rows = table.alias('day_rows')
+    active = select(func.count()).where(
+        day_rows.c.user_id == table.c.user_id,
+        day_rows.c.period == 'day',
+        day_rows.c.period_start >= table.c.period_start,
+        day_rows.c.period_start < bindparam('b_end')
+    ).scalar_subquery()
+    stmt = table.update().where(
+        table.c.user_id == bindparam('b_user_id'),
+        table.c.period == bindparam('b_period'),
+        table.c.period_start == bindparam('b_start')
+    ).values(days_active=active)
+    db.session.execute(stmt, [
+        {'b_user_id': user_id, 'b_period': period, 'b_start': start, 'b_end': period_end(start, period)}
+        for user_id, period, start in keys
+    ])
+
+
+def apply_events(events):
+    """Roll a batch of events into the rollup tables (no commit)"""
+    totals, topics, days = aggregate(events)
+    upsert_increment(db.session, AnalyticsRollup.__table__, [
+        {
+            'user_id': user_id, 'period': period, 'period_start': start,
+            'study_time': study_time, 'sessions': sessions,
+            'days_active': 1 if period == 'day' else 0
+        }
+        for (user_id, period, start), (study_time, sessions) in totals.items()
+    ], keys=['user_id', 'period', 'period_start'], increments=['study_time', 'sessions'])
+    upsert_increment(db.session, TopicRollup.__table__, [
+        {
+            'user_id': user_id, 'period': period, 'period_start': start, 'topic': topic,
+            'study_time': study_time, 'sessions': sessions
+        }
+        for (user_id, period, start, topic), (study_time, sessions) in topics.items()
+    ], keys=['user_id', 'period', 'period_start', 'topic'], increments=['study_time', 'sessions'])
+    _refresh_days_active({
+        (user_id, period, period_start(day, period))
+        for user_id, day in days for period in ('week', 'month')
+    })
+    return len(events)
+
+
+def log_events(events):
+    """Append raw events to the analytics table (no commit)"""
+    now = datetime.utcnow()
+    db.session.execute(Analytics.__table__.insert(), [
+        {'user_id': user_id, 'date': day, 'study_time': study_time,
+         'topics_covered': list(topics), 'created_at': now}
+        for user_id, day, study_time, topics in events
+    ])
+
+
+def rebuild_rollups(user_id=None, chunk_size=FLUSH_BATCH_SIZE):
+    """Recompute rollups from the analytics table. Returns rows read."""
+    for model in (AnalyticsRollup, TopicRollup):
+        query = model.query
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        query.delete(synchronize_session=False)
+
+    query = db.session.query(
+        Analytics.id, Analytics.user_id, Analytics.date, Analytics.study_time, Analytics.topics_covered
+    )
+    if user_id is not None:
+        query = query.filter(Analytics.user_id == user_id)
+
+    count = 0
+    last_id = 0
+    while True:
+        rows = query.filter(Analytics.id > last_id).order_by(Analytics.id).limit(chunk_size).all()
+        if not rows:
+            break
+        apply_events([
+            (row.user_id, row.date, row.study_time or 0, normalize_topics(row.topics_covered or []))
+            for row in rows
+        ])
+        count += len(rows)
+        last_id = rows[-1].id
+    db.session.commit()
+    return count
+
+
+# ---------------------------------------------------------------------------
+# Write-behind queue
+# ---------------------------------------------------------------------------
+
+class AnalyticsPipeline:
+    def __init__(self, app, socketio, flush_interval_ms=1000):
+        self.app = app
+        self.socketio = socketio
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher_started = False
+
+    def record(self, user_id, day, study_time, topics=()):
+        """Queue one study-time event; it reaches the rollups on the next flush"""
+        with self._lock:
+            self._pending.append((user_id, day, study_time, normalize_topics(topics)))
+            flush_now = len(self._pending) >= FLUSH_BATCH_SIZE
+            if not self._flusher_started:
+                self._flusher_started = True
+                self.socketio.start_background_task(self._flush_loop)
+        if flush_now:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _requeue(self, events):
+        with self._lock:
+            # Retry on the next flush, but never hold more than MAX_PENDING
+            self._pending[:0] = events
+            del self._pending[:max(0, len(self._pending) - MAX_PENDING)]
+
+    def _write(self, events):
+        log_events(events)
+        apply_events(events)
+        minutes = defaultdict(int)
+        for user_id, _, study_time, _ in events:
+            minutes[(user_id, 'study_minutes')] += study_time
+        achievements.bump(db.session, db.session(), minutes)
+        # Logged time counts toward study plans and consumes their planned hours
+        study_planner.record_study(events)
+        db.session.commit()
+
+    def flush(self):
+        """
+        Apply queued events in one transaction. Returns the number applied.
+
+        If the batch fails, the events are applied one by one so a single
+        bad event (e.g. for a deleted user) is logged and dropped rather
+        than failing every later flush. A lost connection requeues the rest.
+        """
+        with self._flush_lock:
+            with self._lock:
+                events, self._pending = self._pending, []
+            if not events:
+                return 0
+            with self.app.app_context():
+                try:
+                    self._write(events)
+                    return len(events)
+                except OperationalError:
+                    db.session.rollback()
+                    self._requeue(events)
+                    raise
+                except Exception:
+                    db.session.rollback()
+
+                applied = 0
+                for i, event in enumerate(events):
+                    try:
+                        self._write([event])
+                        applied += 1
+                    except OperationalError:
+                        db.session.rollback()
+                        self._requeue(events[i:])
+                        raise
+                    except Exception:
+                        db.session.rollback()
+                        self.app.logger.exception('Dropping analytics event for user %s on %s', event[0], event[1])
+            return applied
+
+    def _flush_loop(self):
+        while True:
+            self.socketio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception('Analytics flush failed')
+
+
+def init_analytics_pipeline(app):
+    pipeline = AnalyticsPipeline(
+        app,
+        app.extensions['socketio'],
+        flush_interval_ms=app.config.get('ANALYTICS_FLUSH_INTERVAL_MS', 1000)
+    )
+    app.extensions['analytics_pipeline'] = pipeline
+    atexit.register(pipeline.flush)
+    return pipeline
+
+
+def get_analytics_pipeline():
+    return current_app.extensions['analytics_pipeline']
+
+
+# ---------------------------------------------------------------------------
+# Dashboard reads
+# ---------------------------------------------------------------------------
+# Statements are built once; dashboard loads only bind parameters.
+
+def _in_spans(table):
+    # user_id is repeated in every branch so each one is a primary key range scan
+    return or_(*[
+        and_(
+            table.c.user_id == bindparam('user_id'),
+            table.c.period == period,
+            table.c.period_start.in_(bindparam(period, expanding=True))
+        )
+        for period in PERIODS
+    ])
+
+
+_rollups = AnalyticsRollup.__table__
+_topics = TopicRollup.__table__
+
+_SUMMARY = select(
+    func.coalesce(func.sum(_rollups.c.study_time), 0),
+    func.coalesce(func.sum(_rollups.c.sessions), 0),
+    func.coalesce(func.sum(_rollups.c.days_active), 0)
+).where(_in_spans(_rollups))
+
+_topic_time = func.sum(_topics.c.study_time)
+_TOPICS = select(
+    _topics.c.topic, _topic_time, func.sum(_topics.c.sessions)
+).where(_in_spans(_topics)).group_by(_topics.c.topic).order_by(_topic_time, _topics.c.topic)
+
+_SERIES = select(
+    _rollups.c.period_start, _rollups.c.study_time, _rollups.c.sessions, _rollups.c.days_active
+).where(
+    _rollups.c.user_id == bindparam('user_id'),
+    _rollups.c.period == bindparam('period'),
+    _rollups.c.period_start >= bindparam('start'),
+    _rollups.c.period_start <= bindparam('end')
+).order_by(_rollups.c.period_start)
+
+# Every month row (all-time totals) plus the current day and week
+_STATS = select(
+    _rollups.c.period, _rollups.c.period_start, _rollups.c.study_time, _rollups.c.days_active
+).where(
+    _rollups.c.user_id == bindparam('user_id'),
+    or_(
+        _rollups.c.period == 'month',
+        and_(_rollups.c.period == 'week', _rollups.c.period_start == bindparam('week')),
+        and_(_rollups.c.period == 'day', _rollups.c.period_start == bindparam('day'))
+    )
+)
+
+
+def summarize(user_id, start, end):
+    """Totals, days active and per-topic study time for [start, end]"""
+    params = dict(split_range(start, end), user_id=user_id)
+    study_time, sessions, days_active = db.session.execute(_SUMMARY, params).one()
+    topics = db.session.execute(_TOPICS, params).all()
+    return {
+        'total_study_time': int(study_time),
+        'sessions': int(sessions),
+        'days_active': int(days_active),
+        'total_topics': len(topics),
+        # Least-studied topics in the window
+        'weak_topics': [
+            {'topic': topic, 'study_time': int(minutes), 'sessions': int(count)}
+            for topic, minutes, count in topics[:WEAK_TOPIC_COUNT]
+        ]
+    }
+
+
+def series(user_id, start, end, period='day'):
+    """One rollup row per period overlapping [start, end], oldest first"""
+    if period not in PERIODS:
+        raise ValueError('granularity must be day, week or month')
+    rows = db.session.execute(_SERIES, {
+        'user_id': user_id, 'period': period, 'start': period_start(start, period), 'end': end
+    })
+    return [
+        {
+            'period_start': first_day.isoformat(),
+            'study_time': study_time,
+            'sessions': sessions,
+            'days_active': days_active
+        }
+        for first_day, study_time, sessions, days_active in rows
+    ]
+
+
+def stats(user_id, today=None):
+    """Study time today, this week, this month and all time"""
+    today = today or datetime.utcnow().date()
+    this_week = period_start(today, 'week')
+    this_month = period_start(today, 'month')
+    result = {'today': 0, 'this_week': 0, 'this_month': 0, 'total_study_time': 0, 'total_days_active': 0}
+    for period, first_day, study_time, days_active in db.session.execute(_STATS, {
+        'user_id': user_id, 'week': this_week, 'day': today
+    }):
+        if period == 'month':
+            result['total_study_time'] += study_time
+            result['total_days_active'] += days_active
+            if first_day == this_month:
+                result['this_month'] = study_time
+        elif period == 'week':
+            result['this_week'] = study_time
+        else:
+            result['today'] = study_time
+    return result
+
+
+def dashboard(user_id, days=7, granularity='day', today=None):
+    """Everything the analytics dashboard shows, read from the rollups only"""
+    if not 1 <= days <= MAX_DASHBOARD_DAYS:
+        raise ValueError(f'days must be from 1 to {MAX_DASHBOARD_DAYS}')
+    end = today or datetime.utcnow().date()
+    start = end - timedelta(days=days - 1)
+    return {
+        'range': {'start': start.isoformat(), 'end': end.isoformat(), 'days': days},
+        'analytics': series(user_id, start, end, granularity),
+        'summary': summarize(user_id, start, end),
+        'stats': stats(user_id, end)
+    }
@@ -0,0 +1,25 @@
+"""
+Login check for the JSON API.
+
+flask_login.login_required hands unauthenticated requests to the login
+manager's unauthorized handler, which redirects browsers to /login.
+API clients get a 401 JSON error instead, whether or not the app has a
+login manager handler configured.
+"""
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from flask_login import current_user
+from flask_login.config import EXEMPT_METHODS
+
+
+def api_login_required(f):
+    """Like login_required, but answers 401 {'error': ...} for anonymous requests"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if request.method in EXEMPT_METHODS or current_app.config.get('LOGIN_DISABLED'):
+            return f(*args, **kwargs)
+        if not current_user.is_authenticated:
+            return jsonify({'error': 'Unauthorized. Please log in.'}), 401
+        return f(*args, **kwargs)
+    return decorated
@@ -0,0 +1,228 @@
+"""
+Content-addressed store for uploaded files.
+
+Files live under UPLOAD_FOLDER/blobs/<aa>/<bb>/<sha256>, keyed by the
+SHA-256 of their content. store_stream() hashes while it copies a stream
+to a temporary file, so a duplicate is detected in that one pass and the
+copy is simply discarded. For a raw request body that pass is the
+upload itself; a multipart upload has already been spooled by werkzeug
+(to memory or its own temporary file) and is read once more from there.
+
+Note.file_path and Resource.file_path point at blob paths. Blob.ref_count
+is kept in step by mapper events on both models (insert, file_path
+change, delete), including course cascades. Unreferenced blobs are
+removed by collect_garbage() (`flask gc-blobs`) once they have been
+unreferenced and untouched for BLOB_GC_GRACE_SECONDS, which leaves room
+for an upload that found the blob just before its last reference went.
+The same pass removes files with no Blob row at all (stored by an upload
+whose transaction then failed) and leftover tmp/*.part files, once they
+are older than the grace period.
+
+Paths outside the store (older uploads) are ignored by the counting.
+"""
+import hashlib
+import os
+import re
+import time
+import uuid
+from collections import Counter, namedtuple
+
+from sqlalchemy import event, inspect
+
+from extensions import db
+from models import Blob, Note, Resource
+from utils.upsert import upsert_increment
+
+CHUNK_SIZE = 64 * 1024
+GC_QUERY_BATCH = 500
+HEAD_BYTES = 16
+BLOB_DIR = 'blobs'
+TMP_DIR = 'tmp'
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+StoredBlob = namedtuple('StoredBlob', 'sha256 path size duplicate')
+
+
+class BlobTooLarge(Exception):
+    pass
+
+
+def blob_path(root, sha256):
+    return os.path.join(root, BLOB_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def blob_key(path):
+    """The SHA-256 a stored path refers to, or None for files outside the store"""
+    if not path:
+        return None
+    parts = os.path.normpath(path).split(os.sep)
+    if len(parts) < 4 or parts[-4] != BLOB_DIR or not SHA256_RE.match(parts[-1]):
+        return None
+    return parts[-1]
+
+
+def store_stream(stream, root, max_bytes, validate=None, chunk_size=CHUNK_SIZE):
+    """
+    Copy stream into the store, hashing as it goes.
+
+    validate(head) may raise to reject the file from its first bytes before
+    anything is kept. Returns a StoredBlob; duplicate=True when the content
+    was already stored.
+    """
+    tmp_dir = os.path.join(root, TMP_DIR)
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex + '.part')
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    try:
+        with open(tmp_path, 'wb') as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise BlobTooLarge('File too large')
+                if len(head) < HEAD_BYTES:
+                    head += chunk[:HEAD_BYTES - len(head)]
+                digest.update(chunk)
+                out.write(chunk)
+        if validate is not None:
+            validate(head)
+
+        sha256 = digest.hexdigest()
+        path = blob_path(root, sha256)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            os.utime(path)  # keep it clear of the GC grace window
+            return StoredBlob(sha256, path, size, True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return StoredBlob(sha256, path, size, False)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# ---------------------------------------------------------------------------
+# Reference counting
+# ---------------------------------------------------------------------------
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def adjust_refs(executor, deltas):
+    """Add {path: delta} onto the ref counts of the blobs those paths point at"""
+    rows = []
+    for path, delta in deltas.items():
+        sha256 = blob_key(path)
+        if sha256 and delta:
+            rows.append({'sha256': sha256, 'size': _file_size(path), 'ref_count': delta})
+    upsert_increment(executor, Blob.__table__, rows, keys=['sha256'], increments=['ref_count'])
+
+
+def _inserted(mapper, connection, target):
+    if target.file_path:
+        adjust_refs(connection, {target.file_path: 1})
+
+
+def _updated(mapper, connection, target):
+    history = inspect(target).attrs.file_path.history
+    if not history.has_changes():
+        return
+    deltas = Counter()
+    for path in history.deleted:
+        if path:
+            deltas[path] -= 1
+    for path in history.added:
+        if path:
+            deltas[path] += 1
+    adjust_refs(connection, deltas)
+
+
+def _deleted(mapper, connection, target):
+    if target.file_path:
+        adjust_refs(connection, {target.file_path: -1})
+
+
+for _model in (Note, Resource):
+    event.listen(_model, 'after_insert', _inserted)
+    event.listen(_model, 'after_update', _updated)
+    event.listen(_model, 'after_delete', _deleted)
+
+
+def rebuild_refs():
+    """Recount every blob's references from the notes and resources tables"""
+    counts = Counter()
+    for model in (Note, Resource):
+        for path, count in db.session.query(model.file_path, db.func.count()).group_by(model.file_path):
+            if blob_key(path):
+                counts[path] += count
+
+    db.session.execute(Blob.__table__.update().values(ref_count=0))
+    adjust_refs(db.session, counts)
+    db.session.commit()
+    return len(counts)
+
+
+def _remove_files(paths):
+    removed = 0
+    for path in paths:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def _sweep_orphans(root, cutoff):
+    """Delete stored files with no Blob row and stale temporary files older than cutoff"""
+    old_files = {}
+    for dirpath, _, filenames in os.walk(os.path.join(root, BLOB_DIR)):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if SHA256_RE.match(name) and os.path.getmtime(path) < cutoff:
+                old_files[name] = path
+    orphans = []
+    names = list(old_files)
+    for start in range(0, len(names), GC_QUERY_BATCH):
+        batch = names[start:start + GC_QUERY_BATCH]
+        known = {row[0] for row in db.session.query(Blob.sha256).filter(Blob.sha256.in_(batch))}
+        orphans.extend(old_files[name] for name in batch if name not in known)
+
+    tmp_dir = os.path.join(root, TMP_DIR)
+    if os.path.isdir(tmp_dir):
+        for name in os.listdir(tmp_dir):
+            path = os.path.join(tmp_dir, name)
+            if name.endswith('.part') and os.path.getmtime(path) < cutoff:
+                orphans.append(path)
+    return _remove_files(orphans)
+
+
+def collect_garbage(root, grace_seconds=3600):
+    """Delete unreferenced and orphaned files older than the grace period. Returns the number removed."""
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    candidates = [row[0] for row in db.session.query(Blob.sha256).filter(Blob.ref_count <= 0).all()]
+    for sha256 in candidates:
+        path = blob_path(root, sha256)
+        if os.path.exists(path) and os.path.getmtime(path) > cutoff:
+            continue
+        deleted = db.session.execute(
+            Blob.__table__.delete().where(Blob.sha256 == sha256, Blob.ref_count <= 0)
+        ).rowcount
+        db.session.commit()
+        if deleted:
+            thumbnail = os.path.join(root, 'thumbnails', sha256 + '.jpg')
+            for stale in (path, thumbnail):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            removed += 1
+    return removed + _sweep_orphans(root, cutoff)
@@ -0,0 +1,289 @@
+"""
+Persisted, bounded chat history for study rooms.
+
+Accepted messages go into a per-room ring buffer (the last
+CHAT_HISTORY_SIZE messages) and a pending list that a background task
+inserts in batches every CHAT_FLUSH_INTERVAL_MS, so chat never waits on
+the database. History pages are served from the ring buffer when it
+covers them and from chat_messages otherwise, using keyset cursors on
+(created_at, message_uid).
+
+At most CHAT_MAX_ROOMS rooms are cached (least recently used first out)
+and rooms idle for CHAT_IDLE_SECONDS are evicted.
+"""
+import atexit
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+from models import ChatMessage, StudyRoom
+from utils.pagination import encode_cursor, decode_cursor
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+FLUSH_BATCH_SIZE = 500
+MAX_PENDING = 10000
+
+
+def _sort_key(message):
+    return message['created_at'], message['id']
+
+
+def serialize(message):
+    return {
+        'id': message['id'],
+        'room_id': message['room_id'],
+        'username': message['username'],
+        'msg': message['msg'],
+        'timestamp': message['created_at'].strftime('%H:%M'),
+        'created_at': message['created_at'].isoformat()
+    }
+
+
+class RoomCache:
+    def __init__(self, messages, size, complete, persist):
+        self.messages = deque(messages, maxlen=size)
+        # True when the buffer holds every message the room has ever had
+        self.complete = complete
+        self.persist = persist
+        self.loaded_at = self.last_active = time.monotonic()
+
+
+class ChatHistory:
+    def __init__(self, app, socketio, cache_size=100, max_rooms=500, idle_seconds=600,
+                 flush_interval_ms=500, refresh_seconds=0):
+        self.app = app
+        self.socketio = socketio
+        self.cache_size = cache_size
+        self.max_rooms = max_rooms
+        self.idle_seconds = idle_seconds
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.refresh_seconds = refresh_seconds
+        self._rooms = OrderedDict()
+        self._pending = []
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._flusher_started = False
+
+    # -- cache -------------------------------------------------------------
+
+    def _load(self, room_id):
+        try:
+            room_key = int(room_id)
+        except (TypeError, ValueError):
+            return RoomCache([], self.cache_size, complete=True, persist=False)
+        if db.session.get(StudyRoom, room_key) is None:
+            # Unknown rooms still relay chat but have nothing to persist
+            return RoomCache([], self.cache_size, complete=True, persist=False)
+
+        rows = ChatMessage.query.filter_by(room_id=room_key).order_by(
+            ChatMessage.created_at.desc(), ChatMessage.message_uid.desc()
+        ).limit(self.cache_size).all()
+        messages = [self._from_row(row) for row in reversed(rows)]
+        return RoomCache(messages, self.cache_size, complete=len(rows) < self.cache_size, persist=True)
+
+    def _room(self, room_id):
+        with self._lock:
+            cache = self._rooms.get(room_id)
+            now = time.monotonic()
+            if cache and self.refresh_seconds and now - cache.loaded_at > self.refresh_seconds:
+                cache = None
+            if cache is None:
+                cache = self._load(room_id)
+                # Messages accepted here but not yet flushed must survive a reload
+                loaded = {m['id'] for m in cache.messages}
+                pending = [m for m in self._pending if m['room_id'] == room_id and m['id'] not in loaded]
+                if pending:
+                    merged = sorted(list(cache.messages) + pending, key=_sort_key)
+                    cache.messages = deque(merged, maxlen=self.cache_size)
+                    cache.complete = cache.complete and len(merged) <= self.cache_size
+                self._rooms[room_id] = cache
+                while len(self._rooms) > self.max_rooms:
+                    self._rooms.popitem(last=False)
+            self._rooms.move_to_end(room_id)
+            cache.last_active = now
+            return cache
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            for room_id in [r for r, cache in self._rooms.items() if cache.last_active < cutoff]:
+                del self._rooms[room_id]
+
+    @staticmethod
+    def _from_row(row):
+        return {
+            'id': row.message_uid,
+            'room_id': str(row.room_id),
+            'user_id': row.user_id,
+            'username': row.username,
+            'msg': row.message,
+            'created_at': row.created_at
+        }
+
+    # -- writes ------------------------------------------------------------
+
+    def add(self, room_id, username, text, user_id=None):
+        message = {
+            'id': uuid.uuid4().hex,
+            'room_id': room_id,
+            'user_id': user_id,
+            'username': username,
+            'msg': text,
+            'created_at': datetime.utcnow()
+        }
+        with self._lock:
+            cache = self._room(room_id)
+            if len(cache.messages) == self.cache_size:
+                cache.complete = False
+            cache.messages.append(message)
+            if not cache.persist:
+                return message
+            self._pending.append(message)
+            flush_now = len(self._pending) >= FLUSH_BATCH_SIZE
+            if not self._flusher_started:
+                self._flusher_started = True
+                self.socketio.start_background_task(self._flush_loop)
+        if flush_now:
+            self.flush()
+        return message
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _requeue(self, messages):
+        with self._lock:
+            # Retry on the next flush, but never hold more than MAX_PENDING
+            self._pending[:0] = messages
+            del self._pending[:max(0, len(self._pending) - MAX_PENDING)]
+
+    def _insert(self, messages):
+        db.session.execute(ChatMessage.__table__.insert(), [
+            {
+                'message_uid': m['id'],
+                'room_id': int(m['room_id']),
+                'user_id': m['user_id'],
+                'username': m['username'],
+                'message': m['msg'],
+                'created_at': m['created_at']
+            }
+            for m in messages
+        ])
+        db.session.commit()
+
+    def flush(self):
+        """
+        Insert pending messages in one batch. Returns the number written.
+
+        If the batch fails, the messages are inserted one by one so a single
+        bad row (a deleted room, a duplicate id) is logged and dropped rather
+        than failing every later flush. A lost connection requeues the rest.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            with self.app.app_context():
+                try:
+                    self._insert(pending)
+                    return len(pending)
+                except OperationalError:
+                    db.session.rollback()
+                    self._requeue(pending)
+                    raise
+                except Exception:
+                    db.session.rollback()
+
+                written = 0
+                for i, message in enumerate(pending):
+                    try:
+                        self._insert([message])
+                        written += 1
+                    except OperationalError:
+                        db.session.rollback()
+                        self._requeue(pending[i:])
+                        raise
+                    except Exception:
+                        db.session.rollback()
+                        self.app.logger.exception('Dropping chat message %s for room %s',
+                                                  message['id'], message['room_id'])
+            return written
+
+    def _flush_loop(self):
+        while True:
+            self.socketio.sleep(self.flush_interval)
+            try:
+                self.flush()
+                self.evict_idle()
+            except Exception:
+                self.app.logger.exception('Chat history flush failed')
+
+    # -- reads -------------------------------------------------------------
+
+    def page(self, room_id, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """Return (messages oldest-first, next_cursor) for messages older than cursor"""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        before = None
+        if cursor:
+            before = decode_cursor(cursor)
+            if not isinstance(before[1], str):
+                raise ValueError('Invalid cursor')
+
+        with self._lock:
+            cache = self._room(room_id)
+            cached = list(cache.messages)
+            complete, persist = cache.complete, cache.persist
+
+        older = [m for m in cached if before is None or _sort_key(m) < before]
+        covered = complete or not persist or len(older) > limit
+        if covered:
+            messages = older[-limit:]
+            has_more = len(older) > limit
+        else:
+            # Beyond the ring buffer: make sure the table is complete, then read it
+            self.flush()
+            query = ChatMessage.query.filter_by(room_id=int(room_id))
+            if before is not None:
+                query = query.filter(or_(
+                    ChatMessage.created_at < before[0],
+                    and_(ChatMessage.created_at == before[0], ChatMessage.message_uid < before[1])
+                ))
+            rows = query.order_by(
+                ChatMessage.created_at.desc(), ChatMessage.message_uid.desc()
+            ).limit(limit + 1).all()
+            has_more = len(rows) > limit
+            messages = [self._from_row(row) for row in reversed(rows[:limit])]
+
+        next_cursor = None
+        if has_more and messages:
+            next_cursor = encode_cursor(messages[0]['created_at'], messages[0]['id'])
+        return messages, next_cursor
+
+
+def init_chat_history(app):
+    history = ChatHistory(
+        app,
+        app.extensions['socketio'],
+        cache_size=app.config.get('CHAT_HISTORY_SIZE', 100),
+        max_rooms=app.config.get('CHAT_MAX_ROOMS', 500),
+        idle_seconds=app.config.get('CHAT_IDLE_SECONDS', 600),
+        flush_interval_ms=app.config.get('CHAT_FLUSH_INTERVAL_MS', 500),
+        refresh_seconds=app.config.get('CHAT_CACHE_REFRESH_SECONDS', 0)
+    )
+    app.extensions['chat_history'] = history
+    # Don't lose the last write-behind batch on a clean shutdown
+    atexit.register(history.flush)
+    return history
+
+
+def get_chat_history():
+    return current_app.extensions['chat_history']
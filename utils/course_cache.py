@@ -0,0 +1,81 @@
+"""
+Cached course catalog and course detail responses.
+
+GET /courses and GET /courses/<id> depend on the `courses` version and
+a `course:<id>` version. Mapper events on Course collect the versions a
+flush touches, and they are bumped after the transaction commits, so a
+request racing the commit cannot re-cache the old rows under the new
+version.
+"""
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from models import Course
+
+SESSION_KEY = 'course_cache_invalidations'
+CATALOG_VERSION = 'courses'
+
+
+def course_version(course_id):
+    return f'course:{course_id}'
+
+
+def course_to_dict(course):
+    return {
+        'id': course.id,
+        'name': course.name,
+        'code': course.code,
+        'description': course.description,
+        'created_at': course.created_at.isoformat() if course.created_at else None
+    }
+
+
+def catalog_response(cache):
+    return cache.json_response('catalog', [CATALOG_VERSION], lambda: {
+        'courses': [course_to_dict(course) for course in Course.query.order_by(Course.id).all()]
+    })
+
+
+def course_response(cache, course_id):
+    """Raises LookupError for a missing course (misses are not cached)"""
+    def build():
+        course = db.session.get(Course, course_id)
+        if course is None:
+            raise LookupError('Course not found')
+        return course_to_dict(course)
+    return cache.json_response(f'course:{course_id}', [course_version(course_id)], build)
+
+
+def _touched(course):
+    session = object_session(course)
+    if session is not None:
+        session.info.setdefault(SESSION_KEY, set()).update({CATALOG_VERSION, course_version(course.id)})
+
+
+@event.listens_for(Course, 'after_insert')
+def _course_inserted(mapper, connection, course):
+    _touched(course)
+
+
+@event.listens_for(Course, 'after_update')
+def _course_updated(mapper, connection, course):
+    _touched(course)
+
+
+@event.listens_for(Course, 'after_delete')
+def _course_deleted(mapper, connection, course):
+    _touched(course)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    names = session.info.pop(SESSION_KEY, None)
+    if names and has_app_context() and 'response_cache' in current_app.extensions:
+        current_app.extensions['response_cache'].invalidate(*sorted(names))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_uncommitted(session):
+    session.info.pop(SESSION_KEY, None)
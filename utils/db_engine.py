@@ -0,0 +1,140 @@
+"""
+Engine profiles for PostgreSQL in production and SQLite in dev/tests.
+
+engine_options(config) builds SQLALCHEMY_ENGINE_OPTIONS for the
+configured URL and has to be applied before db.init_app(), which
+creates the engines:
+
+- PostgreSQL: a bounded pool of DB_POOL_SIZE connections plus
+  DB_MAX_OVERFLOW, recycled after DB_POOL_RECYCLE seconds and pinged on
+  checkout so a restarted server or dropped idle connection costs a
+  reconnect instead of a 500. Every session gets a server-side
+  statement_timeout, so one runaway query cannot hold a connection.
+  Long CLI jobs (rebuild-*, generate-data, ...) lift it for their own
+  process with disable_statement_timeout().
+- SQLite: a connect timeout matching busy_timeout; init_db_engine()
+  then switches each connection to WAL with synchronous=NORMAL, so
+  readers no longer block behind a writer.
+
+Under the gevent worker (DB_GEVENT=auto detects a monkey-patched
+socket module) psycopg2 is put in green mode: libpq waits go through
+gevent, so a greenlet waiting on PostgreSQL yields to the others in the
+worker instead of blocking all of them. Greenlets beyond pool_size +
+max_overflow wait up to DB_POOL_TIMEOUT seconds for a connection, so
+size the pool per worker against the server's max_connections.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from extensions import db
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def is_postgresql(url):
+    return make_url(url).get_backend_name() == 'postgresql'
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for config's database; explicit options in config win"""
+    url = config['SQLALCHEMY_DATABASE_URI']
+    options = {}
+    if is_postgresql(url):
+        options = {
+            'pool_size': config.get('DB_POOL_SIZE', 10),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 10),
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+            'pool_use_lifo': True,  # let surplus connections go idle and be recycled
+            'connect_args': {'connect_timeout': config.get('DB_CONNECT_TIMEOUT', 5)}
+        }
+        statement_timeout = config.get('DB_STATEMENT_TIMEOUT_MS')
+        if statement_timeout:
+            options['connect_args']['options'] = f'-c statement_timeout={int(statement_timeout)}'
+    elif is_sqlite(url):
+        options = {'connect_args': {'timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000.0}}
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def _no_statement_timeout(dbapi_connection, connection_record, connection_proxy):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('SET statement_timeout = 0')
+    cursor.close()
+    dbapi_connection.commit()  # so a later rollback does not restore the timeout
+
+
+def disable_statement_timeout():
+    """SET statement_timeout = 0 on every PostgreSQL connection this process checks out"""
+    for engine in db.engines.values():
+        if engine.dialect.name == 'postgresql' and not event.contains(engine, 'checkout', _no_statement_timeout):
+            event.listen(engine, 'checkout', _no_statement_timeout)
+
+
+def gevent_active():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback that parks the greenlet instead of the worker"""
+    from gevent.socket import wait_read, wait_write
+    from psycopg2 import OperationalError, extensions
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        if state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f'Bad result from poll: {state!r}')
+
+
+def make_psycopg2_green():
+    from psycopg2 import extensions
+    extensions.set_wait_callback(gevent_wait_callback)
+
+
+def sqlite_pragmas(config):
+    pragmas = {'busy_timeout': int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}
+    if config.get('SQLITE_WAL', True):
+        pragmas['journal_mode'] = 'WAL'
+        pragmas['synchronous'] = 'NORMAL'
+    return pragmas
+
+
+def pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return set_pragmas
+
+
+def init_db_engine(app):
+    """Green psycopg2 under gevent and per-connection SQLite pragmas; call after db.init_app()"""
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    mode = str(app.config.get('DB_GEVENT', 'auto')).lower()
+    green = gevent_active() if mode == 'auto' else mode == 'true'
+    if green and is_postgresql(url):
+        make_psycopg2_green()
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name != 'sqlite':
+                continue
+            pragmas = sqlite_pragmas(app.config)
+            if engine.url.database in (None, '', ':memory:'):
+                pragmas.pop('journal_mode', None)  # in-memory databases have no journal to switch
+            event.listen(engine, 'connect', pragma_listener(pragmas))
+    return green
@@ -0,0 +1,398 @@
+"""
+Incremental exam prediction.
+
+Every note is reduced once, when it is written, to a vector of weighted
+key terms (unigrams and adjacent bigrams with stopwords removed; terms
+in the title or in sentences with cue words such as "important" or
+"definition" count extra). The vector is stored in note_term_vectors,
+and course_terms holds the sum of the vectors of each course, updated
+by the difference between a note's old and new vector.
+
+Predictions are regenerated from course_terms alone by a background
+job, at most once per EXAM_PREDICTION_INTERVAL_MS per course no matter
+how many notes changed, and the top predictions of each course are
+cached in memory.
+"""
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from models import Course, CourseTerm, ExamPrediction, Note, NoteTermVector
+from utils.search_index import tokenize
+from utils.upsert import upsert_increment
+
+MAX_TERMS_PER_NOTE = 200
+CANDIDATE_POOL = 60
+MAX_PREDICTIONS = 20
+DEFAULT_TOP_K = 5
+TOP_CACHE_TTL = 300  # seconds; bounds staleness from regenerations in other workers
+TOP_CACHE_MAX_ENTRIES = 10000
+SESSION_KEY = 'exam_prediction_courses'
+REGENERATED_KEY = 'exam_prediction_regenerated'
+
+SENTENCE_RE = re.compile(r'[.!?;:\n]+')
+CUE_WORDS = frozenset("""
+    important importance exam exams remember key definition define defined theorem
+    formula rule law principle must always never note
+""".split())
+STOPWORDS = frozenset("""
+    a about above after again against all also am an and any are as at be because been
+    before being below between both but by can could did do does doing down during each
+    etc few for from further had has have having he her here hers him his how however if
+    in into is it its itself just let like may me might more most much my no nor not now
+    of off on once one only or other our ours out over own same she should so some such
+    than that the their theirs them then there these they this those through thus to too
+    two under until up upon use used uses using very via was we were what when where which
+    while who whom why will with within without would yes yet you your
+""".split())
+# Words that structure notes rather than carry course content
+BOILERPLATE = frozenset("""
+    lecture lectures chapter chapters week lesson lessons unit part page pages section
+    slide slides notes summary introduction intro example examples homework assignment
+""".split())
+
+QUESTION_TEMPLATES = [
+    "Define {term} and explain why it matters.",
+    "Explain {term} with an example.",
+    "What are the key properties of {term}?",
+    "Describe a typical problem involving {term} and how to solve it.",
+    "Compare {term} with a related concept from this course."
+]
+
+_top_cache = {}
+
+
+def invalidate(*course_ids):
+    for course_id in course_ids:
+        _top_cache.pop(course_id, None)
+
+
+# ---------------------------------------------------------------------------
+# Term extraction
+# ---------------------------------------------------------------------------
+
+def _is_key_term(token):
+    return (len(token) >= 3 and not token.isdigit() and token not in STOPWORDS
+            and token not in CUE_WORDS and token not in BOILERPLATE)
+
+
+def _singular(token):
+    # Crude plural folding so "tree" and "trees" count as one term
+    if len(token) > 4 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def _add_terms(weights, text, boost):
+    previous = None
+    for token in tokenize(text):
+        if not _is_key_term(token):
+            previous = None
+            continue
+        token = _singular(token)
+        weights[token] += boost
+        if previous:
+            weights[f'{previous} {token}'] += boost
+        previous = token
+
+
+def extract_terms(title, content):
+    """Weighted key terms of one note: {term: weight}"""
+    weights = Counter()
+    _add_terms(weights, title, 3)
+    for sentence in SENTENCE_RE.split(content or ''):
+        tokens = set(tokenize(sentence))
+        _add_terms(weights, sentence, 2 if tokens & CUE_WORDS else 1)
+    return dict(weights.most_common(MAX_TERMS_PER_NOTE))
+
+
+# ---------------------------------------------------------------------------
+# Incremental maintenance
+# ---------------------------------------------------------------------------
+
+def _apply_delta(connection, course_id, old_terms, new_terms):
+    """Move course_terms of course_id from old_terms to new_terms"""
+    rows = []
+    for term in set(old_terms) | set(new_terms):
+        weight = new_terms.get(term, 0) - old_terms.get(term, 0)
+        notes = int(term in new_terms) - int(term in old_terms)
+        if weight or notes:
+            rows.append({'course_id': course_id, 'term': term, 'weight': weight, 'note_count': notes})
+    upsert_increment(connection, CourseTerm.__table__, rows,
+                     keys=['course_id', 'term'], increments=['weight', 'note_count'])
+    gone = [term for term in old_terms if term not in new_terms]
+    if gone:
+        table = CourseTerm.__table__
+        connection.execute(table.delete().where(
+            table.c.course_id == course_id, table.c.term.in_(gone), table.c.note_count <= 0
+        ))
+
+
+def _mark(session, *course_ids):
+    if session is not None:
+        session.info.setdefault(SESSION_KEY, set()).update(course_ids)
+
+
+def _stored_vector(connection, note_id):
+    return connection.execute(
+        select(NoteTermVector.course_id, NoteTermVector.terms).where(NoteTermVector.note_id == note_id)
+    ).first()
+
+
+@event.listens_for(Note, 'after_insert')
+def _note_inserted(mapper, connection, note):
+    terms = extract_terms(note.title, note.content)
+    connection.execute(NoteTermVector.__table__.insert(),
+                       {'note_id': note.id, 'course_id': note.course_id, 'terms': terms})
+    _apply_delta(connection, note.course_id, {}, terms)
+    _mark(object_session(note), note.course_id)
+
+
+@event.listens_for(Note, 'after_update')
+def _note_updated(mapper, connection, note):
+    state = inspect(note)
+    if not any(state.attrs[name].history.has_changes() for name in ('title', 'content', 'course_id')):
+        return
+    terms = extract_terms(note.title, note.content)
+    stored = _stored_vector(connection, note.id)
+    table = NoteTermVector.__table__
+    if stored is None:
+        connection.execute(table.insert(), {'note_id': note.id, 'course_id': note.course_id, 'terms': terms})
+        _apply_delta(connection, note.course_id, {}, terms)
+    else:
+        old_course, old_terms = stored
+        connection.execute(table.update().where(table.c.note_id == note.id).values(
+            course_id=note.course_id, terms=terms
+        ))
+        if old_course == note.course_id:
+            _apply_delta(connection, note.course_id, old_terms or {}, terms)
+        else:
+            _apply_delta(connection, old_course, old_terms or {}, {})
+            _apply_delta(connection, note.course_id, {}, terms)
+            _mark(object_session(note), old_course)
+    _mark(object_session(note), note.course_id)
+
+
+@event.listens_for(Note, 'before_delete')
+def _note_deleted(mapper, connection, note):
+    stored = _stored_vector(connection, note.id)
+    if stored is None:
+        return
+    old_course, old_terms = stored
+    table = NoteTermVector.__table__
+    connection.execute(table.delete().where(table.c.note_id == note.id))
+    _apply_delta(connection, old_course, old_terms or {}, {})
+    _mark(object_session(note), old_course)
+
+
+@event.listens_for(Session, 'after_commit')
+def _queue_committed(session):
+    regenerated = session.info.pop(REGENERATED_KEY, None)
+    if regenerated:
+        invalidate(*regenerated)
+    course_ids = session.info.pop(SESSION_KEY, None)
+    if course_ids and has_app_context() and 'exam_predictor' in current_app.extensions:
+        current_app.extensions['exam_predictor'].enqueue(course_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_uncommitted(session):
+    session.info.pop(SESSION_KEY, None)
+    session.info.pop(REGENERATED_KEY, None)
+
+
+def rebuild_vectors(course_id=None, batch_size=500):
+    """Recompute note vectors, course sums and predictions. Returns notes processed."""
+    vectors = NoteTermVector.__table__.delete()
+    sums = CourseTerm.__table__.delete()
+    notes_query = db.session.query(Note.id, Note.course_id, Note.title, Note.content)
+    if course_id is not None:
+        vectors = vectors.where(NoteTermVector.course_id == course_id)
+        sums = sums.where(CourseTerm.course_id == course_id)
+        notes_query = notes_query.filter(Note.course_id == course_id)
+    db.session.execute(vectors)
+    db.session.execute(sums)
+
+    totals = defaultdict(lambda: [0, 0])
+    count = 0
+    last_id = 0
+    while True:
+        batch = notes_query.filter(Note.id > last_id).order_by(Note.id).limit(batch_size).all()
+        if not batch:
+            break
+        rows = []
+        for note_id, note_course, title, content in batch:
+            terms = extract_terms(title, content)
+            rows.append({'note_id': note_id, 'course_id': note_course, 'terms': terms})
+            for term, weight in terms.items():
+                entry = totals[(note_course, term)]
+                entry[0] += weight
+                entry[1] += 1
+        db.session.execute(NoteTermVector.__table__.insert(), rows)
+        count += len(batch)
+        last_id = batch[-1][0]
+
+    if totals:
+        db.session.execute(CourseTerm.__table__.insert(), [
+            {'course_id': course, 'term': term, 'weight': weight, 'note_count': notes}
+            for (course, term), (weight, notes) in totals.items()
+        ])
+    course_ids = [course_id] if course_id is not None else [row[0] for row in db.session.query(Course.id).all()]
+    for course in course_ids:
+        regenerate(course)
+    db.session.commit()
+    return count
+
+
+# ---------------------------------------------------------------------------
+# Predictions
+# ---------------------------------------------------------------------------
+
+def _merge_phrases(candidates):
+    """Prefer phrases over their words and join chained bigrams.
+
+    "breadth first" and "first search" with identical counts become
+    "breadth first search"; "binary" is dropped when "binary tree" ranks.
+    """
+    merged = []
+    for term, weight, notes in candidates:
+        if ' ' in term:
+            first, last = term.split(' ', 1)
+            for i, (other, other_weight, other_notes) in enumerate(merged):
+                # Only when the two always occur together
+                if (' ' in other and (other_weight, other_notes) == (weight, notes)
+                        and other.rsplit(' ', 1)[1] == first):
+                    merged[i] = (f'{other} {last}', weight, notes)
+                    break
+            else:
+                merged.append((term, weight, notes))
+        else:
+            merged.append((term, weight, notes))
+    covered = {word for term, _, _ in merged if ' ' in term for word in term.split()}
+    return [row for row in merged if ' ' in row[0] or row[0] not in covered]
+
+
+def regenerate(course_id):
+    """Rewrite a course's ExamPrediction rows from course_terms (no commit)"""
+    note_total = db.session.query(func.count(NoteTermVector.note_id)).filter(
+        NoteTermVector.course_id == course_id
+    ).scalar()
+    candidates = db.session.query(CourseTerm.term, CourseTerm.weight, CourseTerm.note_count).filter(
+        CourseTerm.course_id == course_id
+    ).order_by(CourseTerm.note_count.desc(), CourseTerm.weight.desc(), CourseTerm.term).limit(CANDIDATE_POOL).all()
+
+    candidates = _merge_phrases(candidates)
+
+    scored = []
+    if note_total and candidates:
+        max_weight = max(weight for _, weight, _ in candidates) or 1
+        for term, weight, notes in candidates:
+            # How many notes mention the term, and how much emphasis it gets overall
+            confidence = 0.7 * notes / note_total + 0.3 * weight / max_weight
+            scored.append((round(min(confidence, 1.0), 3), term))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+    db.session.execute(ExamPrediction.__table__.delete().where(ExamPrediction.course_id == course_id))
+    if scored:
+        db.session.execute(ExamPrediction.__table__.insert(), [
+            {
+                'course_id': course_id,
+                'question_text': QUESTION_TEMPLATES[rank % len(QUESTION_TEMPLATES)].format(term=term),
+                'confidence_score': confidence
+            }
+            for rank, (confidence, term) in enumerate(scored[:MAX_PREDICTIONS])
+        ])
+    # Dropped from the top-k cache once the new rows are committed (see _queue_committed)
+    db.session.info.setdefault(REGENERATED_KEY, set()).add(course_id)
+    return len(scored[:MAX_PREDICTIONS])
+
+
+def prediction_to_dict(prediction):
+    return {
+        'id': prediction.id,
+        'course_id': prediction.course_id,
+        'question_text': prediction.question_text,
+        'confidence_score': prediction.confidence_score,
+        'created_at': prediction.created_at.isoformat() if prediction.created_at else None
+    }
+
+
+def top_predictions(course_id, k=DEFAULT_TOP_K):
+    """Highest-confidence predictions for a course, cached per course"""
+    k = max(1, min(int(k), MAX_PREDICTIONS))
+    entry = _top_cache.get(course_id)
+    now = time.monotonic()
+    if entry is None or now - entry[0] >= TOP_CACHE_TTL:
+        predictions = ExamPrediction.query.filter_by(course_id=course_id).order_by(
+            ExamPrediction.confidence_score.desc(), ExamPrediction.id
+        ).limit(MAX_PREDICTIONS).all()
+        if course_id not in _top_cache and len(_top_cache) >= TOP_CACHE_MAX_ENTRIES:
+            _top_cache.pop(next(iter(_top_cache)))
+        entry = _top_cache[course_id] = (now, [prediction_to_dict(p) for p in predictions])
+    return entry[1][:k]
+
+
+class ExamPredictionEngine:
+    def __init__(self, app, socketio, interval_ms=2000):
+        self.app = app
+        self.socketio = socketio
+        self.interval = interval_ms / 1000.0
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._process_lock = threading.Lock()
+        self._worker_started = False
+
+    def enqueue(self, course_ids):
+        with self._lock:
+            self._pending.update(course_ids)
+            if not self._worker_started:
+                self._worker_started = True
+                self.socketio.start_background_task(self._run)
+
+    def is_pending(self, course_id):
+        with self._lock:
+            return course_id in self._pending
+
+    def process(self):
+        """Regenerate every queued course. Returns the course ids regenerated."""
+        with self._process_lock:
+            with self._lock:
+                course_ids, self._pending = self._pending, set()
+            done = []
+            with self.app.app_context():
+                for course_id in sorted(course_ids):
+                    try:
+                        regenerate(course_id)
+                        db.session.commit()
+                        done.append(course_id)
+                    except Exception:
+                        db.session.rollback()
+                        self.app.logger.exception('Exam prediction failed for course %s', course_id)
+                        with self._lock:
+                            self._pending.add(course_id)
+            return done
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            self.process()
+
+
+def init_exam_predictor(app):
+    engine = ExamPredictionEngine(
+        app,
+        app.extensions['socketio'],
+        interval_ms=app.config.get('EXAM_PREDICTION_INTERVAL_MS', 2000)
+    )
+    app.extensions['exam_predictor'] = engine
+    return engine
+
+
+def get_exam_predictor():
+    return current_app.extensions['exam_predictor']
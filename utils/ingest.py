@@ -0,0 +1,254 @@
+"""
+Streaming uploads and background file processing.
+
+save_stream() copies an upload into the blob store (see
+utils/blob_store.py) in fixed-size chunks, so an upload never has to fit
+in memory, and checks the file signature against the extension. A raw
+request body is copied straight off the socket; a multipart file is
+copied from the spool werkzeug has already written for it. The
+saved file is then handed to
+IngestionPipeline, which runs process_file() in a process pool:
+
+- PDFs: text is extracted page by page (capped at MAX_EXTRACTED_CHARS)
+- images: a JPEG thumbnail is written to UPLOAD_FOLDER/thumbnails
+
+Results are applied in the web process by a background loop. Text
+extracted for a note becomes (or is appended to) the note content, so
+the search index and exam predictor pick it up through their usual Note
+events. The owner gets an `upload_processed` socket event in their
+`user:<id>` room.
+
+PyPDF2 and Pillow are only imported inside the worker functions.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from flask import current_app
+
+from extensions import db
+from models import Note, Upload
+from utils.blob_store import store_stream, BlobTooLarge, CHUNK_SIZE
+
+MAX_EXTRACTED_CHARS = 500000
+THUMBNAIL_SIZE = (320, 320)
+
+# extension -> (kind, accepted file signatures)
+FILE_TYPES = {
+    'pdf': ('pdf', (b'%PDF',)),
+    'png': ('image', (b'\x89PNG',)),
+    'jpg': ('image', (b'\xff\xd8\xff',)),
+    'jpeg': ('image', (b'\xff\xd8\xff',)),
+    'gif': ('image', (b'GIF87a', b'GIF89a')),
+    'webp': ('image', (b'RIFF',))
+}
+
+
+class UploadError(Exception):
+    pass
+
+
+def file_extension(filename):
+    return filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+
+
+def save_stream(stream, upload_folder, filename, max_bytes, chunk_size=CHUNK_SIZE):
+    """Stream an upload into the blob store. Returns (StoredBlob, file_type)."""
+    file_type = file_extension(filename)
+    if file_type not in FILE_TYPES:
+        raise UploadError(f'Unsupported file type: {file_type or filename}')
+
+    def validate(head):
+        if not head:
+            raise UploadError('Empty file')
+        if not head.startswith(FILE_TYPES[file_type][1]):
+            raise UploadError(f'File content does not match .{file_type}')
+
+    try:
+        stored = store_stream(stream, upload_folder, max_bytes, validate=validate, chunk_size=chunk_size)
+    except BlobTooLarge as e:
+        raise UploadError(str(e))
+    return stored, file_type
+
+
+# ---------------------------------------------------------------------------
+# Worker-process functions (no app context or database here)
+# ---------------------------------------------------------------------------
+
+def extract_pdf_text(path, max_chars=MAX_EXTRACTED_CHARS):
+    """Text of a PDF, one page at a time. Returns (text, page_count)."""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    pages = []
+    total = 0
+    for page in reader.pages:
+        text = (page.extract_text() or '').strip()
+        if text:
+            pages.append(text)
+            total += len(text)
+        if total >= max_chars:
+            break
+    return '\n\n'.join(pages)[:max_chars], len(reader.pages)
+
+
+def make_thumbnail(path, thumbnail_path, size=THUMBNAIL_SIZE):
+    from PIL import Image
+    with Image.open(path) as image:
+        image.draft('RGB', size)  # JPEG: decode at a reduced scale
+        image.thumbnail(size)
+        image.convert('RGB').save(thumbnail_path, 'JPEG', quality=80)
+    return thumbnail_path
+
+
+def process_file(path, file_type, thumbnail_dir, max_chars=MAX_EXTRACTED_CHARS):
+    """Extract text or make a thumbnail for one saved upload"""
+    if FILE_TYPES[file_type][0] == 'pdf':
+        text, page_count = extract_pdf_text(path, max_chars)
+        return {'text': text, 'page_count': page_count, 'thumbnail_path': None}
+
+    os.makedirs(thumbnail_dir, exist_ok=True)
+    thumbnail_path = os.path.join(thumbnail_dir, os.path.basename(path) + '.jpg')
+    if not os.path.exists(thumbnail_path):  # same content uploaded before
+        make_thumbnail(path, thumbnail_path)
+    return {'text': None, 'page_count': 1, 'thumbnail_path': thumbnail_path}
+
+
+# ---------------------------------------------------------------------------
+# Applying results
+# ---------------------------------------------------------------------------
+
+def thumbnail_dir(config):
+    return os.path.join(config['UPLOAD_FOLDER'], 'thumbnails')
+
+
+def apply_result(upload, result=None, error=None):
+    """Record a processing result on upload; extracted text is added to its note"""
+    upload.processed_at = datetime.utcnow()
+    if error:
+        upload.status = 'error'
+        upload.error = error[:1000]
+        return
+
+    upload.status = 'done'
+    upload.error = None
+    upload.page_count = result['page_count']
+    upload.thumbnail_path = result['thumbnail_path']
+    text = result['text']
+    if text and upload.note_id:
+        note = db.session.get(Note, upload.note_id)
+        if note is not None:
+            note.content = f'{note.content}\n\n{text}' if (note.content or '').strip() else text
+
+
+def process_inline(upload, config):
+    """Process upload in this process (CLI reprocessing)"""
+    try:
+        result = process_file(upload.file_path, upload.file_type, thumbnail_dir(config))
+        apply_result(upload, result)
+    except Exception as e:
+        apply_result(upload, error=str(e) or e.__class__.__name__)
+
+
+def upload_to_dict(upload):
+    return {
+        'id': upload.id,
+        'filename': upload.filename,
+        'file_type': upload.file_type,
+        'size': upload.size,
+        'status': upload.status,
+        'page_count': upload.page_count,
+        'has_thumbnail': upload.thumbnail_path is not None,
+        'error': upload.error,
+        'note_id': upload.note_id,
+        'resource_id': upload.resource_id,
+        'created_at': upload.created_at.isoformat() if upload.created_at else None,
+        'processed_at': upload.processed_at.isoformat() if upload.processed_at else None
+    }
+
+
+class IngestionPipeline:
+    def __init__(self, app, socketio, workers=2, poll_interval_ms=500):
+        self.app = app
+        self.socketio = socketio
+        self.workers = workers
+        self.interval = poll_interval_ms / 1000.0
+        self._executor = None
+        self._in_progress = set()
+        self._finished = []
+        self._lock = threading.Lock()
+        self._process_lock = threading.Lock()
+
+    def submit(self, upload):
+        """Queue a committed Upload row for processing"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self.socketio.start_background_task(self._run)
+            self._in_progress.add(upload.id)
+        future = self._executor.submit(
+            process_file, upload.file_path, upload.file_type, thumbnail_dir(self.app.config)
+        )
+        future.add_done_callback(partial(self._done, upload.id, upload.user_id))
+
+    def _done(self, upload_id, user_id, future):
+        try:
+            result, error = future.result(), None
+        except Exception as e:
+            result, error = None, str(e) or e.__class__.__name__
+        with self._lock:
+            self._finished.append((upload_id, user_id, result, error))
+
+    def is_pending(self, upload_id):
+        with self._lock:
+            return upload_id in self._in_progress
+
+    def process(self):
+        """Apply finished results. Returns the upload ids applied."""
+        with self._process_lock:
+            with self._lock:
+                finished, self._finished = self._finished, []
+            applied = []
+            with self.app.app_context():
+                for upload_id, user_id, result, error in finished:
+                    try:
+                        upload = db.session.get(Upload, upload_id)
+                        if upload is not None:
+                            apply_result(upload, result, error)
+                            db.session.commit()
+                            self.socketio.emit('upload_processed', upload_to_dict(upload), to=f'user:{user_id}')
+                    except Exception:
+                        db.session.rollback()
+                        self.app.logger.exception('Applying upload %s failed', upload_id)
+                        with self._lock:
+                            self._finished.append((upload_id, user_id, result, error))
+                        continue
+                    with self._lock:
+                        self._in_progress.discard(upload_id)
+                    applied.append(upload_id)
+            return applied
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            self.process()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+
+def init_ingestion(app):
+    pipeline = IngestionPipeline(
+        app,
+        app.extensions['socketio'],
+        workers=app.config.get('INGEST_WORKERS', 2),
+        poll_interval_ms=app.config.get('INGEST_POLL_INTERVAL_MS', 500)
+    )
+    app.extensions['ingestion'] = pipeline
+    return pipeline
+
+
+def get_ingestion():
+    return current_app.extensions['ingestion']
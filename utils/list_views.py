@@ -0,0 +1,168 @@
+"""
+Field projection and streamed serialization for list endpoints.
+
+Each ListView names the fields a client may request with `fields=` and
+the columns and many-to-one relationships each field needs. Only those
+are loaded (load_only / joinedload), so `fields=id,title` on notes never
+reads Note.content from the database, let alone sends it. Without
+`fields=` the view's default set is returned.
+
+Pages come from keyset_page() in utils/pagination.py on (created_at,
+id), newest first. Exports use stream_json(), which writes the JSON
+document in chunks from a yield_per() query instead of materialising
+every row and the whole response body at once.
+"""
+import json
+
+from sqlalchemy.orm import joinedload, load_only
+
+from models import Course, ExamPrediction, Flashcard, Note, Resource, StudyPartner, User
+
+EXPORT_BATCH_SIZE = 500
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def iso(value):
+    return value.isoformat() if value else None
+
+
+class Field:
+    """Columns a field needs, how to read it, and (relationship name, columns) to join.
+
+    Relationships are named rather than referenced because the backrefs
+    in models.py only exist once the mappers are configured.
+    """
+
+    def __init__(self, columns, getter, joins=()):
+        self.columns = list(columns)
+        self.getter = getter
+        self.joins = list(joins)
+
+
+def column(attr, convert=None):
+    def getter(row, viewer_id):
+        value = getattr(row, attr.key)
+        return convert(value) if convert else value
+    return Field([attr], getter)
+
+
+class ListView:
+    def __init__(self, name, model, fields, default=None):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.default = list(default or fields)
+
+    def parse_fields(self, param):
+        """Requested field names (id always included); ValueError for unknown ones"""
+        if not param:
+            return self.default
+        names = []
+        for name in param.split(','):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)} (available: {", ".join(self.fields)})')
+        return ['id'] + [name for name in names if name != 'id']
+
+    def project(self, query, names):
+        """Restrict query to the columns and relationships the fields need"""
+        columns = {attr.key: attr for attr in (self.model.id, self.model.created_at)}  # keyset keys
+        joins = {}
+        for name in names:
+            field = self.fields[name]
+            columns.update((attr.key, attr) for attr in field.columns)
+            for relationship, related_columns in field.joins:
+                joins.setdefault(relationship, []).extend(related_columns)
+        options = [load_only(*columns.values())]
+        options.extend(joinedload(getattr(self.model, relationship)).load_only(*related)
+                       for relationship, related in joins.items())
+        return query.options(*options)
+
+    def serialize(self, row, names, viewer_id=None):
+        return {name: self.fields[name].getter(row, viewer_id) for name in names}
+
+    def newest_first(self, query):
+        return query.order_by(None).order_by(self.model.created_at.desc(), self.model.id.desc())
+
+
+def stream_json(key, rows, serialize):
+    """Yield {"<key>": [...], "count": n} in chunks of roughly STREAM_CHUNK_BYTES"""
+    buffer = [f'{{"{key}":[']
+    size = 0
+    count = 0
+    for row in rows:
+        item = json.dumps(serialize(row), separators=(',', ':'))
+        buffer.append(',' + item if count else item)
+        count += 1
+        size += len(item)
+        if size >= STREAM_CHUNK_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    buffer.append(f'],"count":{count}}}')
+    yield ''.join(buffer)
+
+
+def partner_of(row, viewer_id):
+    return row.user2 if row.user1_id == viewer_id else row.user1
+
+
+NOTES = ListView('notes', Note, {
+    'id': column(Note.id),
+    'title': column(Note.title),
+    'content': column(Note.content),
+    'course_id': column(Note.course_id),
+    'course_name': Field([Note.course_id], lambda row, viewer_id: row.course.name,
+                         joins=[('course', [Course.name])]),
+    'file_path': column(Note.file_path),
+    'created_at': column(Note.created_at, iso),
+    'updated_at': column(Note.updated_at, iso)
+})
+
+FLASHCARDS = ListView('flashcards', Flashcard, {
+    'id': column(Flashcard.id),
+    'note_id': column(Flashcard.note_id),
+    'note_title': Field([Flashcard.note_id], lambda row, viewer_id: row.note.title,
+                        joins=[('note', [Note.title])]),
+    'front': column(Flashcard.front),
+    'back': column(Flashcard.back),
+    'difficulty': column(Flashcard.difficulty),
+    'next_review': column(Flashcard.next_review, iso),
+    'review_count': column(Flashcard.review_count),
+    'created_at': column(Flashcard.created_at, iso)
+})
+
+RESOURCES = ListView('resources', Resource, {
+    'id': column(Resource.id),
+    'course_id': column(Resource.course_id),
+    'course_name': Field([Resource.course_id], lambda row, viewer_id: row.course.name,
+                         joins=[('course', [Course.name])]),
+    'uploader_id': column(Resource.uploader_id),
+    'title': column(Resource.title),
+    'description': column(Resource.description),
+    'file_type': column(Resource.file_type),
+    'file_path': column(Resource.file_path),
+    'created_at': column(Resource.created_at, iso)
+})
+
+PARTNERS = ListView('partners', StudyPartner, {
+    'id': column(StudyPartner.id),
+    'partner_id': Field([StudyPartner.user1_id, StudyPartner.user2_id],
+                        lambda row, viewer_id: row.user2_id if row.user1_id == viewer_id else row.user1_id),
+    'partner_email': Field([StudyPartner.user1_id, StudyPartner.user2_id],
+                           lambda row, viewer_id: partner_of(row, viewer_id).email,
+                           joins=[('user1', [User.email]), ('user2', [User.email])]),
+    'match_score': column(StudyPartner.match_score),
+    'status': column(StudyPartner.status),
+    'created_at': column(StudyPartner.created_at, iso)
+})
+
+EXAM_PREDICTIONS = ListView('predictions', ExamPrediction, {
+    'id': column(ExamPrediction.id),
+    'course_id': column(ExamPrediction.course_id),
+    'question_text': column(ExamPrediction.question_text),
+    'confidence_score': column(ExamPrediction.confidence_score),
+    'created_at': column(ExamPrediction.created_at, iso)
+})
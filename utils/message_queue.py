@@ -0,0 +1,51 @@
+"""
+In-process stand-in for the SocketIO message queue.
+
+In production SocketIO is given SOCKETIO_MESSAGE_QUEUE (e.g. a Redis
+URL) and python-socketio's RedisManager fans every emit out to all
+workers, each of which delivers it to its own connected clients.
+InProcessManager reproduces that fan-out synchronously across every
+manager registered on a shared InProcessBroker, so several SocketIO
+servers in one process behave like separate workers. It deliberately
+does not subclass PubSubManager so the Flask-SocketIO test client can
+be used with it.
+"""
+import threading
+
+from socketio import Manager
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._managers = []
+        self._lock = threading.Lock()
+
+    def register(self, manager):
+        with self._lock:
+            self._managers.append(manager)
+
+    def managers(self):
+        with self._lock:
+            return list(self._managers)
+
+
+class InProcessManager(Manager):
+    name = 'inprocess'
+
+    def __init__(self, broker):
+        super().__init__()
+        self.broker = broker
+        broker.register(self)
+
+    def emit(self, event, data, namespace=None, room=None, skip_sid=None,
+             callback=None, to=None, **kwargs):
+        namespace = namespace or '/'
+        room = to or room
+        for manager in self.broker.managers():
+            if manager is self:
+                super().emit(event, data, namespace, room=room, skip_sid=skip_sid,
+                             callback=callback, **kwargs)
+            elif manager.server is not None:
+                # Remote workers never know the sender's sid, and acks are
+                # only delivered by the worker that owns the callback
+                Manager.emit(manager, event, data, namespace, room=room)
@@ -0,0 +1,281 @@
+"""
+Request, database and SocketIO metrics in Prometheus text format.
+
+init_metrics() instruments the app when METRICS_ENABLED is on:
+
+- every request is timed into a latency histogram per blueprint,
+  endpoint and method, counted per status, and its SQL statements are
+  summed into a DB time histogram (through the same engine events as
+  utils/query_profiler.py, so no extra listeners are installed)
+- every SocketIO event handled is counted and timed per event and room,
+  every event emitted is counted per event and room, and connects and
+  disconnects keep a connection gauge
+- room membership, active rooms and write-behind queue depths are read
+  when /metrics is scraped, not tracked on the hot path
+
+Rooms are labelled by study room id; private user rooms and direct
+emits to one socket are collapsed into `user` and `direct` so the
+number of series stays bounded. Metrics are per process: with several
+workers, scrape each one (or put them behind a per-worker target).
+
+Recording is a dict lookup and a few additions under one lock;
+benchmarks/bench_metrics.py measures the overhead per request and per
+socket event.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, request
+
+from utils.query_profiler import _collectors
+
+# Seconds; tuned for API calls between ~1ms and a few seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, key, amount=1):
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_labels(self.labels, key)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, description, labels, buckets):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}  # key -> [count per bucket..., +Inf count, sum]
+
+    def observe(self, key, value):
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for key, entry in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), entry):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, key)} {_number(entry[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.labels, key)} {cumulative}')
+        return lines
+
+
+def _gauge(name, description, samples, labels=()):
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} gauge']
+    for key, value in samples:
+        lines.append(f'{name}{_labels(labels, key)} {_number(value)}')
+    return lines
+
+
+def room_label(room):
+    """Study room ids as they are; user rooms and socket ids collapsed"""
+    if room is None:
+        return 'broadcast'
+    room = str(room)
+    if room.isdigit():
+        return room
+    if room.startswith('user:'):
+        return 'user'
+    return 'direct'
+
+
+class DbTimer:
+    """Query collector for one request: only a count and a total"""
+    __slots__ = ('count', 'total_ms')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+
+    def record(self, statement, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+
+
+class Metrics:
+    def __init__(self, app, socketio=None):
+        self.app = app
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.connections = 0
+        self.requests = Counter(
+            'studysync_http_requests_total', 'HTTP requests by endpoint and status',
+            ('blueprint', 'endpoint', 'method', 'status')
+        )
+        self.latency = Histogram(
+            'studysync_http_request_duration_seconds', 'Time to build the response',
+            ('blueprint', 'endpoint', 'method'), LATENCY_BUCKETS
+        )
+        self.db_time = Histogram(
+            'studysync_http_request_db_seconds', 'SQL time per request',
+            ('blueprint', 'endpoint'), DB_BUCKETS
+        )
+        self.queries = Counter(
+            'studysync_http_request_queries_total', 'SQL statements run by requests',
+            ('blueprint', 'endpoint')
+        )
+        self.events_in = Counter(
+            'studysync_socketio_events_received_total', 'SocketIO events handled', ('event', 'room')
+        )
+        self.events_out = Counter(
+            'studysync_socketio_events_emitted_total', 'SocketIO events emitted', ('event', 'room')
+        )
+        self.event_latency = Histogram(
+            'studysync_socketio_event_duration_seconds', 'Time spent in SocketIO event handlers',
+            ('event',), LATENCY_BUCKETS
+        )
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        if socketio is not None:
+            self._instrument_socketio(socketio)
+
+    # -- HTTP --------------------------------------------------------------
+
+    def _start(self):
+        timer = DbTimer()
+        _collectors().append(timer)
+        g.metrics_db = timer
+        g.metrics_start = time.perf_counter()
+
+    def _teardown(self, exc):
+        timer = g.pop('metrics_db', None)
+        if timer is not None and timer in _collectors():
+            _collectors().remove(timer)
+
+    def _finish(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        timer = g.get('metrics_db')
+        blueprint = request.blueprint or ''
+        # Unmatched paths share one label instead of one series per URL
+        endpoint = request.endpoint or '<unmatched>'
+        with self._lock:
+            self.requests.inc((blueprint, endpoint, request.method, response.status_code))
+            self.latency.observe((blueprint, endpoint, request.method), elapsed)
+            if timer is not None:
+                self.db_time.observe((blueprint, endpoint), timer.total_ms / 1000.0)
+                self.queries.inc((blueprint, endpoint), timer.count)
+        return response
+
+    # -- SocketIO ----------------------------------------------------------
+
+    def _instrument_socketio(self, socketio):
+        # Handlers registered with @socketio.on call self._handle_event at
+        # call time, and flask_socketio.emit() goes through socketio.emit,
+        # so wrapping both on the instance sees every event in and out
+        handle_event = socketio._handle_event
+        emit = socketio.emit
+
+        def timed_handle_event(handler, message, namespace, sid, *args):
+            start = time.perf_counter()
+            try:
+                return handle_event(handler, message, namespace, sid, *args)
+            finally:
+                data = args[0] if args else None
+                room = data.get('room_id') if isinstance(data, dict) else None
+                self.record_event(message, room, time.perf_counter() - start)
+
+        def counted_emit(event, *args, **kwargs):
+            room = kwargs.get('to') or kwargs.get('room')
+            with self._lock:
+                self.events_out.inc((event, room_label(room)))
+            return emit(event, *args, **kwargs)
+
+        socketio._handle_event = timed_handle_event
+        socketio.emit = counted_emit
+
+    def record_event(self, event, room, elapsed):
+        with self._lock:
+            if event == 'connect':
+                self.connections += 1
+            elif event == 'disconnect':
+                self.connections -= 1
+            self.events_in.inc((event, room_label(room) if room is not None else ''))
+            self.event_latency.observe((event,), elapsed)
+
+    # -- exposition --------------------------------------------------------
+
+    def _room_samples(self):
+        presence = self.app.extensions.get('presence')
+        if presence is None:
+            return []
+        return [((room,), presence.count(room)) for room in presence.rooms()]
+
+    def _queue_samples(self):
+        samples = []
+        for name in ('analytics_pipeline', 'room_sessions', 'chat_history'):
+            queue = self.app.extensions.get(name)
+            if queue is not None:
+                samples.append(((name,), queue.pending()))
+        return samples
+
+    def render(self):
+        rooms = self._room_samples()
+        queues = self._queue_samples()
+        with self._lock:
+            lines = []
+            for metric in (self.requests, self.latency, self.db_time, self.queries,
+                           self.events_in, self.events_out, self.event_latency):
+                lines.extend(metric.render())
+            lines.extend(_gauge('studysync_socketio_connections', 'Open SocketIO connections on this worker',
+                                [((), self.connections)]))
+        lines.extend(_gauge('studysync_room_members', 'Members present per study room', rooms, ('room',)))
+        lines.extend(_gauge('studysync_active_rooms', 'Rooms with at least one member', [((), len(rooms))]))
+        lines.extend(_gauge('studysync_pending_writes', 'Rows queued in write-behind buffers', queues, ('queue',)))
+        lines.extend(_gauge('studysync_process_start_time_seconds', 'Start time of this worker',
+                            [((), self.started)]))
+        return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    """Instrument requests and SocketIO events when METRICS_ENABLED is on"""
+    if not app.config.get('METRICS_ENABLED', False):
+        return None
+    metrics = Metrics(app, app.extensions.get('socketio'))
+    app.extensions['metrics'] = metrics
+    return metrics
+
+
+def get_metrics():
+    return current_app.extensions.get('metrics')
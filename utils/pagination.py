@@ -0,0 +1,51 @@
+"""
+Opaque keyset-pagination cursors.
+
+A cursor encodes the (timestamp, tie-breaker) of the last row on a page
+so the next page can be fetched with a WHERE on the index instead of an
+OFFSET that has to skip every earlier row.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(timestamp, key):
+    raw = json.dumps([timestamp.isoformat(), key]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, key) or raise ValueError for a malformed cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, key = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), key
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def keyset_page(query, model, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return (rows, next_cursor) of query in newest-first (created_at, id) order"""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    if cursor:
+        before_created, before_id = decode_cursor(cursor)
+        if not isinstance(before_id, int):
+            raise ValueError('Invalid cursor')
+        query = query.filter(or_(
+            model.created_at < before_created,
+            and_(model.created_at == before_created, model.id < before_id)
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(None).order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
@@ -0,0 +1,217 @@
+"""
+Study partner matching over a materialized user <-> course graph.
+
+user_courses holds one edge per (user, course) with the number of notes
+the user has in that course. Note mapper events keep the edges current,
+so /partners/find never has to scan the notes table: a top-k query is
+one self-join on user_courses plus one lookup of the candidates' degrees.
+
+Results are cached per user and dropped when that user's course set
+changes or one of their StudyPartner rows is created or changes status.
+The affected users are collected in session.info during the flush and
+dropped after the commit, so a request racing the commit cannot re-cache
+the old matches.
+"""
+import heapq
+import math
+import time
+from collections import defaultdict
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from models import Note, StudyPartner, User, UserCourse
+
+DEFAULT_TOP_K = 10
+CACHE_TTL = 300  # seconds; bounds staleness from other users' course changes
+CACHE_MAX_ENTRIES = 10000
+SESSION_KEY = 'partner_match_invalidations'
+
+# Partnerships in these states hide the other user from suggestions
+ACTIVE_STATUSES = ('pending', 'accepted')
+
+_cache = {}
+
+
+def invalidate(*user_ids):
+    for user_id in user_ids:
+        _cache.pop(user_id, None)
+
+
+def clear_cache():
+    _cache.clear()
+
+
+# ---------------------------------------------------------------------------
+# Graph maintenance
+# ---------------------------------------------------------------------------
+
+def _mark(session, *user_ids):
+    if session is not None:
+        session.info.setdefault(SESSION_KEY, set()).update(user_ids)
+
+
+def _add_edge(connection, session, user_id, course_id):
+    table = UserCourse.__table__
+    result = connection.execute(
+        table.update()
+        .where(table.c.user_id == user_id, table.c.course_id == course_id)
+        .values(note_count=table.c.note_count + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert(), {'user_id': user_id, 'course_id': course_id, 'note_count': 1})
+        _mark(session, user_id)
+
+
+def _remove_edge(connection, session, user_id, course_id):
+    table = UserCourse.__table__
+    edge = (table.c.user_id == user_id, table.c.course_id == course_id)
+    connection.execute(table.update().where(*edge).values(note_count=table.c.note_count - 1))
+    removed = connection.execute(table.delete().where(*edge, table.c.note_count <= 0))
+    if removed.rowcount:
+        _mark(session, user_id)
+
+
+@event.listens_for(Note, 'after_insert')
+def _note_inserted(mapper, connection, note):
+    _add_edge(connection, object_session(note), note.user_id, note.course_id)
+
+
+@event.listens_for(Note, 'after_update')
+def _note_updated(mapper, connection, note):
+    state = inspect(note)
+    user_history = state.attrs.user_id.history
+    course_history = state.attrs.course_id.history
+    if not (user_history.has_changes() or course_history.has_changes()):
+        return
+    old_user = user_history.deleted[0] if user_history.deleted else note.user_id
+    old_course = course_history.deleted[0] if course_history.deleted else note.course_id
+    session = object_session(note)
+    _remove_edge(connection, session, old_user, old_course)
+    _add_edge(connection, session, note.user_id, note.course_id)
+
+
+@event.listens_for(Note, 'after_delete')
+def _note_deleted(mapper, connection, note):
+    _remove_edge(connection, object_session(note), note.user_id, note.course_id)
+
+
+@event.listens_for(StudyPartner, 'after_insert')
+@event.listens_for(StudyPartner, 'after_delete')
+def _partnership_written(mapper, connection, partnership):
+    _mark(object_session(partnership), partnership.user1_id, partnership.user2_id)
+
+
+@event.listens_for(StudyPartner, 'after_update')
+def _partnership_updated(mapper, connection, partnership):
+    if inspect(partnership).attrs.status.history.has_changes():
+        _mark(object_session(partnership), partnership.user1_id, partnership.user2_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    user_ids = session.info.pop(SESSION_KEY, None)
+    if user_ids:
+        invalidate(*user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_uncommitted(session):
+    session.info.pop(SESSION_KEY, None)
+
+
+def rebuild_graph():
+    """Recompute user_courses from the notes table. Returns the edge count."""
+    db.session.execute(UserCourse.__table__.delete())
+    edges = db.session.query(
+        Note.user_id, Note.course_id, func.count(Note.id)
+    ).group_by(Note.user_id, Note.course_id).all()
+    if edges:
+        db.session.execute(UserCourse.__table__.insert(), [
+            {'user_id': user_id, 'course_id': course_id, 'note_count': count}
+            for user_id, course_id, count in edges
+        ])
+    db.session.commit()
+    clear_cache()
+    return len(edges)
+
+
+# ---------------------------------------------------------------------------
+# Top-k matching
+# ---------------------------------------------------------------------------
+
+def _score(shared, own_degree, other_degree, metric):
+    if metric == 'cosine':
+        return shared / math.sqrt(own_degree * other_degree)
+    return shared / float(own_degree + other_degree - shared)
+
+
+def _excluded_users(user_id):
+    rows = db.session.query(StudyPartner.user1_id, StudyPartner.user2_id).filter(
+        StudyPartner.status.in_(ACTIVE_STATUSES),
+        (StudyPartner.user1_id == user_id) | (StudyPartner.user2_id == user_id)
+    ).all()
+    return {other for pair in rows for other in pair} | {user_id}
+
+
+def _compute(user_id, k, metric):
+    own_courses = [row[0] for row in db.session.query(UserCourse.course_id).filter(
+        UserCourse.user_id == user_id
+    ).all()]
+    if not own_courses:
+        return []
+
+    excluded = _excluded_users(user_id)
+    shared_courses = defaultdict(list)
+    for other_id, course_id in db.session.query(UserCourse.user_id, UserCourse.course_id).filter(
+        UserCourse.course_id.in_(own_courses),
+        UserCourse.user_id != user_id
+    ).all():
+        if other_id not in excluded:
+            shared_courses[other_id].append(course_id)
+    if not shared_courses:
+        return []
+
+    degrees = dict(db.session.query(UserCourse.user_id, func.count()).filter(
+        UserCourse.user_id.in_(list(shared_courses.keys()))
+    ).group_by(UserCourse.user_id).all())
+
+    own_degree = len(own_courses)
+    top = heapq.nlargest(k, (
+        (_score(len(courses), own_degree, degrees.get(other_id, len(courses)), metric), -other_id, courses)
+        for other_id, courses in shared_courses.items()
+    ))
+
+    emails = dict(db.session.query(User.id, User.email).filter(
+        User.id.in_([-neg_id for _, neg_id, _ in top])
+    ).all())
+    return [
+        {
+            'user_id': -neg_id,
+            'email': emails.get(-neg_id),
+            'shared_courses': sorted(courses),
+            'match_score': round(score, 4)
+        }
+        for score, neg_id, courses in top
+    ]
+
+
+def find_partners(user_id, k=DEFAULT_TOP_K, metric='jaccard'):
+    """Top-k users ranked by Jaccard (default) or cosine course overlap"""
+    if metric not in ('jaccard', 'cosine'):
+        raise ValueError('metric must be jaccard or cosine')
+
+    key = (k, metric)
+    entry = _cache.get(user_id)
+    now = time.monotonic()
+    if entry and now - entry[0] < CACHE_TTL and key in entry[1]:
+        return entry[1][key]
+
+    results = _compute(user_id, k, metric)
+    if not entry or now - entry[0] >= CACHE_TTL:
+        if len(_cache) >= CACHE_MAX_ENTRIES:
+            _cache.pop(next(iter(_cache)))
+        entry = _cache[user_id] = (now, {})
+    entry[1][key] = results
+    return results
@@ -0,0 +1,337 @@
+"""
+Room presence shared between worker processes.
+
+Room membership used to live in a process-global dict in events.py,
+which pinned the app to a single gunicorn worker. The store is now
+pluggable: RedisPresenceStore keeps the membership in Redis so every
+worker sees the same rooms, and MemoryPresenceStore is the in-process
+stand-in used for development, tests and benchmarks.
+
+Membership is keyed by socket session id. A member (the username shown
+in the room) may be connected several times, e.g. from two tabs; it is
+in the room while it has at least one connection there, and room
+capacity counts members, not connections. join/leave/disconnect report
+whether the member itself entered or left so callers can broadcast
+diffs instead of the full member list. A connection may also carry the
+signed-in user's id, so present_users() tells which users are in a room.
+
+Every worker registers the sids it holds under its own server id and
+refreshes a heartbeat every PRESENCE_TTL_SECONDS / 3. A worker that
+stops beating (crashed, killed, restarted) is declared dead after
+PRESENCE_TTL_SECONDS, and PresenceMonitor on any live worker removes its
+sids from every room, tells those rooms, and closes the study sessions
+(utils/room_sessions.py) of users who are no longer present. The same
+cleanup runs once when a worker accepts its first socket, so a single
+restarted worker drops what its previous process left behind.
+
+The store for an app is configured by init_presence() from
+PRESENCE_URL (falling back to SOCKETIO_MESSAGE_QUEUE when that points
+at Redis) and looked up with get_presence().
+"""
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+# join() results
+JOINED = 'joined'        # the member entered the room
+CONNECTED = 'connected'  # another connection of a member already in the room
+ALREADY = 'already'      # this connection is already in the room
+FULL = 'full'            # the room is at capacity; nothing changed
+
+
+class MemoryPresenceStore:
+    # Only this process uses it: there are no other workers to outlive
+    shared = False
+
+    def __init__(self):
+        self._rooms = {}  # room -> {member: {sid, ...}}
+        self._sids = {}   # sid -> {room: (member, user_id)}
+        self._users = {}  # room -> {user_id: connection count}
+        self._lock = threading.Lock()
+
+    def join(self, room, sid, member, capacity=None, user_id=None):
+        """Add connection sid to room as member; returns JOINED, CONNECTED, ALREADY or FULL"""
+        with self._lock:
+            if room in self._sids.get(sid, ()):
+                return ALREADY
+            members = self._rooms.get(room, {})
+            if member not in members and capacity and len(members) >= capacity:
+                return FULL
+            self._rooms[room] = members
+            self._sids.setdefault(sid, {})[room] = (member, user_id)
+            if user_id is not None:
+                users = self._users.setdefault(room, {})
+                users[user_id] = users.get(user_id, 0) + 1
+            connections = members.setdefault(member, set())
+            connections.add(sid)
+            return JOINED if len(connections) == 1 else CONNECTED
+
+    def _leave(self, room, sid):
+        member, user_id = self._sids.get(sid, {}).pop(room, (None, None))
+        if member is None:
+            return None, False
+        if not self._sids[sid]:
+            del self._sids[sid]
+        if user_id is not None:
+            users = self._users[room]
+            users[user_id] -= 1
+            if not users[user_id]:
+                del users[user_id]
+                if not users:
+                    del self._users[room]
+        members = self._rooms[room]
+        members[member].discard(sid)
+        if members[member]:
+            return member, False
+        del members[member]
+        if not members:
+            del self._rooms[room]
+        return member, True
+
+    def leave(self, room, sid):
+        """Remove connection sid from room -> (member, last); member is None if sid was not there"""
+        with self._lock:
+            return self._leave(room, sid)
+
+    def disconnect(self, sid):
+        """Remove sid from every room -> [(room, member, last), ...]"""
+        with self._lock:
+            rooms = list(self._sids.get(sid, ()))
+            return [(room,) + self._leave(room, sid) for room in rooms]
+
+    def members(self, room):
+        with self._lock:
+            return sorted(self._rooms.get(room, ()))
+
+    def count(self, room):
+        with self._lock:
+            return len(self._rooms.get(room, ()))
+
+    def rooms(self):
+        with self._lock:
+            return sorted(self._rooms)
+
+    def present_users(self, room):
+        with self._lock:
+            return set(self._users.get(room, ()))
+
+    def heartbeat(self):
+        pass
+
+    def purge_dead(self, ttl):
+        return []
+
+    def clear(self, room):
+        with self._lock:
+            self._users.pop(room, None)
+            for connections in self._rooms.pop(room, {}).values():
+                for sid in connections:
+                    rooms = self._sids.get(sid, {})
+                    rooms.pop(room, None)
+                    if not rooms:
+                        self._sids.pop(sid, None)
+
+
+# KEYS: room sids hash, room members hash, sid rooms hash, rooms set,
+#       room users hash, this server's sids set
+# ARGV: sid, member, capacity (0 = unlimited), room, user id ('' = anonymous)
+# The sids hash stores 'user id|member' per connection.
+_JOIN = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then return 'already' end
+local present = redis.call('HEXISTS', KEYS[2], ARGV[2]) == 1
+local capacity = tonumber(ARGV[3])
+if not present and capacity > 0 and redis.call('HLEN', KEYS[2]) >= capacity then return 'full' end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[5] .. '|' .. ARGV[2])
+redis.call('HINCRBY', KEYS[2], ARGV[2], 1)
+if ARGV[5] ~= '' then redis.call('HINCRBY', KEYS[5], ARGV[5], 1) end
+redis.call('HSET', KEYS[3], ARGV[4], ARGV[2])
+redis.call('SADD', KEYS[4], ARGV[4])
+redis.call('SADD', KEYS[6], ARGV[1])
+if present then return 'connected' end
+return 'joined'
+"""
+
+# Same KEYS; ARGV: sid, room
+_LEAVE = """
+local entry = redis.call('HGET', KEYS[1], ARGV[1])
+if not entry then return false end
+local user, member = '', entry
+local sep = string.find(entry, '|', 1, true)
+if sep then
+    user = string.sub(entry, 1, sep - 1)
+    member = string.sub(entry, sep + 1)
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[2])
+if user ~= '' and redis.call('HINCRBY', KEYS[5], user, -1) <= 0 then
+    redis.call('HDEL', KEYS[5], user)
+end
+local last = 0
+if redis.call('HINCRBY', KEYS[2], member, -1) <= 0 then
+    redis.call('HDEL', KEYS[2], member)
+    last = 1
+end
+if redis.call('HLEN', KEYS[2]) == 0 then redis.call('SREM', KEYS[4], ARGV[2]) end
+return {member, last}
+"""
+
+
+class RedisPresenceStore:
+    shared = True
+
+    def __init__(self, url, prefix='studysync:presence:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('RedisPresenceStore requires the redis package (pip install redis)') from e
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+        self._rooms_key = prefix + 'rooms'
+        self._servers_key = prefix + 'servers'  # server id -> last heartbeat (unix time)
+        self.server_id = uuid.uuid4().hex
+        self._server_key = f'{prefix}server:{self.server_id}'
+        # Join and leave run as scripts so the capacity check and the
+        # per-member connection count stay consistent across workers
+        self._join = self._redis.register_script(_JOIN)
+        self._leave = self._redis.register_script(_LEAVE)
+
+    def _keys(self, room, sid):
+        return [
+            f'{self._prefix}sids:{room}',     # sid -> member
+            f'{self._prefix}members:{room}',  # member -> connection count
+            f'{self._prefix}sid:{sid}',       # room -> member
+            self._rooms_key,
+            f'{self._prefix}users:{room}',    # user id -> connection count
+            self._server_key
+        ]
+
+    def join(self, room, sid, member, capacity=None, user_id=None):
+        user = '' if user_id is None else str(user_id)
+        return self._join(keys=self._keys(room, sid), args=[sid, member, capacity or 0, room, user])
+
+    def leave(self, room, sid):
+        result = self._leave(keys=self._keys(room, sid), args=[sid, room])
+        if not result:
+            return None, False
+        return result[0], bool(result[1])
+
+    def disconnect(self, sid):
+        rooms = self._redis.hkeys(f'{self._prefix}sid:{sid}')
+        left = [(room,) + self.leave(room, sid) for room in rooms]
+        self._redis.srem(self._server_key, sid)
+        return left
+
+    def members(self, room):
+        return sorted(self._redis.hkeys(f'{self._prefix}members:{room}'))
+
+    def count(self, room):
+        return self._redis.hlen(f'{self._prefix}members:{room}')
+
+    def rooms(self):
+        return sorted(self._redis.smembers(self._rooms_key))
+
+    def present_users(self, room):
+        return {int(user_id) for user_id in self._redis.hkeys(f'{self._prefix}users:{room}')}
+
+    def heartbeat(self):
+        self._redis.hset(self._servers_key, self.server_id, time.time())
+
+    def purge_dead(self, ttl):
+        """Drop the sids of servers with no heartbeat for ttl seconds -> [(room, member, last), ...]"""
+        purged = []
+        now = time.time()
+        for server_id, beat in self._redis.hgetall(self._servers_key).items():
+            if server_id == self.server_id or now - float(beat) <= ttl:
+                continue
+            server_key = f'{self._prefix}server:{server_id}'
+            for sid in self._redis.smembers(server_key):
+                purged.extend(self.disconnect(sid))
+            self._redis.delete(server_key)
+            self._redis.hdel(self._servers_key, server_id)
+        return purged
+
+    def clear(self, room):
+        sids_key = f'{self._prefix}sids:{room}'
+        pipe = self._redis.pipeline()
+        for sid in self._redis.hkeys(sids_key):
+            pipe.hdel(f'{self._prefix}sid:{sid}', room)
+        pipe.delete(sids_key, f'{self._prefix}members:{room}', f'{self._prefix}users:{room}')
+        pipe.srem(self._rooms_key, room)
+        pipe.execute()
+
+
+def make_presence_store(url=None):
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisPresenceStore(url)
+    if url and url != 'memory://':
+        raise ValueError(f'Unsupported presence backend: {url}')
+    return MemoryPresenceStore()
+
+
+class PresenceMonitor:
+    """Heartbeat for this worker's sids and cleanup after dead workers"""
+
+    def __init__(self, app, socketio, store, ttl_seconds=30):
+        self.app = app
+        self.socketio = socketio
+        self.store = store
+        self.ttl = ttl_seconds
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Beat and clean up once, then keep beating if other workers share the store"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        try:
+            self.check(startup=True)
+        except Exception:
+            self.app.logger.exception('Presence cleanup failed')
+        if self.store.shared:
+            self.socketio.start_background_task(self._run)
+
+    def check(self, startup=False):
+        self.store.heartbeat()
+        purged = self.store.purge_dead(self.ttl)
+        for room, member, last in purged:
+            if last:
+                self.socketio.emit('presence_diff', {
+                    'room_id': room, 'joined': [], 'left': [member], 'count': self.store.count(room)
+                }, to=room)
+        sessions = self.app.extensions.get('room_sessions')
+        if sessions is None or not (startup or purged):
+            return
+        rooms = None if startup else {int(room) for room, _, _ in purged if room.isdigit()}
+        if rooms != set():
+            sessions.close_absent(self.store.present_users, rooms)
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.ttl / 3.0)
+            try:
+                self.check()
+            except Exception:
+                self.app.logger.exception('Presence heartbeat failed')
+
+
+def init_presence(app, store=None):
+    if store is None:
+        url = app.config.get('PRESENCE_URL') or app.config.get('SOCKETIO_MESSAGE_QUEUE')
+        store = make_presence_store(url)
+    app.extensions['presence'] = store
+    app.extensions['presence_monitor'] = PresenceMonitor(
+        app, app.extensions.get('socketio'), store, app.config.get('PRESENCE_TTL_SECONDS', 30)
+    )
+    return store
+
+
+def get_presence():
+    return current_app.extensions['presence']
+
+
+def get_presence_monitor():
+    return current_app.extensions['presence_monitor']
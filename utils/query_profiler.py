@@ -0,0 +1,162 @@
+"""
+SQL instrumentation: per-request query counts, DB time, a slow-query log
+and an N+1 detector.
+
+Every statement run through SQLAlchemy is recorded by engine events into
+whichever collectors are active on the current thread/greenlet:
+
+- a per-request QueryStats (when QUERY_PROFILER is on), reported in the
+  X-Query-Count / X-Query-Time-Ms response headers, aggregated per
+  endpoint for GET /api/profiler/queries, and checked for N+1 patterns:
+  the same statement run QUERY_N_PLUS_ONE_THRESHOLD or more times in one
+  request is logged as a warning with the endpoint
+- any number of count_queries() blocks, used by benchmarks and by
+  benchmarks/query_budgets.py to hold endpoints to a maximum query count
+
+Statements slower than QUERY_SLOW_MS are logged whenever the profiler is
+on. With it off and no count_queries() block open, each statement costs
+one thread-local lookup.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+
+class QueryStats:
+    def __init__(self, slow_ms=None):
+        self.slow_ms = slow_ms
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements = Counter()
+        self.slow = []
+
+    def record(self, statement, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.statements[statement] += 1
+        if self.slow_ms is not None and elapsed_ms >= self.slow_ms:
+            self.slow.append((statement, elapsed_ms))
+
+    def repeated(self, threshold):
+        """Statements run at least threshold times, most frequent first"""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+def _collectors():
+    stack = getattr(_local, 'collectors', None)
+    if stack is None:
+        stack = _local.collectors = []
+    return stack
+
+
+@contextmanager
+def count_queries():
+    """Collect every statement run inside the block into a QueryStats"""
+    stats = QueryStats()
+    stack = _collectors()
+    stack.append(stats)
+    try:
+        yield stats
+    finally:
+        stack.remove(stats)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors():
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = _collectors()
+    if not stack:
+        return
+    starts = conn.info.get('query_start')
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000 if starts else 0.0
+    for stats in stack:
+        stats.record(statement, elapsed_ms)
+
+
+class QueryProfiler:
+    def __init__(self, app, slow_ms=100, n_plus_one_threshold=5):
+        self.app = app
+        self.slow_ms = slow_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.endpoints = {}
+        self._lock = threading.Lock()
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    def _start(self):
+        stats = QueryStats(self.slow_ms)
+        _collectors().append(stats)
+        g.query_stats = stats
+
+    def _teardown(self, exc):
+        stats = g.pop('query_stats', None)
+        if stats is not None and stats in _collectors():
+            _collectors().remove(stats)
+
+    def _finish(self, response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+        endpoint = request.endpoint or request.path
+        response.headers['X-Query-Count'] = str(stats.count)
+        response.headers['X-Query-Time-Ms'] = f'{stats.total_ms:.2f}'
+
+        for statement, elapsed_ms in stats.slow:
+            self.app.logger.warning('Slow query (%.1fms) in %s: %s', elapsed_ms, endpoint, statement[:500])
+        repeated = stats.repeated(self.n_plus_one_threshold)
+        for statement, count in repeated:
+            self.app.logger.warning('Possible N+1 in %s: %d x %s', endpoint, count, statement[:300])
+
+        with self._lock:
+            entry = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_ms': 0.0, 'slow_queries': 0, 'n_plus_one': 0
+            })
+            entry['requests'] += 1
+            entry['queries'] += stats.count
+            entry['max_queries'] = max(entry['max_queries'], stats.count)
+            entry['db_ms'] += stats.total_ms
+            entry['slow_queries'] += len(stats.slow)
+            entry['n_plus_one'] += bool(repeated)
+        return response
+
+    def report(self):
+        """Per-endpoint totals, heaviest average query count first"""
+        with self._lock:
+            rows = [
+                dict(entry, endpoint=endpoint,
+                     avg_queries=round(entry['queries'] / entry['requests'], 2),
+                     avg_db_ms=round(entry['db_ms'] / entry['requests'], 3),
+                     db_ms=round(entry['db_ms'], 3))
+                for endpoint, entry in self.endpoints.items()
+            ]
+        return sorted(rows, key=lambda row: -row['avg_queries'])
+
+
+def init_query_profiler(app):
+    """Install the per-request profiler when QUERY_PROFILER is on"""
+    if not app.config.get('QUERY_PROFILER'):
+        return None
+    profiler = QueryProfiler(
+        app,
+        slow_ms=app.config.get('QUERY_SLOW_MS', 100),
+        n_plus_one_threshold=app.config.get('QUERY_N_PLUS_ONE_THRESHOLD', 5)
+    )
+    app.extensions['query_profiler'] = profiler
+    return profiler
+
+
+def get_query_profiler():
+    return current_app.extensions.get('query_profiler')
@@ -0,0 +1,185 @@
+"""
+Versioned JSON response cache.
+
+Entries are stored under `<name>:<versions>` where versions are counters
+for the data the response depends on (e.g. the course catalog, or one
+course). Writers bump a version instead of deleting entries, so every
+worker sharing the backend stops using the old entry at once and stale
+entries simply age out. Each entry keeps its serialized body and an
+ETag, so a matching If-None-Match is answered with 304 straight from
+the cache.
+
+Backends: MemoryCacheBackend (per process, LRU with TTL) or
+RedisCacheBackend, selected by RESPONSE_CACHE_URL (falling back to
+SOCKETIO_MESSAGE_QUEUE like presence). With several workers and the
+memory backend, other workers only see an invalidation when their
+entry expires.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request, Response
+
+
+class MemoryCacheBackend:
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() > expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self, names):
+        with self._lock:
+            return [self._versions.get(name, 0) for name in names]
+
+    def bump(self, names):
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    def __init__(self, url, prefix='studysync:cache:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('RedisCacheBackend requires the redis package (pip install redis)') from e
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        return self._redis.get(self._prefix + key)
+
+    def set(self, key, value, ttl):
+        self._redis.set(self._prefix + key, value, ex=max(1, int(ttl)))
+
+    def versions(self, names):
+        values = self._redis.mget([f'{self._prefix}v:{name}' for name in names])
+        return [int(value or 0) for value in values]
+
+    def bump(self, names):
+        pipe = self._redis.pipeline()
+        for name in names:
+            pipe.incr(f'{self._prefix}v:{name}')
+        pipe.execute()
+
+    def clear(self):
+        for key in self._redis.scan_iter(self._prefix + '*'):
+            if not key.decode().startswith(self._prefix + 'v:'):
+                self._redis.delete(key)
+
+
+def make_cache_backend(url=None, max_entries=1000):
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCacheBackend(url)
+    if url and url != 'memory://':
+        raise ValueError(f'Unsupported cache backend: {url}')
+    return MemoryCacheBackend(max_entries)
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl_seconds=300):
+        self.backend = backend
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0,
+                       'hit_ms': 0.0, 'miss_ms': 0.0}
+
+    def _record(self, outcome, started):
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats[outcome] += 1
+            if outcome == 'misses':
+                self._stats['miss_ms'] += elapsed
+            else:
+                self._stats['hit_ms'] += elapsed
+
+    def json_response(self, name, depends_on, build):
+        """
+        Cached JSON response for `name`, valid until any version in depends_on
+        is bumped. build() returns the payload on a miss.
+        """
+        started = time.perf_counter()
+        versions = self.backend.versions(depends_on)
+        key = f"{name}:{'.'.join(map(str, versions))}"
+        entry = self.backend.get(key)
+        if entry is None:
+            body = json.dumps(build(), separators=(',', ':')).encode('utf-8')
+            etag = hashlib.sha1(body).hexdigest()
+            self.backend.set(key, etag.encode('ascii') + b'\n' + body, self.ttl)
+            outcome = 'misses'
+        else:
+            etag, body = entry.split(b'\n', 1)
+            etag = etag.decode('ascii')
+            outcome = 'hits'
+
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            outcome = 'not_modified' if outcome == 'hits' else outcome
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        # Signed-in responses: browsers may keep them but always revalidate (304s are cheap); proxies may not
+        response.headers['Cache-Control'] = 'private, no-cache'
+        self._record(outcome, started)
+        return response
+
+    def invalidate(self, *names):
+        if names:
+            self.backend.bump(names)
+            with self._lock:
+                self._stats['invalidations'] += len(names)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        served = stats['hits'] + stats['not_modified']
+        lookups = served + stats['misses']
+        return {
+            'hits': stats['hits'],
+            'not_modified': stats['not_modified'],
+            'misses': stats['misses'],
+            'invalidations': stats['invalidations'],
+            'hit_rate': round(served / lookups, 4) if lookups else 0.0,
+            'avg_hit_ms': round(stats['hit_ms'] / served, 3) if served else 0.0,
+            'avg_miss_ms': round(stats['miss_ms'] / stats['misses'], 3) if stats['misses'] else 0.0
+        }
+
+
+def init_response_cache(app, backend=None):
+    if backend is None:
+        url = app.config.get('RESPONSE_CACHE_URL') or app.config.get('SOCKETIO_MESSAGE_QUEUE')
+        backend = make_cache_backend(url, app.config.get('RESPONSE_CACHE_SIZE', 1000))
+    cache = ResponseCache(backend, app.config.get('RESPONSE_CACHE_TTL_SECONDS', 300))
+    app.extensions['response_cache'] = cache
+    return cache
+
+
+def get_response_cache():
+    return current_app.extensions['response_cache']
@@ -0,0 +1,114 @@
+"""
+Index-driven flashcard review queue and batched review submission.
+
+The queue is read straight off idx_flashcards_user_next_review in
+(next_review, id) order with keyset pagination, so the database never
+has to materialise or sort a user's whole deck. Reviews are applied in
+bulk: one SELECT for the cards, one executemany UPDATE, one commit.
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, or_, update
+
+from extensions import db
+from models import Flashcard
+from utils import achievements, scheduler
+from utils.pagination import encode_cursor, decode_cursor
+
+DEFAULT_QUEUE_SIZE = 20
+MAX_QUEUE_SIZE = 100
+MAX_BATCH_SIZE = 200
+
+
+def get_review_queue(user_id, limit=DEFAULT_QUEUE_SIZE, cursor=None, now=None):
+    """Return (cards, next_cursor) for cards due at or before `now`"""
+    now = now or datetime.utcnow()
+    limit = max(1, min(int(limit), MAX_QUEUE_SIZE))
+
+    query = Flashcard.query.filter(
+        Flashcard.user_id == user_id,
+        Flashcard.next_review <= now
+    )
+    if cursor:
+        after_review, after_id = decode_cursor(cursor)
+        if not isinstance(after_id, int):
+            raise ValueError('Invalid cursor')
+        query = query.filter(or_(
+            Flashcard.next_review > after_review,
+            and_(Flashcard.next_review == after_review, Flashcard.id > after_id)
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    cards = query.order_by(Flashcard.next_review, Flashcard.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(cards) > limit:
+        cards = cards[:limit]
+        next_cursor = encode_cursor(cards[-1].next_review, cards[-1].id)
+    return cards, next_cursor
+
+
+def parse_reviews(payload):
+    """Validate a bulk review payload, returning {card_id: (correct, difficulty)}"""
+    if not isinstance(payload, list) or not payload:
+        raise ValueError('reviews must be a non-empty list')
+    if len(payload) > MAX_BATCH_SIZE:
+        raise ValueError(f'At most {MAX_BATCH_SIZE} reviews per request')
+
+    reviews = {}
+    for item in payload:
+        if not isinstance(item, dict) or 'id' not in item or 'correct' not in item:
+            raise ValueError('Each review needs an id and correct')
+        difficulty = item.get('difficulty')
+        if difficulty is not None and difficulty not in (0, 1, 2):
+            raise ValueError('difficulty must be 0, 1 or 2')
+        # Later entries for the same card win, as they would with sequential submits
+        reviews[int(item['id'])] = (bool(item['correct']), difficulty)
+    return reviews
+
+
+def apply_reviews(user_id, reviews, now=None):
+    """Apply {card_id: (correct, difficulty)} in one transaction.
+
+    Returns (updated_rows, missing_ids); ids that do not exist or belong
+    to another user are reported as missing and left untouched.
+    """
+    now = now or datetime.utcnow()
+    rows = db.session.query(
+        Flashcard.id, Flashcard.review_count, Flashcard.difficulty,
+        Flashcard.ease_factor, Flashcard.interval_days
+    ).filter(
+        Flashcard.user_id == user_id,
+        Flashcard.id.in_(list(reviews.keys()))
+    ).all()
+
+    updates = []
+    for card_id, review_count, difficulty, ease, interval in rows:
+        correct, new_difficulty = reviews[card_id]
+        if new_difficulty is None:
+            new_difficulty = difficulty or 0
+        if not correct:
+            # A miss bumps the card one difficulty level
+            new_difficulty = min(2, new_difficulty + 1)
+        ease, interval, review_count, next_review = scheduler.review(
+            ease, interval, review_count,
+            scheduler.quality_for(correct, new_difficulty), now
+        )
+        updates.append({
+            'id': card_id,
+            'next_review': next_review,
+            'review_count': review_count,
+            'difficulty': new_difficulty,
+            'ease_factor': ease,
+            'interval_days': interval,
+            'last_reviewed': now
+        })
+
+    if updates:
+        db.session.execute(update(Flashcard), updates)
+        # Bulk UPDATE skips mapper events, so count the reviews here
+        achievements.bump(db.session, db.session(), {(user_id, 'reviews'): len(updates)})
+    db.session.commit()
+
+    found = {row['id'] for row in updates}
+    missing = [card_id for card_id in reviews if card_id not in found]
+    return updates, missing
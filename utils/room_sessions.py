@@ -0,0 +1,225 @@
+"""
+StudySession rows for time spent in study rooms.
+
+A member entering a room opens a session and leaving it (or the last
+socket disconnecting) closes it. Opens and closes are queued and
+written in batches every ROOM_SESSION_FLUSH_INTERVAL_MS: a session that
+opens and closes within one batch is inserted complete, the rest are an
+insert of open rows plus one executemany update of the sessions they
+close. Closed sessions are fed to the analytics pipeline as study time,
+so room time shows up on the dashboard without extra client calls.
+
+A worker that dies takes its pending closes with it and leaves open rows
+behind. close_absent() (run by utils/presence.PresenceMonitor at startup
+and whenever a dead worker is purged) ends every open session whose user
+is no longer present in the room, at the time it is found, but at most
+STALE_SESSION_MAX_MINUTES after it started so time spent with no worker
+running is not counted as study time.
+"""
+import atexit
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import bindparam
+
+from extensions import db
+from models import StudySession
+
+FLUSH_BATCH_SIZE = 1000
+MAX_PENDING = 50000
+STALE_SESSION_MAX_MINUTES = 240
+
+
+def _minutes(start, end):
+    return max(0, int((end - start).total_seconds() // 60))
+
+
+def _session_row(room_id, user_id, start, end=None):
+    return {
+        'room_id': room_id,
+        'user_id': user_id,
+        'start_time': start,
+        'end_time': end,
+        'duration': _minutes(start, end) if end else None
+    }
+
+
+def _end_sessions(params):
+    """Set end_time/duration for {'b_id', 'b_end', 'b_duration'} rows"""
+    table = StudySession.__table__
+    stmt = table.update().where(table.c.id == bindparam('b_id')).values(
+        end_time=bindparam('b_end'), duration=bindparam('b_duration')
+    )
+    db.session.execute(stmt, params)
+
+
+def _close_persisted(closes):
+    """End the latest open session per (room_id, user_id) in closes -> [(user_id, start, end)]"""
+    if not closes:
+        return []
+    rows = db.session.query(
+        StudySession.id, StudySession.room_id, StudySession.user_id, StudySession.start_time
+    ).filter(
+        StudySession.end_time.is_(None),
+        StudySession.user_id.in_({user_id for _, user_id in closes})
+    ).all()
+    latest = {}
+    for row in rows:
+        key = (row.room_id, row.user_id)
+        if key in closes and (key not in latest or row.start_time > latest[key].start_time):
+            latest[key] = row
+
+    params = [
+        {'b_id': row.id, 'b_end': closes[key], 'b_duration': _minutes(row.start_time, closes[key])}
+        for key, row in latest.items()
+    ]
+    if params:
+        _end_sessions(params)
+    return [(row.user_id, row.start_time, closes[key]) for key, row in latest.items()]
+
+
+def apply_changes(changes):
+    """Write queued ('open'|'close', room_id, user_id, at) changes (no commit).
+
+    Returns (user_id, start, end) for every session closed.
+    """
+    opened = {}   # (room_id, user_id) -> start, opened in this batch
+    inserts = []
+    closes = {}   # (room_id, user_id) -> end, for sessions opened in an earlier batch
+    closed = []
+    for kind, room_id, user_id, at in changes:
+        key = (room_id, user_id)
+        if kind == 'open':
+            opened.setdefault(key, at)
+        elif key in opened:
+            start = opened.pop(key)
+            inserts.append(_session_row(room_id, user_id, start, at))
+            closed.append((user_id, start, at))
+        else:
+            closes.setdefault(key, at)
+
+    # Close before inserting so a reopened session isn't the one closed
+    closed.extend(_close_persisted(closes))
+    inserts.extend(_session_row(room_id, user_id, start) for (room_id, user_id), start in opened.items())
+    if inserts:
+        db.session.execute(StudySession.__table__.insert(), inserts)
+    return closed
+
+
+class RoomSessions:
+    def __init__(self, app, socketio, flush_interval_ms=1000):
+        self.app = app
+        self.socketio = socketio
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher_started = False
+
+    def _queue(self, kind, room_id, user_id, at):
+        with self._lock:
+            self._pending.append((kind, room_id, user_id, at or datetime.utcnow()))
+            flush_now = len(self._pending) >= FLUSH_BATCH_SIZE
+            if not self._flusher_started:
+                self._flusher_started = True
+                self.socketio.start_background_task(self._flush_loop)
+        if flush_now:
+            self.flush()
+
+    def open(self, room_id, user_id, at=None):
+        self._queue('open', room_id, user_id, at)
+
+    def close(self, room_id, user_id, at=None):
+        self._queue('close', room_id, user_id, at)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write queued opens and closes in one transaction. Returns the number applied."""
+        with self._flush_lock:
+            with self._lock:
+                changes, self._pending = self._pending, []
+            if not changes:
+                return 0
+            with self.app.app_context():
+                try:
+                    closed = apply_changes(changes)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    with self._lock:
+                        # Retry on the next flush, but never hold more than MAX_PENDING
+                        self._pending[:0] = changes
+                        del self._pending[:max(0, len(self._pending) - MAX_PENDING)]
+                    raise
+                self._record(closed)
+            return len(changes)
+
+    def _record(self, closed):
+        pipeline = self.app.extensions.get('analytics_pipeline')
+        if pipeline is not None:
+            for user_id, start, end in closed:
+                minutes = _minutes(start, end)
+                if minutes:
+                    pipeline.record(user_id, start.date(), minutes)
+
+    def close_absent(self, present_users, room_ids=None):
+        """End open sessions (in room_ids, or every room) whose user is not present.
+
+        present_users(room) returns the user ids in a presence room.
+        Returns the number of sessions closed.
+        """
+        self.flush()
+        with self._flush_lock, self.app.app_context():
+            query = db.session.query(
+                StudySession.id, StudySession.room_id, StudySession.user_id, StudySession.start_time
+            ).filter(StudySession.end_time.is_(None))
+            if room_ids is not None:
+                query = query.filter(StudySession.room_id.in_(room_ids))
+            now = datetime.utcnow()
+            present = {}
+            params, closed = [], []
+            for row in query.all():
+                if row.room_id not in present:
+                    present[row.room_id] = present_users(str(row.room_id))
+                if row.user_id in present[row.room_id]:
+                    continue
+                end = min(now, row.start_time + timedelta(minutes=STALE_SESSION_MAX_MINUTES))
+                params.append({'b_id': row.id, 'b_end': end, 'b_duration': _minutes(row.start_time, end)})
+                closed.append((row.user_id, row.start_time, end))
+            if not params:
+                return 0
+            try:
+                _end_sessions(params)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            self._record(closed)
+            return len(params)
+
+    def _flush_loop(self):
+        while True:
+            self.socketio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception('Study session flush failed')
+
+
+def init_room_sessions(app):
+    sessions = RoomSessions(
+        app,
+        app.extensions['socketio'],
+        flush_interval_ms=app.config.get('ROOM_SESSION_FLUSH_INTERVAL_MS', 1000)
+    )
+    app.extensions['room_sessions'] = sessions
+    atexit.register(sessions.flush)
+    return sessions
+
+
+def get_room_sessions():
+    return current_app.extensions['room_sessions']
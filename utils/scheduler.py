@@ -0,0 +1,151 @@
+"""
+SM-2 spaced-repetition scheduler.
+
+Each card carries its own ease_factor, interval_days, review_count and
+last_reviewed. review() advances one card after one answer; the
+reschedule_* functions recompute next_review for a whole deck (or every
+deck) from that stored state as NumPy arrays and write the results back
+with one executemany UPDATE per chunk, which is what makes retuning
+parameters over millions of rows practical.
+
+Both paths derive the interval from the same closed form (see
+interval_for): first, second, second * ease, second * ease^2, ... using
+the card's current ease, times interval_modifier once. Rescheduling with
+unchanged parameters therefore leaves every due date where review() put
+it.
+"""
+import numpy as np
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from extensions import db
+from models import Flashcard
+
+DEFAULT_PARAMS = {
+    'initial_ease': 2.5,
+    'min_ease': 1.3,
+    'first_interval': 1.0,       # days after the first successful review
+    'second_interval': 6.0,      # days after the second
+    'interval_modifier': 1.0,    # global multiplier applied to every interval
+    'max_interval': 365.0,
+    'relearn_minutes': 10.0      # delay before a missed card comes back
+}
+
+RESCHEDULE_CHUNK_SIZE = 20000
+
+# correct + difficulty (0=easy, 1=medium, 2=hard) -> SM-2 quality grade
+QUALITY_BY_DIFFICULTY = {0: 5, 1: 4, 2: 3}
+MISSED_QUALITY = 1
+
+
+def get_params(overrides=None):
+    params = dict(DEFAULT_PARAMS)
+    if overrides:
+        unknown = set(overrides) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown scheduler parameters: {', '.join(sorted(unknown))}")
+        params.update({key: float(value) for key, value in overrides.items()})
+    return params
+
+
+def quality_for(correct, difficulty):
+    if not correct:
+        return MISSED_QUALITY
+    return QUALITY_BY_DIFFICULTY.get(difficulty, 4)
+
+
+def interval_for(review_count, ease, params=None):
+    """Interval in days for a card with this streak and ease"""
+    params = params or DEFAULT_PARAMS
+    if review_count <= 0:
+        return params['relearn_minutes'] / 1440.0
+    if review_count == 1:
+        interval = params['first_interval']
+    else:
+        interval = params['second_interval'] * max(ease, params['min_ease']) ** (review_count - 2)
+    return min(interval * params['interval_modifier'], params['max_interval'])
+
+
+def review(ease, interval, review_count, quality, now, params=None):
+    """Advance one card by one answer.
+
+    Returns (ease, interval_days, review_count, next_review).
+    """
+    params = params or DEFAULT_PARAMS
+    ease = ease if ease is not None else params['initial_ease']
+    review_count = review_count or 0
+
+    ease = max(params['min_ease'], ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    review_count = 0 if quality < 3 else review_count + 1
+    interval = interval_for(review_count, ease, params)
+
+    return ease, interval, review_count, now + timedelta(days=interval)
+
+
+def compute_intervals(review_count, ease, params=None):
+    """Vectorized closed-form SM-2 intervals (in days) for arrays of cards.
+
+    The array form of interval_for(): a card's interval follows directly
+    from its streak and current ease. Cards with no current streak get
+    the relearn delay.
+    """
+    params = params or DEFAULT_PARAMS
+    review_count = np.asarray(review_count, dtype=np.int64)
+    ease = np.maximum(np.asarray(ease, dtype=np.float64), params['min_ease'])
+
+    growth = np.power(ease, np.clip(review_count - 2, 0, None).astype(np.float64))
+    intervals = np.where(
+        review_count <= 1,
+        params['first_interval'],
+        params['second_interval'] * growth
+    )
+    intervals = np.minimum(intervals * params['interval_modifier'], params['max_interval'])
+    return np.where(review_count <= 0, params['relearn_minutes'] / 1440.0, intervals)
+
+
+def _reschedule_chunk(rows, params):
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    counts = np.fromiter((row[1] or 0 for row in rows), dtype=np.int64, count=len(rows))
+    ease = np.fromiter(
+        (params['initial_ease'] if row[2] is None else row[2] for row in rows),
+        dtype=np.float64, count=len(rows)
+    )
+    last_reviewed = np.array([row[3] for row in rows], dtype='datetime64[us]')
+
+    intervals = compute_intervals(counts, ease, params)
+    next_review = last_reviewed + (intervals * 86400e6).astype('timedelta64[us]')
+
+    return [
+        {'id': card_id, 'interval_days': interval, 'next_review': due}
+        for card_id, interval, due in zip(
+            ids.tolist(), intervals.tolist(), next_review.astype(datetime).tolist()
+        )
+    ]
+
+
+def reschedule(user_id=None, params=None, chunk_size=RESCHEDULE_CHUNK_SIZE):
+    """Recompute interval_days/next_review for every reviewed card.
+
+    Scoped to one user when user_id is given, otherwise every deck.
+    Cards that have never been reviewed keep their current due date.
+    Returns the number of cards updated.
+    """
+    params = params or DEFAULT_PARAMS
+    query = db.session.query(
+        Flashcard.id, Flashcard.review_count, Flashcard.ease_factor, Flashcard.last_reviewed
+    ).filter(Flashcard.last_reviewed.isnot(None))
+    if user_id is not None:
+        query = query.filter(Flashcard.user_id == user_id)
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = query.filter(Flashcard.id > last_id).order_by(Flashcard.id).limit(chunk_size).all()
+        if not rows:
+            break
+        db.session.execute(update(Flashcard), _reschedule_chunk(rows, params))
+        db.session.commit()
+        updated += len(rows)
+        last_id = rows[-1][0]
+    return updated
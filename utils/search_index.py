@@ -0,0 +1,267 @@
+"""
+Persistent inverted index over Note title + content.
+
+Postings (term -> note_id, term frequency, positions) live in the
+note_terms table and per-note lengths in note_documents, so a search
+only reads the postings for the query terms instead of re-tokenizing
+every note. The index is kept up to date by SQLAlchemy mapper events on
+Note, so the notes blueprint does not need to call anything explicitly.
+
+Query syntax:
+    arrays linked          -> BM25 over both terms
+    recur*                 -> prefix query (expands to all indexed terms)
+    "binary search tree"   -> phrase query (terms must be adjacent)
+"""
+import math
+import re
+from collections import defaultdict
+
+from sqlalchemy import event, func, inspect
+
+from extensions import db
+from models import Note, NoteTerm, NoteDocument
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+QUERY_RE = re.compile(r'"([^"]+)"|(\S+)')
+MAX_TERM_LENGTH = 100
+MAX_PREFIX_EXPANSION = 50
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    """Lowercase and split text into alphanumeric tokens"""
+    if not text:
+        return []
+    return [t[:MAX_TERM_LENGTH] for t in TOKEN_RE.findall(text.lower())]
+
+
+def note_tokens(note):
+    return tokenize(note.title) + tokenize(note.content)
+
+
+def build_postings(tokens):
+    """Map each term to the list of positions it occurs at"""
+    postings = defaultdict(list)
+    for position, term in enumerate(tokens):
+        postings[term].append(position)
+    return postings
+
+
+# ---------------------------------------------------------------------------
+# Index maintenance
+# ---------------------------------------------------------------------------
+
+def _delete_note(connection, note_id):
+    connection.execute(NoteTerm.__table__.delete().where(NoteTerm.note_id == note_id))
+    connection.execute(NoteDocument.__table__.delete().where(NoteDocument.note_id == note_id))
+
+
+def _rows_for_note(note_id, user_id, tokens):
+    postings = build_postings(tokens)
+    term_rows = [
+        {
+            'note_id': note_id,
+            'user_id': user_id,
+            'term': term,
+            'term_frequency': len(positions),
+            'positions': positions
+        }
+        for term, positions in postings.items()
+    ]
+    doc_row = {'note_id': note_id, 'user_id': user_id, 'length': len(tokens)}
+    return term_rows, doc_row
+
+
+def _write_rows(connection, term_rows, doc_rows):
+    if term_rows:
+        connection.execute(NoteTerm.__table__.insert(), term_rows)
+    if doc_rows:
+        connection.execute(NoteDocument.__table__.insert(), doc_rows)
+
+
+def _insert_note(connection, note_id, user_id, tokens):
+    term_rows, doc_row = _rows_for_note(note_id, user_id, tokens)
+    _write_rows(connection, term_rows, [doc_row])
+
+
+def index_note(connection, note):
+    """(Re)index a single note using the given connection"""
+    _delete_note(connection, note.id)
+    _insert_note(connection, note.id, note.user_id, note_tokens(note))
+
+
+@event.listens_for(Note, 'after_insert')
+def _note_inserted(mapper, connection, note):
+    _insert_note(connection, note.id, note.user_id, note_tokens(note))
+
+
+@event.listens_for(Note, 'after_update')
+def _note_updated(mapper, connection, note):
+    state = inspect(note)
+    changed = any(
+        state.attrs[name].history.has_changes()
+        for name in ('title', 'content', 'user_id')
+    )
+    if changed:
+        index_note(connection, note)
+
+
+@event.listens_for(Note, 'before_delete')
+def _note_deleted(mapper, connection, note):
+    _delete_note(connection, note.id)
+
+
+def rebuild_index(user_id=None, batch_size=500):
+    """Drop and rebuild the index (for one user or the whole table).
+
+    Used for existing databases created before the index existed.
+    Returns the number of notes indexed.
+    """
+    term_delete = NoteTerm.__table__.delete()
+    doc_delete = NoteDocument.__table__.delete()
+    notes_query = db.session.query(Note.id, Note.user_id, Note.title, Note.content).order_by(Note.id)
+    if user_id is not None:
+        term_delete = term_delete.where(NoteTerm.user_id == user_id)
+        doc_delete = doc_delete.where(NoteDocument.user_id == user_id)
+        notes_query = notes_query.filter(Note.user_id == user_id)
+
+    db.session.execute(term_delete)
+    db.session.execute(doc_delete)
+
+    count = 0
+    last_id = 0
+    while True:
+        batch = notes_query.filter(Note.id > last_id).limit(batch_size).all()
+        if not batch:
+            break
+        term_rows, doc_rows = [], []
+        for note_id, owner_id, title, content in batch:
+            rows, doc_row = _rows_for_note(note_id, owner_id, tokenize(title) + tokenize(content))
+            term_rows.extend(rows)
+            doc_rows.append(doc_row)
+        _write_rows(db.session.connection(), term_rows, doc_rows)
+        db.session.commit()
+        count += len(batch)
+        last_id = batch[-1][0]
+
+    db.session.commit()
+    return count
+
+
+# ---------------------------------------------------------------------------
+# Querying
+# ---------------------------------------------------------------------------
+
+def parse_query(query):
+    """Split a query string into (terms, prefixes, phrases)"""
+    terms, prefixes, phrases = [], [], []
+    for phrase, word in QUERY_RE.findall(query or ''):
+        if phrase:
+            tokens = tokenize(phrase)
+            if len(tokens) > 1:
+                phrases.append(tokens)
+            terms.extend(tokens)
+        elif word.endswith('*') and len(word) > 1:
+            prefixes.extend(tokenize(word[:-1])[:1])
+        else:
+            terms.extend(tokenize(word))
+    return terms, prefixes, phrases
+
+
+def _expand_prefixes(user_id, prefixes):
+    expanded = set()
+    for prefix in prefixes:
+        rows = db.session.query(NoteTerm.term).filter(
+            NoteTerm.user_id == user_id,
+            NoteTerm.term.startswith(prefix, autoescape=True)
+        ).distinct().limit(MAX_PREFIX_EXPANSION).all()
+        expanded.update(row[0] for row in rows)
+    return expanded
+
+
+def _has_phrase(positions_by_term, phrase):
+    first = positions_by_term.get(phrase[0])
+    if not first:
+        return False
+    rest = []
+    for term in phrase[1:]:
+        positions = positions_by_term.get(term)
+        if not positions:
+            return False
+        rest.append(set(positions))
+    return any(
+        all(start + offset + 1 in positions for offset, positions in enumerate(rest))
+        for start in first
+    )
+
+
+def search(user_id, query, limit=10):
+    """Return [(note_id, score)] for the user's notes ranked by BM25"""
+    terms, prefixes, phrases = parse_query(query)
+    query_terms = set(terms) | _expand_prefixes(user_id, prefixes)
+    if not query_terms:
+        return []
+
+    total_docs, avg_length = db.session.query(
+        func.count(NoteDocument.note_id),
+        func.avg(NoteDocument.length)
+    ).filter(NoteDocument.user_id == user_id).one()
+    if not total_docs:
+        return []
+    avg_length = float(avg_length or 1)
+
+    columns = [NoteTerm.note_id, NoteTerm.term, NoteTerm.term_frequency, NoteDocument.length]
+    if phrases:
+        columns.append(NoteTerm.positions)
+    postings = db.session.query(*columns).join(
+        NoteDocument, NoteDocument.note_id == NoteTerm.note_id
+    ).filter(
+        NoteTerm.user_id == user_id,
+        NoteTerm.term.in_(query_terms)
+    ).all()
+    if not postings:
+        return []
+
+    doc_freq = defaultdict(int)
+    lengths = {}
+    by_note = defaultdict(dict)
+    for row in postings:
+        note_id, term, tf, length = row[:4]
+        doc_freq[term] += 1
+        lengths[note_id] = length
+        by_note[note_id][term] = (tf, row[4] if phrases else None)
+
+    if phrases:
+        by_note = {
+            note_id: hits for note_id, hits in by_note.items()
+            if all(
+                _has_phrase({t: p for t, (_, p) in hits.items()}, phrase)
+                for phrase in phrases
+            )
+        }
+        if not by_note:
+            return []
+
+    scores = []
+    for note_id, hits in by_note.items():
+        norm = K1 * (1 - B + B * lengths.get(note_id, avg_length) / avg_length)
+        score = 0.0
+        for term, (tf, _) in hits.items():
+            idf = math.log(1 + (total_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (K1 + 1) / (tf + norm)
+        scores.append((note_id, score))
+
+    scores.sort(key=lambda item: (-item[1], item[0]))
+    return scores[:limit]
+
+
+def search_notes(user_id, query, limit=10):
+    """Like search() but returns (Note, score) pairs in ranked order"""
+    ranked = search(user_id, query, limit)
+    if not ranked:
+        return []
+    notes = {n.id: n for n in Note.query.filter(Note.id.in_([note_id for note_id, _ in ranked])).all()}
+    return [(notes[note_id], score) for note_id, score in ranked if note_id in notes]
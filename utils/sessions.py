@@ -0,0 +1,234 @@
+"""
+Session interfaces that only write the cookie when they have to.
+
+Flask re-signs and re-sends a permanent session cookie on every response
+(SESSION_REFRESH_EACH_REQUEST), and the old before_request hook that set
+session.permanent = True also marked every session modified. Here:
+
+- sessions are permanent by default (SESSION_PERMANENT) without being
+  marked modified
+- an unmodified session is re-issued only once it is older than
+  SESSION_REFRESH_AFTER x PERMANENT_SESSION_LIFETIME (a sliding window);
+  the issue time comes from the signed cookie's timestamp
+- requests under SESSION_SKIP_PATHS (static files) neither decode nor
+  write the session
+- requests under SESSION_READONLY_PATHS (socket.io) decode it but never
+  write it: Flask-SocketIO runs every event handler in a request context
+  built from the handshake environ, so current_user there comes from this
+  session, while a polling response has nothing to re-issue
+
+With SESSION_STORE_URL set (redis://... or memory:// for a single
+process) session data is kept server-side and the cookie only carries a
+signed session id.
+"""
+import secrets
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SecureCookieSessionInterface
+from itsdangerous import BadSignature, TimestampSigner
+
+
+class SlidingSession(SecureCookieSession):
+    def __init__(self, initial=None, issued_at=None, default_permanent=True, sid=None):
+        super().__init__(initial)
+        self.issued_at = issued_at
+        self.default_permanent = default_permanent
+        self.sid = sid
+        self.skipped = False
+
+    @property
+    def permanent(self):
+        return self.get('_permanent', self.default_permanent)
+
+    @permanent.setter
+    def permanent(self, value):
+        # Setting the current value again must not mark the session modified
+        if bool(value) != self.permanent:
+            self['_permanent'] = bool(value)
+
+
+class SlidingCookieSessionInterface(SecureCookieSessionInterface):
+    session_class = SlidingSession
+
+    def _open(self, app, request):
+        serializer = self.get_signing_serializer(app)
+        if serializer is None:
+            return None
+        value = request.cookies.get(self.get_cookie_name(app))
+        if not value:
+            return self._new_session(app)
+        max_age = int(app.permanent_session_lifetime.total_seconds())
+        try:
+            data, issued_at = serializer.loads(value, max_age=max_age, return_timestamp=True)
+            return self._new_session(app, data, issued_at.timestamp())
+        except BadSignature:
+            return self._new_session(app)
+
+    def _new_session(self, app, data=None, issued_at=None, sid=None):
+        return self.session_class(data, issued_at=issued_at,
+                                  default_permanent=app.config.get('SESSION_PERMANENT', True), sid=sid)
+
+    def needs_refresh(self, app, session):
+        """True once an unmodified session is old enough to re-issue"""
+        if session.issued_at is None:
+            return True
+        age = time.time() - session.issued_at
+        return age >= app.permanent_session_lifetime.total_seconds() * app.config.get('SESSION_REFRESH_AFTER', 0.5)
+
+    def should_set_cookie(self, app, session):
+        if session.modified:
+            return True
+        return (session.permanent and app.config['SESSION_REFRESH_EACH_REQUEST']
+                and self.needs_refresh(app, session))
+
+    def open_session(self, app, request):
+        if request.path.startswith(tuple(app.config.get('SESSION_SKIP_PATHS', ()))):
+            session = self._new_session(app)
+            session.skipped = True
+            return session
+        session = self._open(app, request)
+        if session is not None and request.path.startswith(tuple(app.config.get('SESSION_READONLY_PATHS', ()))):
+            session.skipped = True
+        return session
+
+    def save_session(self, app, session, response):
+        if session.skipped:
+            return
+        super().save_session(app, session, response)
+
+
+# ---------------------------------------------------------------------------
+# Server-side sessions
+# ---------------------------------------------------------------------------
+
+class MemorySessionStore:
+    """Single-process store (development, tests)"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is None or entry[0] < time.time():
+                self._data.pop(sid, None)
+                return None
+            return entry[1]
+
+    def set(self, sid, value, ttl):
+        with self._lock:
+            self._data[sid] = (time.time() + ttl, value)
+
+    def touch(self, sid, ttl):
+        with self._lock:
+            if sid in self._data:
+                self._data[sid] = (time.time() + ttl, self._data[sid][1])
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+
+class RedisSessionStore:
+    def __init__(self, url, prefix='studysync:session:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('RedisSessionStore requires the redis package (pip install redis)') from e
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+
+    def get(self, sid):
+        return self._redis.get(self._prefix + sid)
+
+    def set(self, sid, value, ttl):
+        self._redis.set(self._prefix + sid, value, ex=ttl)
+
+    def touch(self, sid, ttl):
+        self._redis.expire(self._prefix + sid, ttl)
+
+    def delete(self, sid):
+        self._redis.delete(self._prefix + sid)
+
+
+def make_session_store(url):
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisSessionStore(url)
+    if url == 'memory://':
+        return MemorySessionStore()
+    raise ValueError(f'Unsupported session store: {url}')
+
+
+class ServerSideSessionInterface(SlidingCookieSessionInterface):
+    """Session data in `store`; the cookie holds a timestamp-signed session id"""
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return TimestampSigner(app.secret_key, salt='studysync-session-id')
+
+    def _open(self, app, request):
+        if not app.secret_key:
+            return None
+        value = request.cookies.get(self.get_cookie_name(app))
+        if value:
+            max_age = int(app.permanent_session_lifetime.total_seconds())
+            try:
+                sid, issued_at = self._signer(app).unsign(value, max_age=max_age, return_timestamp=True)
+                data = self.store.get(sid.decode('ascii'))
+                if data is not None:
+                    return self._new_session(app, self.serializer.loads(data), issued_at.timestamp(),
+                                             sid=sid.decode('ascii'))
+            except BadSignature:
+                pass
+        return self._new_session(app)
+
+    def save_session(self, app, session, response):
+        if session.skipped:
+            return
+        name = self.get_cookie_name(app)
+        cookie = dict(domain=self.get_cookie_domain(app), path=self.get_cookie_path(app),
+                      secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app),
+                      httponly=self.get_cookie_httponly(app))
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.modified:
+                if session.sid:
+                    self.store.delete(session.sid)
+                response.delete_cookie(name, **cookie)
+                response.vary.add('Cookie')
+            return
+
+        ttl = int(app.permanent_session_lifetime.total_seconds())
+        refresh = (session.permanent and app.config['SESSION_REFRESH_EACH_REQUEST']
+                   and self.needs_refresh(app, session))
+        if session.modified:
+            new_sid = session.sid is None
+            if new_sid:
+                session.sid = secrets.token_urlsafe(24)
+            self.store.set(session.sid, self.serializer.dumps(dict(session)), ttl)
+            if not (new_sid or refresh):
+                return  # the cookie already points at this id
+        elif refresh:
+            self.store.touch(session.sid, ttl)
+        else:
+            return
+
+        value = self._signer(app).sign(session.sid).decode('ascii')
+        response.set_cookie(name, value, expires=self.get_expiration_time(app, session), **cookie)
+        response.vary.add('Cookie')
+
+
+def init_sessions(app):
+    url = app.config.get('SESSION_STORE_URL')
+    app.session_interface = ServerSideSessionInterface(make_session_store(url)) if url \
+        else SlidingCookieSessionInterface()
+    return app.session_interface
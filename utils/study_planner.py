@@ -0,0 +1,405 @@
+"""
+Study plan engine: schedules from exam dates, topic weights and daily
+hour budgets, replanned incrementally.
+
+A plan's schedule lives in study_plan_days rows, one per (plan, date,
+topic), instead of being regenerated into the StudyPlan.schedule JSON:
+
+- topic weights start from the client's weight, are raised by the
+  confidence of exam predictions for the topic's course that mention
+  it, and lowered by study time already logged on it (TopicRollup)
+- each topic's target_hours is its weight share of the plan's hours
+- allocate() walks the days from `start`. Every plan with its exam
+  still ahead gets its even share of the remaining work (remaining /
+  days left), earliest exam first, within the user's daily budget; a
+  plan's hours for the day go to its topics SLOT_HOURS at a time, most
+  remaining first, at most MAX_TOPIC_HOURS_PER_DAY per topic. Plans
+  share the budget, so concurrent plans never overbook a day.
+
+Replanning only touches the affected range:
+
+- logged study time (analytics events, via the pipeline flush) is added
+  to done_hours and consumes the topic's planned hours from that day
+  on, earliest first; only those rows change
+- a new or deleted plan, a moved exam or a new budget reallocates from
+  today; earlier days are never rewritten, and of the later ones only
+  the (plan, day) groups whose allocation changed are
+"""
+import heapq
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+
+from extensions import db
+from models import ExamPrediction, StudyPlan, StudyPlanDay, StudyPlanTopic, TopicRollup, User
+
+SLOT_HOURS = 0.5
+MAX_TOPIC_HOURS_PER_DAY = 2.0
+FAMILIAR_HOURS = 10.0  # logged hours at which a topic's weight is halved
+MAX_TOPICS = 50
+MAX_TOPIC_WEIGHT = 1000.0
+MAX_PLAN_HOURS = 1000.0
+MAX_EXAM_DAYS_AHEAD = 2 * 365  # every day up to the exam gets rows, so the horizon is bounded
+
+
+# ---------------------------------------------------------------------------
+# Inputs
+# ---------------------------------------------------------------------------
+
+def exam_day(plan):
+    return plan.exam_date.date() if isinstance(plan.exam_date, datetime) else plan.exam_date
+
+
+def daily_budget(user):
+    """budget(day) -> hours, from profile_data['daily_study_hours'] (a number or 7 weekday values)"""
+    hours = (user.profile_data or {}).get('daily_study_hours')
+    if hours is None:
+        hours = current_app.config.get('STUDY_PLAN_DAILY_HOURS', 3)
+    if isinstance(hours, (list, tuple)):
+        weekdays = [float(h) for h in hours]
+        return lambda day: weekdays[day.weekday()]
+    return lambda day: float(hours)
+
+
+def parse_budget(value):
+    """Validate a daily_study_hours value; returns it normalised"""
+    if isinstance(value, (list, tuple)):
+        if len(value) != 7:
+            raise ValueError('daily_hours needs one value per weekday (Monday first)')
+        return [parse_budget(v) for v in value]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 24:
+        raise ValueError('daily_hours must be between 0 and 24')
+    return float(value)
+
+
+def parse_topics(payload):
+    """[{'name', 'weight', 'course_id'} | 'name'] -> [(name, weight, course_id)]"""
+    if not isinstance(payload, list) or not payload:
+        raise ValueError('topics must be a non-empty list')
+    if len(payload) > MAX_TOPICS:
+        raise ValueError(f'At most {MAX_TOPICS} topics per plan')
+    topics = {}
+    for item in payload:
+        if isinstance(item, str):
+            item = {'name': item}
+        if not isinstance(item, dict) or not isinstance(item.get('name'), str) or not item['name'].strip():
+            raise ValueError('Each topic needs a name')
+        weight = item.get('weight', 1.0)
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not 0 < weight <= MAX_TOPIC_WEIGHT:
+            raise ValueError(f'weight must be a positive number up to {MAX_TOPIC_WEIGHT:g}')
+        topics[item['name'].strip()[:200]] = (float(weight), item.get('course_id'))
+    return [(name, weight, course_id) for name, (weight, course_id) in topics.items()]
+
+
+def topic_weights(user_id, topics):
+    """Adjust (name, weight, course_id) weights by exam predictions and logged study time"""
+    course_ids = {course_id for _, _, course_id in topics if course_id}
+    predictions = defaultdict(list)
+    if course_ids:
+        for course_id, text, confidence in db.session.query(
+            ExamPrediction.course_id, ExamPrediction.question_text, ExamPrediction.confidence_score
+        ).filter(ExamPrediction.course_id.in_(course_ids)):
+            predictions[course_id].append(((text or '').lower(), confidence or 0.0))
+
+    studied = dict(db.session.query(TopicRollup.topic, db.func.sum(TopicRollup.study_time)).filter(
+        TopicRollup.user_id == user_id,
+        TopicRollup.period == 'month',
+        TopicRollup.topic.in_([name for name, _, _ in topics])
+    ).group_by(TopicRollup.topic).all())
+
+    weights = {}
+    for name, weight, course_id in topics:
+        needle = name.lower()
+        confidence = max((c for text, c in predictions.get(course_id, ()) if needle in text), default=0.0)
+        familiarity = (studied.get(name) or 0) / 60.0 / FAMILIAR_HOURS
+        weights[name] = weight * (1.0 + confidence) / (1.0 + familiarity)
+    return weights
+
+
+# ---------------------------------------------------------------------------
+# Allocation
+# ---------------------------------------------------------------------------
+
+class PlanDemand:
+    def __init__(self, plan_id, exam_date, remaining):
+        self.plan_id = plan_id
+        self.exam_date = exam_date
+        self.remaining = remaining  # {topic: hours still to schedule}
+
+
+def split_slots(remaining, slots, topic_cap):
+    """Hand out `slots` one at a time to the topics with the most remaining slots"""
+    heap = [(-left, topic) for topic, left in remaining.items() if left > 0]
+    heapq.heapify(heap)
+    given = defaultdict(int)
+    while slots and heap:
+        left, topic = heapq.heappop(heap)
+        given[topic] += 1
+        remaining[topic] -= 1
+        slots -= 1
+        if left + 1 < 0 and given[topic] < topic_cap:
+            heapq.heappush(heap, (left + 1, topic))
+    return given
+
+
+def allocate(plans, start, budget):
+    """Schedule PlanDemands from `start`; budget(day) -> hours.
+
+    Returns ({(plan_id, day, topic): hours}, {plan_id: hours left unscheduled}).
+    """
+    plans = sorted(plans, key=lambda p: (p.exam_date, p.plan_id))
+    remaining = {p.plan_id: {t: int(round(h / SLOT_HOURS)) for t, h in p.remaining.items() if h > 0}
+                 for p in plans}
+    totals = {plan_id: sum(slots.values()) for plan_id, slots in remaining.items()}
+    topic_cap = int(MAX_TOPIC_HOURS_PER_DAY / SLOT_HOURS)
+    allocation = {}
+
+    day = start
+    end = max((p.exam_date for p in plans), default=start)
+    while day < end:
+        capacity = int(budget(day) / SLOT_HOURS)
+        for plan in plans:
+            if capacity <= 0:
+                break
+            if plan.exam_date <= day or not totals[plan.plan_id]:
+                continue
+            days_left = (plan.exam_date - day).days
+            share = min(capacity, -(-totals[plan.plan_id] // days_left))
+            given = split_slots(remaining[plan.plan_id], share, topic_cap)
+            for topic, slots in given.items():
+                allocation[(plan.plan_id, day, topic)] = slots * SLOT_HOURS
+            used = sum(given.values())
+            totals[plan.plan_id] -= used
+            capacity -= used
+        day += timedelta(days=1)
+
+    return allocation, {plan_id: total * SLOT_HOURS for plan_id, total in totals.items()}
+
+
+# ---------------------------------------------------------------------------
+# Persisted plans
+# ---------------------------------------------------------------------------
+
+def active_plans(user_id, start):
+    return [plan for plan in StudyPlan.query.filter(StudyPlan.user_id == user_id).all()
+            if exam_day(plan) > start and plan.topics]
+
+
+def planned_hours(plan_ids, start, end):
+    """{(plan_id, topic): hours} planned on days in [start, end)"""
+    if not plan_ids or start >= end:
+        return {}
+    return {
+        (plan_id, topic): hours or 0.0
+        for plan_id, topic, hours in db.session.query(
+            StudyPlanDay.plan_id, StudyPlanDay.topic, db.func.sum(StudyPlanDay.hours)
+        ).filter(
+            StudyPlanDay.plan_id.in_(plan_ids), StudyPlanDay.date >= start, StudyPlanDay.date < end
+        ).group_by(StudyPlanDay.plan_id, StudyPlanDay.topic)
+    }
+
+
+def replan(user_id, start=None, today=None):
+    """Reallocate the user's plans from `start` (default today); returns days rewritten.
+
+    Hours planned between today and start are kept and count as scheduled.
+    """
+    today = today or date.today()
+    start = max(start or today, today)
+    plans = active_plans(user_id, start)
+    plan_ids = [plan.id for plan in plans]
+    kept = planned_hours(plan_ids, today, start)
+
+    demands = []
+    for plan in plans:
+        remaining = {
+            topic.topic: max(0.0, (topic.target_hours or 0) - (topic.done_hours or 0) - kept.get((plan.id, topic.topic), 0))
+            for topic in plan.topics
+        }
+        demands.append(PlanDemand(plan.id, exam_day(plan), remaining))
+    allocation, _ = allocate(demands, start, daily_budget(db.session.get(User, user_id)))
+    return write_days(user_id, start, allocation)
+
+
+def write_days(user_id, start, allocation):
+    """Diff `allocation` against the stored rows from start on; rewrite only changed (plan, day) groups"""
+    wanted = defaultdict(dict)
+    for (plan_id, day, topic), hours in allocation.items():
+        wanted[(plan_id, day)][topic] = hours
+    stored = defaultdict(dict)
+    for plan_id, day, topic, hours in db.session.query(
+        StudyPlanDay.plan_id, StudyPlanDay.date, StudyPlanDay.topic, StudyPlanDay.hours
+    ).filter(StudyPlanDay.user_id == user_id, StudyPlanDay.date >= start):
+        stored[(plan_id, day)][topic] = hours
+
+    changed = [key for key in set(wanted) | set(stored) if wanted.get(key) != stored.get(key)]
+    by_plan = defaultdict(list)
+    for plan_id, day in changed:
+        if (plan_id, day) in stored:
+            by_plan[plan_id].append(day)
+    for plan_id, days in by_plan.items():
+        StudyPlanDay.query.filter(
+            StudyPlanDay.plan_id == plan_id, StudyPlanDay.date.in_(days)
+        ).delete(synchronize_session=False)
+    rows = [
+        {'plan_id': plan_id, 'date': day, 'topic': topic, 'user_id': user_id, 'hours': hours}
+        for plan_id, day in changed for topic, hours in wanted.get((plan_id, day), {}).items()
+    ]
+    if rows:
+        db.session.execute(StudyPlanDay.__table__.insert(), rows)
+    return len(changed)
+
+
+def check_exam_date(exam_date, today):
+    if exam_date <= today:
+        raise ValueError('exam_date must be in the future')
+    if exam_date > today + timedelta(days=MAX_EXAM_DAYS_AHEAD):
+        raise ValueError(f'exam_date must be within {MAX_EXAM_DAYS_AHEAD} days')
+
+
+def create_plan(user_id, title, exam_date, topics, hours=None, today=None):
+    """New plan with weighted topic targets, scheduled from today (no commit)"""
+    today = today or date.today()
+    check_exam_date(exam_date, today)
+    hours = float(hours or current_app.config.get('STUDY_PLAN_DEFAULT_HOURS', 30))
+    if not 0 < hours <= MAX_PLAN_HOURS:
+        raise ValueError(f'hours must be a positive number up to {MAX_PLAN_HOURS:g}')
+    plan = StudyPlan(user_id=user_id, title=title, exam_date=datetime.combine(exam_date, datetime.min.time()),
+                     schedule=[])
+    db.session.add(plan)
+    db.session.flush()
+
+    weights = topic_weights(user_id, topics)
+    total = sum(weights.values())
+    for name, _, course_id in topics:
+        db.session.add(StudyPlanTopic(
+            plan_id=plan.id, topic=name, course_id=course_id, weight=weights[name],
+            target_hours=round(hours * weights[name] / total / SLOT_HOURS) * SLOT_HOURS
+        ))
+    db.session.flush()
+    replan(user_id, today=today)
+    return plan
+
+
+def move_exam(plan, exam_date, today=None):
+    """Change a plan's exam date and reallocate from today (no commit)"""
+    today = today or date.today()
+    check_exam_date(exam_date, today)
+    plan.exam_date = datetime.combine(exam_date, datetime.min.time())
+    # Rows past the new exam date no longer belong to the plan
+    StudyPlanDay.query.filter(
+        StudyPlanDay.plan_id == plan.id, StudyPlanDay.date >= exam_date
+    ).delete(synchronize_session=False)
+    db.session.flush()
+    return replan(plan.user_id, today=today)
+
+
+def delete_plan(plan):
+    """Remove a plan and hand its hours to the user's other plans (no commit)"""
+    user_id = plan.user_id
+    db.session.delete(plan)
+    db.session.flush()
+    return replan(user_id)
+
+
+def set_budget(user, daily_hours):
+    """Store the user's daily hours and reallocate from today (no commit)"""
+    user.profile_data = dict(user.profile_data or {}, daily_study_hours=daily_hours)
+    db.session.flush()
+    return replan(user.id)
+
+
+def record_study(events):
+    """Apply (user_id, day, minutes, topics) events to matching plan topics (no commit).
+
+    Logged hours go to the plan with the nearest exam that has the
+    topic, and consume that topic's planned hours from the event's day
+    on. Returns the number of plan topics updated.
+    """
+    logged = defaultdict(float)
+    for user_id, day, minutes, topics in events:
+        if minutes and topics:
+            for topic in topics:
+                logged[(user_id, day, topic.lower())] += minutes / 60.0 / len(topics)
+    if not logged:
+        return 0
+
+    user_ids = {user_id for user_id, _, _ in logged}
+    candidates = defaultdict(list)
+    for topic, plan in db.session.query(StudyPlanTopic, StudyPlan).join(
+        StudyPlan, StudyPlan.id == StudyPlanTopic.plan_id
+    ).filter(StudyPlan.user_id.in_(user_ids)).order_by(StudyPlan.exam_date, StudyPlan.id):
+        candidates[(plan.user_id, topic.topic.lower())].append((topic, plan))
+
+    updated = 0
+    for (user_id, day, name), hours in sorted(logged.items(), key=lambda item: item[0][1]):
+        match = next(((topic, plan) for topic, plan in candidates.get((user_id, name), ())
+                      if plan.created_at.date() <= day < exam_day(plan)), None)
+        if match is None:
+            continue
+        topic, plan = match
+        topic.done_hours = (topic.done_hours or 0) + hours
+        consume(plan.id, topic.topic, day, hours)
+        updated += 1
+    return updated
+
+
+def consume(plan_id, topic, day, hours):
+    """Take `hours` off a topic's planned rows from `day` on, earliest first"""
+    rows = StudyPlanDay.query.filter(
+        StudyPlanDay.plan_id == plan_id, StudyPlanDay.topic == topic, StudyPlanDay.date >= day
+    ).order_by(StudyPlanDay.date).all()
+    for row in rows:
+        if hours <= 0:
+            break
+        taken = min(row.hours, hours)
+        hours -= taken
+        if taken >= row.hours:
+            db.session.delete(row)
+        else:
+            row.hours -= taken
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+def schedule(plan_ids, start=None, end=None):
+    """[{'date', 'topics', 'hours', 'allocation'}] in StudyPlan.schedule's shape, for [start, end]"""
+    query = StudyPlanDay.query.filter(StudyPlanDay.plan_id.in_(plan_ids))
+    if start:
+        query = query.filter(StudyPlanDay.date >= start)
+    if end:
+        query = query.filter(StudyPlanDay.date <= end)
+    days = defaultdict(dict)
+    for row in query.order_by(StudyPlanDay.date, StudyPlanDay.topic):
+        days[row.date][row.topic] = days[row.date].get(row.topic, 0.0) + row.hours
+    return [
+        {'date': day.isoformat(), 'topics': list(allocation), 'hours': sum(allocation.values()),
+         'allocation': allocation}
+        for day, allocation in days.items()
+    ]
+
+
+def plan_to_dict(plan, today=None):
+    today = today or date.today()
+    future = planned_hours([plan.id], today, exam_day(plan) + timedelta(days=1))
+    topics = []
+    for topic in plan.topics:
+        remaining = max(0.0, (topic.target_hours or 0) - (topic.done_hours or 0))
+        topics.append({
+            'name': topic.topic,
+            'course_id': topic.course_id,
+            'weight': round(topic.weight or 0, 3),
+            'target_hours': topic.target_hours,
+            'done_hours': round(topic.done_hours or 0, 2),
+            'unscheduled_hours': round(max(0.0, remaining - future.get((plan.id, topic.topic), 0)), 2)
+        })
+    return {
+        'id': plan.id,
+        'title': plan.title,
+        'exam_date': exam_day(plan).isoformat(),
+        'created_at': plan.created_at.isoformat() if plan.created_at else None,
+        'topics': topics
+    }
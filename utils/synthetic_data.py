@@ -0,0 +1,361 @@
+"""
+Bulk synthetic data at production volumes.
+
+seed_db.py adds a handful of demo rows through the ORM; this generates
+users, courses, notes, flashcards, analytics days and partnerships by
+the million so performance work can be measured against realistic
+tables. Rows are built as plain tuples and written in batches that
+bypass the ORM: PostgreSQL loads each batch with COPY, SQLite with one
+executemany per batch in its own transaction, other backends with a
+Core executemany.
+
+Everything is drawn from random.Random(seed), so the same seed, options
+and end date produce the same rows. Shapes follow what we see in
+production: notes per user and note sizes are log-normal (a few heavy
+users with long notes), users take a handful of courses, analytics rows
+exist only on days a user was active, and partners share a course.
+
+Writes skip the mapper events that maintain derived tables, so the
+search index, analytics rollups, achievement counters and exam
+predictions must be rebuilt afterwards (see `flask generate-data`).
+user_courses is written directly since the note counts are known here.
+"""
+import io
+import json
+import math
+import random
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import JSON, Date, DateTime, func
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import Analytics, Course, Flashcard, Note, StudyPartner, User, UserCourse
+
+DEFAULT_BATCH_SIZE = 20000
+CORPUS_WORDS = 20000
+
+# Parents first: a batch is only written after the batches of every table before it
+TABLES = [User, Course, Note, Flashcard, UserCourse, Analytics, StudyPartner]
+
+SUBJECTS = {
+    'CS': ('Computer Science', ['algorithms', 'graphs', 'recursion', 'sorting', 'hashing', 'heaps',
+                                'complexity', 'pointers', 'compilers', 'databases', 'networks']),
+    'MATH': ('Mathematics', ['limits', 'derivatives', 'integrals', 'series', 'vectors', 'matrices',
+                             'eigenvalues', 'probability', 'proofs', 'topology']),
+    'BIO': ('Biology', ['cells', 'mitosis', 'meiosis', 'enzymes', 'genetics', 'evolution', 'proteins',
+                        'membranes', 'ecology', 'respiration']),
+    'CHEM': ('Chemistry', ['bonds', 'orbitals', 'equilibrium', 'kinetics', 'acids', 'bases',
+                           'thermodynamics', 'reactions', 'polymers', 'isomers']),
+    'PHYS': ('Physics', ['motion', 'forces', 'energy', 'momentum', 'waves', 'optics', 'circuits',
+                         'magnetism', 'relativity', 'quantum']),
+    'HIST': ('History', ['empires', 'revolutions', 'treaties', 'trade', 'migration', 'reform',
+                         'colonialism', 'industrialization', 'diplomacy', 'dynasties']),
+    'PSY': ('Psychology', ['memory', 'perception', 'conditioning', 'cognition', 'personality',
+                           'development', 'emotion', 'motivation', 'attention', 'learning']),
+    'ECON': ('Economics', ['supply', 'demand', 'elasticity', 'markets', 'inflation', 'interest',
+                           'monopoly', 'trade', 'taxation', 'growth'])
+}
+LEVELS = ['Introduction to', 'Foundations of', 'Topics in', 'Advanced', 'Applied']
+FILLER = ['the', 'of', 'and', 'a', 'is', 'in', 'we', 'that', 'for', 'this', 'lecture', 'example',
+          'exam', 'professor', 'definition', 'theorem', 'remember', 'important', 'chapter', 'note',
+          'review', 'question', 'because', 'so', 'when', 'how', 'why', 'model', 'case', 'rule']
+STATUSES = ['accepted'] * 6 + ['pending'] * 3 + ['rejected']
+
+
+def lognormal_int(rng, mean, sigma, minimum=0):
+    """Integer draw from a log-normal with the given mean (0 mean -> 0)"""
+    if mean <= 0:
+        return 0
+    return max(minimum, int(round(rng.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma))))
+
+
+def build_corpus(rng, topics):
+    """A block of lecture-note-like text for one subject; notes are slices of it"""
+    words = [rng.choice(topics) if rng.random() < 0.15 else rng.choice(FILLER) for _ in range(CORPUS_WORDS)]
+    sentences = []
+    for start in range(0, len(words), 12):
+        sentences.append(' '.join(words[start:start + 12]).capitalize() + '.')
+    return ' '.join(sentences)
+
+
+def text_slice(rng, corpus, size):
+    if size >= len(corpus):
+        return (corpus + ' ') * (size // (len(corpus) + 1)) + corpus[:size % (len(corpus) + 1)]
+    start = rng.randrange(len(corpus) - size)
+    return corpus[start:start + size]
+
+
+# ---------------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------------
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, (datetime, date)):
+        return value.isoformat()
+    elif not isinstance(value, str):
+        return str(value)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _sqlite_datetime(value):
+    return value and value.isoformat(' ', 'microseconds')
+
+
+def _sqlite_date(value):
+    return value and value.isoformat()
+
+
+class BulkWriter:
+    """Buffers rows per table and writes them a batch (and transaction) at a time"""
+
+    def __init__(self, engine, batch_size=DEFAULT_BATCH_SIZE, defer_indexes=False):
+        self.engine = engine
+        self.dialect = engine.dialect
+        self.batch_size = batch_size
+        self.tables = [model.__table__ for model in TABLES]
+        self.columns = {table.name: [column.name for column in table.columns] for table in self.tables}
+        self.counts = {table.name: 0 for table in self.tables}
+        self._buffers = {table.name: [] for table in self.tables}
+        # Building an index once after the load is much cheaper than maintaining it per row
+        self._deferred = []
+        if defer_indexes:
+            self._deferred = [index for table in self.tables for index in table.indexes if not index.unique]
+            for index in self._deferred:
+                index.drop(engine, checkfirst=True)
+        self._raw = engine.raw_connection()
+        self._synchronous = None
+        if self.dialect.name == 'sqlite':
+            # Bulk loads are re-runnable; don't fsync every batch
+            cursor = self._raw.cursor()
+            self._synchronous = cursor.execute('PRAGMA synchronous').fetchone()[0]
+            cursor.execute('PRAGMA synchronous=OFF')
+            cursor.close()
+
+    def add(self, table, row):
+        buffer = self._buffers[table.name]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table=None):
+        """Write the buffer of table (and of every table it may reference), or all buffers"""
+        for current in self.tables:
+            self._write(current, self._buffers[current.name])
+            self._buffers[current.name] = []
+            if current is table:
+                break
+
+    def _write(self, table, rows):
+        if not rows:
+            return
+        columns = self.columns[table.name]
+        cursor = self._raw.cursor()
+        try:
+            if self.dialect.name == 'postgresql':
+                body = '\n'.join('\t'.join(_copy_value(value) for value in row) for row in rows)
+                cursor.copy_expert(f'COPY {table.name} ({", ".join(columns)}) FROM STDIN', io.StringIO(body + '\n'))
+            elif self.dialect.name == 'sqlite':
+                converters = self._sqlite_converters(table)
+                if converters:
+                    # A column at a time: map() is far cheaper than a Python loop per row
+                    values = list(zip(*rows))
+                    for i, convert in converters:
+                        values[i] = map(convert, values[i])
+                    rows = list(zip(*values))
+                cursor.executemany(
+                    f'INSERT INTO {table.name} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+                    rows
+                )
+            else:
+                with self.engine.begin() as connection:
+                    connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+            self._raw.commit()
+        finally:
+            cursor.close()
+        self.counts[table.name] += len(rows)
+
+    def finish(self):
+        self.flush()
+        for index in self._deferred:
+            index.create(self.engine, checkfirst=True)
+        self._deferred = []
+        if self.dialect.name == 'postgresql':
+            # Ids were given explicitly; move the sequences past them
+            cursor = self._raw.cursor()
+            for table in self.tables:
+                if 'id' in table.c and table.c.id.primary_key:
+                    cursor.execute(
+                        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                        f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {table.name}), false)"
+                    )
+            self._raw.commit()
+            cursor.close()
+
+    @staticmethod
+    def _sqlite_converters(table):
+        """Formatters producing the strings SQLAlchemy stores for JSON, DATE and DATETIME on SQLite.
+
+        The type's own bind processors do the same at several times the cost.
+        """
+        converters = []
+        for i, column in enumerate(table.columns):
+            if isinstance(column.type, JSON):
+                converters.append((i, json.dumps))
+            elif isinstance(column.type, DateTime):
+                converters.append((i, _sqlite_datetime))
+            elif isinstance(column.type, Date):
+                converters.append((i, _sqlite_date))
+        return converters
+
+    def close(self):
+        """Return the connection to the pool; unfinished batches are rolled back"""
+        if self._synchronous is not None:
+            self._raw.rollback()
+            cursor = self._raw.cursor()
+            cursor.execute(f'PRAGMA synchronous={int(self._synchronous)}')
+            cursor.close()
+        self._raw.close()
+
+
+# ---------------------------------------------------------------------------
+# Generator
+# ---------------------------------------------------------------------------
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def generate(users=1000, courses=200, courses_per_user=4, notes_per_user=20, note_kb=2.0,
+             note_size_sigma=1.0, flashcards_per_note=2.0, analytics_days=180, partners_per_user=3,
+             seed=42, end_date=None, batch_size=DEFAULT_BATCH_SIZE, defer_indexes=False, progress=None):
+    """Append a synthetic dataset to the database. Returns {table: rows written}.
+
+    Ids continue after the existing rows, so it can be run against a
+    database that already has data. defer_indexes drops the non-unique
+    indexes of the loaded tables and rebuilds them at the end (best for
+    an empty database). progress(table_counts) is called after each user.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or date.today()
+    end = datetime.combine(end_date, datetime.min.time())
+    first_user, first_course = _next_id(User), _next_id(Course)
+    next_note, next_card, next_row, next_partner = (_next_id(Note), _next_id(Flashcard),
+                                                   _next_id(Analytics), _next_id(StudyPartner))
+    db.session.commit()
+
+    writer = BulkWriter(db.engine, batch_size, defer_indexes)
+    try:
+        # Courses
+        subjects = sorted(SUBJECTS)
+        corpora = {prefix: build_corpus(rng, SUBJECTS[prefix][1]) for prefix in subjects}
+        course_subject = {}
+        for course_id in range(first_course, first_course + courses):
+            prefix = rng.choice(subjects)
+            name, topics = SUBJECTS[prefix]
+            course_subject[course_id] = prefix
+            writer.add(Course.__table__, (
+                course_id, f'{rng.choice(LEVELS)} {name}: {rng.choice(topics).title()}',
+                f'{prefix}-{course_id}', f'Synthetic {name.lower()} course',
+                end - timedelta(days=rng.randint(200, 1500))
+            ))
+        course_ids = sorted(course_subject)
+        # Some courses are much more popular than others
+        popularity = [1.0 / (rank + 1) ** 0.8 for rank in range(len(course_ids))]
+
+        # Users and their enrolments (kept for partner matching)
+        password_hash = generate_password_hash('password123')
+        user_ids = range(first_user, first_user + users)
+        enrolled = {}
+        classmates = {course_id: [] for course_id in course_ids}
+        for user_id in user_ids:
+            writer.add(User.__table__, (
+                user_id, f'student{user_id}@synthetic.studysync.dev', password_hash,
+                {'daily_study_hours': rng.choice([1, 2, 2, 3, 3, 4, 5])},
+                end - timedelta(days=rng.randint(0, 900), seconds=rng.randint(0, 86399))
+            ))
+            taken = set()
+            for _ in range(min(courses, max(1, lognormal_int(rng, courses_per_user, 0.5, 1)))):
+                taken.add(rng.choices(course_ids, popularity)[0])
+            enrolled[user_id] = sorted(taken)
+            for course_id in enrolled[user_id]:
+                classmates[course_id].append(user_id)
+
+        # The per-row loops below draw with rand() directly; randint()
+        # and choice() cost several times more per call
+        rand = rng.random
+        reviews_choices = [0, 0, 1, 2, 3, 5, 8]
+        days = [(end_date - timedelta(days=offset), end - timedelta(days=offset)) for offset in range(analytics_days)]
+        for user_id in user_ids:
+            # Notes and their flashcards
+            taken = enrolled[user_id]
+            note_counts = dict.fromkeys(taken, 0)
+            for _ in range(lognormal_int(rng, notes_per_user, 1.0)):
+                course_id = taken[int(rand() * len(taken))]
+                prefix = course_subject[course_id]
+                corpus = corpora[prefix]
+                created = end - timedelta(seconds=int(rand() * 730 * 86400))
+                size = max(40, lognormal_int(rng, note_kb * 1024, note_size_sigma))
+                note_counts[course_id] += 1
+                writer.add(Note.__table__, (
+                    next_note, user_id, course_id, text_slice(rng, corpus, size), None,
+                    f'{prefix}-{course_id} Notes - Chapter {note_counts[course_id]}', created,
+                    created + timedelta(minutes=int(rand() * 600))
+                ))
+                cards = int(round(rng.expovariate(1.0 / flashcards_per_note))) if flashcards_per_note else 0
+                topics = SUBJECTS[prefix][1]
+                for _ in range(cards):
+                    reviews = reviews_choices[int(rand() * 7)]
+                    interval = round(1 + rand() * 59, 2) if reviews else 0.0
+                    last = created + timedelta(days=int(rand() * 60)) if reviews else None
+                    start = int(rand() * (len(corpus) - 120))
+                    writer.add(Flashcard.__table__, (
+                        next_card, next_note, user_id,
+                        f'What is {topics[int(rand() * len(topics))]}?', corpus[start:start + 120],
+                        int(rand() * 3), (last or created) + timedelta(days=interval), reviews,
+                        round(1.3 + rand() * 1.5, 2), interval, last, created
+                    ))
+                    next_card += 1
+                next_note += 1
+            for course_id, count in note_counts.items():
+                if count:
+                    writer.add(UserCourse.__table__, (user_id, course_id, count))
+
+            # Analytics: one row per active day
+            activity = 0.1 + rand() * 0.8
+            topics = [topic for course_id in taken for topic in SUBJECTS[course_subject[course_id]][1]]
+            for day, midnight in days:
+                if rand() >= activity:
+                    continue
+                covered = list(dict.fromkeys(topics[int(rand() * len(topics))] for _ in range(1 + int(rand() * 3))))
+                writer.add(Analytics.__table__, (
+                    next_row, user_id, day, 10 + int(rand() * 231), covered,
+                    midnight + timedelta(hours=8 + int(rand() * 16))
+                ))
+                next_row += 1
+
+            # Partnerships with classmates; only the lower id of a pair creates it
+            mates = set()
+            for _ in range(partners_per_user):
+                members = classmates[taken[int(rand() * len(taken))]]
+                lowest = bisect_right(members, user_id)
+                if lowest < len(members):
+                    mates.add(members[rng.randrange(lowest, len(members))])
+            for mate in sorted(mates):
+                writer.add(StudyPartner.__table__, (
+                    next_partner, user_id, mate, round(rng.uniform(0.2, 1.0), 3), rng.choice(STATUSES),
+                    end - timedelta(days=rng.randint(0, 365))
+                ))
+                next_partner += 1
+
+            if progress:
+                progress(writer.counts)
+        writer.finish()
+    finally:
+        writer.close()
+    return dict(writer.counts)
@@ -0,0 +1,63 @@
+"""
+Dialect-aware bulk upserts for derived counter tables.
+
+PostgreSQL and SQLite get a single INSERT ... ON CONFLICT statement;
+other backends fall back to UPDATE-then-INSERT per row. `executor` is
+anything with execute(): db.session, or the Connection handed to mapper
+events.
+"""
+from sqlalchemy import bindparam
+
+
+def _dialect(executor):
+    bind = executor.get_bind() if hasattr(executor, 'get_bind') else executor
+    return bind.dialect.name
+
+
+def _on_conflict_insert(dialect, table):
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def upsert_increment(executor, table, rows, keys, increments):
+    """INSERT rows, adding `increments` onto rows whose key already exists"""
+    if not rows:
+        return
+    dialect = _dialect(executor)
+    if dialect in ('postgresql', 'sqlite'):
+        stmt = _on_conflict_insert(dialect, table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: table.c[column] + stmt.excluded[column] for column in increments}
+        )
+        executor.execute(stmt, rows)
+        return
+
+    key_filter = [table.c[key] == bindparam(f'k_{key}') for key in keys]
+    update = table.update().where(*key_filter).values(
+        {column: table.c[column] + bindparam(f'v_{column}') for column in increments}
+    )
+    for row in rows:
+        params = {f'k_{key}': row[key] for key in keys}
+        params.update({f'v_{column}': row[column] for column in increments})
+        if executor.execute(update, params).rowcount == 0:
+            executor.execute(table.insert(), row)
+
+
+def insert_ignore(executor, table, rows, keys):
+    """INSERT rows, skipping any whose key already exists"""
+    if not rows:
+        return
+    dialect = _dialect(executor)
+    if dialect in ('postgresql', 'sqlite'):
+        stmt = _on_conflict_insert(dialect, table).on_conflict_do_nothing(index_elements=keys)
+        executor.execute(stmt, rows)
+        return
+
+    exists = table.select().where(*[table.c[key] == bindparam(f'k_{key}') for key in keys])
+    for row in rows:
+        if executor.execute(exists, {f'k_{key}': row[key] for key in keys}).first() is None:
+            executor.execute(table.insert(), row)
@@ -0,0 +1,120 @@
+"""
+Per-process cache behind login_manager.user_loader.
+
+Flask-Login calls the user loader on every authenticated request and
+socket event. UserCache keeps the few columns needed to identify a user
+(id, email, created_at) in a bounded LRU with a short TTL, and hands back
+a User attached to the current session without a query. profile_data
+and password_hash are left unloaded and fetched from the database only
+if a view reads them.
+
+Entries are dropped after a commit that updates or deletes the user
+(profile or password changes included). Other workers see such a change
+when their entry expires, after USER_CACHE_TTL_SECONDS at most.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, event, select
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from extensions import db
+from models import User
+
+SESSION_KEY = 'user_cache_invalidations'
+AUTH_COLUMNS = (User.id, User.email, User.created_at)
+
+_LOAD_USER = select(*AUTH_COLUMNS).where(User.id == bindparam('user_id'))
+
+
+class UserCache:
+    def __init__(self, max_entries=10000, ttl_seconds=60):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or time.monotonic() > entry[0]:
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, columns):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, columns)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def load(self, user_id):
+        """user_loader: a session-attached User, or None"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+        columns = self.get(user_id)
+        if columns is None:
+            row = db.session.execute(_LOAD_USER, {'user_id': user_id}).mappings().first()
+            if row is None:
+                return None
+            columns = dict(row)
+            self.put(user_id, columns)
+
+        user = User(**columns)
+        make_transient_to_detached(user)  # unset columns load on first access
+        return db.session.merge(user, load=False)
+
+
+def _touched(mapper, connection, user):
+    session = object_session(user)
+    if session is not None:
+        session.info.setdefault(SESSION_KEY, set()).add(user.id)
+
+
+event.listen(User, 'after_update', _touched)
+event.listen(User, 'after_delete', _touched)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    user_ids = session.info.pop(SESSION_KEY, None)
+    if user_ids and has_app_context() and 'user_cache' in current_app.extensions:
+        current_app.extensions['user_cache'].invalidate(*user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_uncommitted(session):
+    session.info.pop(SESSION_KEY, None)
+
+
+def init_user_cache(app):
+    cache = UserCache(
+        max_entries=app.config.get('USER_CACHE_SIZE', 10000),
+        ttl_seconds=app.config.get('USER_CACHE_TTL_SECONDS', 60)
+    )
+    app.extensions['user_cache'] = cache
+    return cache
+
+
+def get_user_cache():
+    return current_app.extensions['user_cache']
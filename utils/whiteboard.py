@@ -0,0 +1,346 @@
+"""
+Whiteboard engine for study rooms.
+
+Incoming `draw` events are normalised into compact strokes, buffered per
+room and broadcast as one `draw_batch` event per time window instead of
+one event per pen movement. Point lists are delta-encoded integers
+([x0, y0, dx1, dy1, ...]) and can optionally be sent as zigzag-varint
+binary frames.
+
+Every flushed stroke is appended to a per-room log. Once the tail grows
+past snapshot_every strokes it is compacted into the room snapshot
+(contiguous segments of the same stroke are merged into one polyline),
+and late joiners receive snapshot + tail in a single `whiteboard_state`
+event. clear_board truncates both.
+
+Boards are bounded: a stroke has at most MAX_POINTS points with finite
+coordinates within MAX_COORDINATE and a few short style values, a
+compacted board keeps its newest WHITEBOARD_MAX_STROKES strokes, and a
+board untouched for WHITEBOARD_IDLE_SECONDS is dropped (the memory log
+also keeps at most WHITEBOARD_MAX_ROOMS boards, least recently used
+first out). events.py only accepts draw and clear_board from sockets
+that joined the room.
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+# Payload keys that describe the geometry rather than the pen style
+GEOMETRY_KEYS = ('room_id', 'points', 'x0', 'y0', 'x1', 'y1')
+MAX_POINTS = 1000
+MAX_COORDINATE = 100000
+MAX_STYLE_KEYS = 8
+MAX_STYLE_LENGTH = 64
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+def delta_encode(points):
+    """[(x, y), ...] -> [x0, y0, dx1, dy1, ...] with integer coordinates"""
+    encoded = []
+    last_x = last_y = 0
+    for x, y in points:
+        x, y = int(round(x)), int(round(y))
+        encoded.append(x - last_x)
+        encoded.append(y - last_y)
+        last_x, last_y = x, y
+    return encoded
+
+
+def delta_decode(encoded):
+    points = []
+    x = y = 0
+    for i in range(0, len(encoded) - 1, 2):
+        x += encoded[i]
+        y += encoded[i + 1]
+        points.append((x, y))
+    return points
+
+
+def pack_varints(values):
+    """Zigzag + LEB128 varint encoding of a list of ints"""
+    out = bytearray()
+    for value in values:
+        value = (value << 1) ^ (value >> 63)
+        while value > 0x7f:
+            out.append((value & 0x7f) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def unpack_varints(data):
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append((value >> 1) ^ -(value & 1))
+        value = shift = 0
+    return values
+
+
+def _read_points(data):
+    points = data.get('points')
+    if points:
+        return [(p['x'], p['y']) if isinstance(p, dict) else (p[0], p[1]) for p in points]
+    if all(key in data for key in ('x0', 'y0', 'x1', 'y1')):
+        return [(data['x0'], data['y0']), (data['x1'], data['y1'])]
+    return []
+
+
+def _valid_coordinate(value):
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and math.isfinite(value) and abs(value) <= MAX_COORDINATE)
+
+
+def _style(data):
+    style = {key: value for key, value in data.items() if key not in GEOMETRY_KEYS}
+    if len(style) > MAX_STYLE_KEYS:
+        return None
+    for value in style.values():
+        if value is not None and not isinstance(value, (str, int, float, bool)):
+            return None
+        if isinstance(value, str) and len(value) > MAX_STYLE_LENGTH:
+            return None
+    return style
+
+
+def normalize_stroke(data, sender):
+    """Turn a raw `draw` payload into a compact stroke, or None if it has no points or is out of bounds"""
+    try:
+        points = _read_points(data)
+    except (KeyError, IndexError, TypeError):
+        return None
+    if not points or len(points) > MAX_POINTS:
+        return None
+    if not all(_valid_coordinate(x) and _valid_coordinate(y) for x, y in points):
+        return None
+    style = _style(data)
+    if style is None:
+        return None
+    return {'s': sender, 'style': style, 'p': delta_encode(points)}
+
+
+def encode_for_wire(strokes, binary=False):
+    if not binary:
+        return strokes
+    return [dict(stroke, p=pack_varints(stroke['p'])) for stroke in strokes]
+
+
+def compact(strokes):
+    """Merge consecutive strokes that continue each other into one polyline"""
+    merged = []
+    for stroke in strokes:
+        if merged:
+            last = merged[-1]
+            if last['s'] == stroke['s'] and last['style'] == stroke['style']:
+                last_points = delta_decode(last['p'])
+                points = delta_decode(stroke['p'])
+                if (last_points and points and last_points[-1] == points[0]
+                        and len(last_points) + len(points) <= MAX_POINTS + 1):
+                    merged[-1] = dict(last, p=delta_encode(last_points + points[1:]))
+                    continue
+        merged.append(stroke)
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Stroke logs
+# ---------------------------------------------------------------------------
+
+class Board:
+    def __init__(self):
+        self.snapshot = []
+        self.tail = []
+        self.last_active = time.monotonic()
+
+
+class MemoryStrokeLog:
+    def __init__(self, snapshot_every=200, max_strokes=5000, max_rooms=1000, idle_seconds=6 * 3600):
+        self.snapshot_every = snapshot_every
+        self.max_strokes = max_strokes
+        self.max_rooms = max_rooms
+        self.idle_seconds = idle_seconds
+        self._boards = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._boards:
+            board = next(iter(self._boards.values()))
+            if len(self._boards) <= self.max_rooms and board.last_active >= cutoff:
+                break
+            self._boards.popitem(last=False)
+
+    def append(self, room, strokes):
+        with self._lock:
+            board = self._boards.get(room)
+            if board is None:
+                board = self._boards[room] = Board()
+            self._boards.move_to_end(room)
+            board.last_active = time.monotonic()
+            board.tail.extend(strokes)
+            if len(board.tail) >= self.snapshot_every:
+                board.snapshot = compact(board.snapshot + board.tail)[-self.max_strokes:]
+                board.tail = []
+            self._evict()
+
+    def state(self, room):
+        with self._lock:
+            self._evict()
+            board = self._boards.get(room)
+            if board is None:
+                return [], []
+            return list(board.snapshot), list(board.tail)
+
+    def clear(self, room):
+        with self._lock:
+            self._boards.pop(room, None)
+
+
+class RedisStrokeLog:
+    def __init__(self, url, snapshot_every=200, max_strokes=5000, idle_seconds=6 * 3600,
+                 prefix='studysync:whiteboard:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('RedisStrokeLog requires the redis package (pip install redis)') from e
+        self._redis = redis.Redis.from_url(url)
+        self.snapshot_every = snapshot_every
+        self.max_strokes = max_strokes
+        self.idle_seconds = idle_seconds
+        self._prefix = prefix
+
+    def _keys(self, room):
+        return f'{self._prefix}{room}:snapshot', f'{self._prefix}{room}:tail'
+
+    def append(self, room, strokes):
+        snapshot_key, tail_key = self._keys(room)
+        pipe = self._redis.pipeline()
+        pipe.rpush(tail_key, *[json.dumps(stroke) for stroke in strokes])
+        # Idle boards expire on their own
+        pipe.expire(tail_key, self.idle_seconds)
+        pipe.expire(snapshot_key, self.idle_seconds)
+        length = pipe.execute()[0]
+        if length >= self.snapshot_every:
+            snapshot, tail = self.state(room)
+            pipe = self._redis.pipeline()
+            pipe.set(snapshot_key, json.dumps(compact(snapshot + tail)[-self.max_strokes:]), ex=self.idle_seconds)
+            # Only drop what was folded in; strokes appended meanwhile stay in the tail
+            pipe.ltrim(tail_key, len(tail), -1)
+            pipe.execute()
+
+    def state(self, room):
+        snapshot_key, tail_key = self._keys(room)
+        pipe = self._redis.pipeline()
+        pipe.get(snapshot_key)
+        pipe.lrange(tail_key, 0, -1)
+        snapshot, tail = pipe.execute()
+        return json.loads(snapshot) if snapshot else [], [json.loads(stroke) for stroke in tail]
+
+    def clear(self, room):
+        self._redis.delete(*self._keys(room))
+
+
+# ---------------------------------------------------------------------------
+# Batching
+# ---------------------------------------------------------------------------
+
+class Whiteboard:
+    def __init__(self, socketio, log, batch_ms=25, binary=False):
+        self.socketio = socketio
+        self.log = log
+        self.batch_seconds = batch_ms / 1000.0
+        self.binary = binary
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add_stroke(self, room, data, sender):
+        stroke = normalize_stroke(data, sender)
+        if stroke is None:
+            return False
+        with self._lock:
+            pending = self._pending.get(room)
+            first = pending is None
+            if first:
+                self._pending[room] = [stroke]
+            else:
+                pending.append(stroke)
+
+        if self.batch_seconds <= 0:
+            self.flush(room)
+        elif first:
+            self.socketio.start_background_task(self._flush_later, room)
+        return True
+
+    def _flush_later(self, room):
+        self.socketio.sleep(self.batch_seconds)
+        self.flush(room)
+
+    def flush(self, room):
+        with self._lock:
+            strokes = self._pending.pop(room, None)
+        if not strokes:
+            return
+        # Pointer moves from one pen stroke arrive as contiguous segments
+        strokes = compact(strokes)
+        self.log.append(room, strokes)
+        # Clients skip strokes whose `s` matches their own socket id
+        self.socketio.emit('draw_batch', {
+            'room_id': room,
+            'strokes': encode_for_wire(strokes, self.binary)
+        }, to=room)
+
+    def state(self, room):
+        snapshot, tail = self.log.state(room)
+        return {
+            'room_id': room,
+            'snapshot': encode_for_wire(snapshot, self.binary),
+            'tail': encode_for_wire(tail, self.binary)
+        }
+
+    def clear(self, room):
+        with self._lock:
+            self._pending.pop(room, None)
+        self.log.clear(room)
+
+
+def make_stroke_log(url=None, snapshot_every=200, max_strokes=5000, max_rooms=1000, idle_seconds=6 * 3600):
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStrokeLog(url, snapshot_every=snapshot_every, max_strokes=max_strokes,
+                              idle_seconds=idle_seconds)
+    return MemoryStrokeLog(snapshot_every=snapshot_every, max_strokes=max_strokes, max_rooms=max_rooms,
+                           idle_seconds=idle_seconds)
+
+
+def init_whiteboard(app, log=None):
+    if log is None:
+        url = app.config.get('PRESENCE_URL') or app.config.get('SOCKETIO_MESSAGE_QUEUE')
+        log = make_stroke_log(
+            url,
+            snapshot_every=app.config.get('WHITEBOARD_SNAPSHOT_EVERY', 200),
+            max_strokes=app.config.get('WHITEBOARD_MAX_STROKES', 5000),
+            max_rooms=app.config.get('WHITEBOARD_MAX_ROOMS', 1000),
+            idle_seconds=app.config.get('WHITEBOARD_IDLE_SECONDS', 6 * 3600)
+        )
+    whiteboard = Whiteboard(
+        app.extensions['socketio'],
+        log,
+        batch_ms=app.config.get('WHITEBOARD_BATCH_MS', 25),
+        binary=app.config.get('WHITEBOARD_BINARY_FRAMES', False)
+    )
+    app.extensions['whiteboard'] = whiteboard
+    return whiteboard
+
+
+def get_whiteboard():
+    return current_app.extensions['whiteboard']